@@ -0,0 +1,47 @@
+"""
+Compares packed-bit Tanimoto search with per pair metrics.tanimoto calls.
+
+    python benchmarks/bench_fingerprint.py --size 1000000
+"""
+import argparse
+import time
+import numpy as np
+
+from nskit.metrics import tanimoto, pack_fingerprints, tanimoto_top_k
+
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--bits', type=int, default=192)
+    parser.add_argument('--density', type=float, default=0.1)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lib = (rng.random((args.size, args.bits))<args.density).astype(np.int32)
+    queries = lib[rng.choice(args.size, args.queries, replace=False)]
+
+    t = time.perf_counter()
+    packed = pack_fingerprints(lib)
+    print(f"pack: {time.perf_counter()-t:.2f} s, {packed.words.nbytes/2**20:.1f} MB "
+          f"(dense int32 {lib.nbytes/2**20:.1f} MB)")
+
+    n = min(args.size, 100_000)
+    t = time.perf_counter()
+    _ = [tanimoto(queries[0], x) for x in lib[:n]]
+    pair_time = (time.perf_counter()-t)/n
+
+    t = time.perf_counter()
+    top = tanimoto_top_k(queries, packed, args.k)
+    packed_time = (time.perf_counter()-t)/(args.queries*args.size)
+
+    assert np.all(top.scores[:, 0]==1.)
+    print(f"tanimoto per pair: {pair_time*1e9:.0f} ns/pair")
+    print(f"packed top-{args.k}: {packed_time*1e9:.1f} ns/pair ({pair_time/packed_time:.0f}x)")
+
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Compares weighted dynamic programming and bit-parallel levenshtein kernels.
+
+    python benchmarks/bench_levenshtein.py
+"""
+import random
+import timeit
+
+from nskit.algo.levenshtein._levenshtein import c_levenshtein_dp, c_levenshtein_myers
+
+
+
+LENGTHS = (16, 64, 128, 512, 1000, 3000, 10000)
+
+
+def random_seq(n, rng):
+    return ''.join(rng.choices('ACGU', k=n)).encode('ascii')
+
+
+def bench(n, rng, repeat=5):
+    a = random_seq(n, rng)
+    b = random_seq(n, rng)
+    number = max(1, 2_000_000//(n*n))
+
+    dp = min(timeit.repeat(lambda: c_levenshtein_dp(a, b, 1., 1., 1.), 
+                           number=number, repeat=repeat))/number
+    myers = min(timeit.repeat(lambda: c_levenshtein_myers(a, b), 
+                              number=number, repeat=repeat))/number
+    return dp, myers
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'length':>8} {'dp, ms':>12} {'myers, ms':>12} {'speedup':>9}")
+    for n in LENGTHS:
+        dp, myers = bench(n, rng)
+        print(f"{n:>8} {dp*1e3:>12.4f} {myers*1e3:>12.4f} {dp/myers:>9.1f}")
+
+
+if __name__=='__main__':
+    main()
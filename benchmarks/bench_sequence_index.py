@@ -0,0 +1,56 @@
+"""
+Compares SequenceIndex queries with brute force levdist scan.
+
+    python benchmarks/bench_sequence_index.py --size 1000000
+"""
+import argparse
+import random
+import time
+
+from nskit.algo import levdist, SequenceIndex
+
+
+
+def random_library(n, length, rng):
+    return [''.join(rng.choices('ACGU', k=length)) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--length', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('-k', type=int, default=3)
+    parser.add_argument('--weights', type=float, nargs=3, default=(1., 1., 1.), 
+                        metavar=('INS', 'RM', 'SUB'))
+    args = parser.parse_args()
+    ins, rm, sub = args.weights
+
+    rng = random.Random(0)
+    lib = random_library(args.size, args.length, rng)
+    queries = [s[:-1] + 'A' for s in rng.sample(lib, args.queries)]
+
+    t = time.perf_counter()
+    index = SequenceIndex(lib, ins=ins, rm=rm, sub=sub)
+    print(f"{index.kind}-tree build: {time.perf_counter()-t:.2f} s for {args.size} sequences")
+
+    t = time.perf_counter()
+    brute = [[i for i, s in enumerate(lib) if levdist(q, s, ins, rm, sub)<=args.k] for q in queries]
+    brute_time = (time.perf_counter()-t)/len(queries)
+
+    t = time.perf_counter()
+    found = [index.range(q, args.k) for q in queries]
+    range_time = (time.perf_counter()-t)/len(queries)
+
+    t = time.perf_counter()
+    _ = [index.knn(q, 10) for q in queries]
+    knn_time = (time.perf_counter()-t)/len(queries)
+
+    assert [sorted([i for i, _ in f]) for f in found]==brute
+    print(f"brute force range: {brute_time*1e3:.1f} ms/query")
+    print(f"index range k={args.k}: {range_time*1e3:.1f} ms/query ({brute_time/range_time:.1f}x)")
+    print(f"index knn k=10: {knn_time*1e3:.1f} ms/query")
+
+
+if __name__=='__main__':
+    main()
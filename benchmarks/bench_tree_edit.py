@@ -0,0 +1,52 @@
+"""
+Measures loop tree edit distance on random structures of 100 - 3000 nbs.
+
+    python benchmarks/bench_tree_edit.py
+"""
+import random
+import time
+
+from nskit.algo import loop_tree, tree_edit_distance_matrix
+
+
+
+LENGTHS = (100, 300, 1000, 3000)
+
+
+def random_structure(n, rng):
+    struct = ['.']*n
+    stack = []
+    for i in range(n):
+        r = rng.random()
+        if r<0.35:
+            stack.append(i)
+        elif r<0.7 and stack and i-stack[-1]>3:
+            o = stack.pop()
+            struct[o], struct[i] = '(', ')'
+    return ''.join(struct)
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'length':>8} {'nodes':>7} {'tree, ms':>10} {'pair, ms':>10} {'10x10, ms':>10}")
+    for n in LENGTHS:
+        structs = [random_structure(n, rng) for _ in range(10)]
+
+        t = time.perf_counter()
+        trees = [loop_tree(s) for s in structs]
+        tree_time = (time.perf_counter()-t)/len(structs)
+        nodes = sum([len(t.types) for t in trees])/len(trees)
+
+        t = time.perf_counter()
+        _ = tree_edit_distance_matrix(trees[:1], trees[1:2], size=0.1)
+        pair_time = time.perf_counter()-t
+
+        t = time.perf_counter()
+        _ = tree_edit_distance_matrix(trees, size=0.1)
+        batch_time = time.perf_counter()-t
+
+        print(f"{n:>8} {nodes:>7.0f} {tree_time*1e3:>10.2f} {pair_time*1e3:>10.2f} {batch_time*1e3:>10.1f}")
+
+
+if __name__=='__main__':
+    main()
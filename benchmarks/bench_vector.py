@@ -0,0 +1,43 @@
+"""
+Compares blocked euclidean/cosine top-k search over FragmentCount-like vectors with per pair metric calls.
+
+    python benchmarks/bench_vector.py --size 1000000 --dtype float32
+"""
+import argparse
+import time
+import numpy as np
+
+from nskit.metrics import euclidean_dist, cosine_sim, euclidean_top_k, cosine_top_k
+
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--dim', type=int, default=192)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float64'])
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lib = rng.integers(0, 5, size=(args.size, args.dim)).astype(np.int32)
+    queries = lib[rng.choice(args.size, args.queries, replace=False)]
+
+    n = min(args.size, 100_000)
+    for name, pair_func, top_k in (('euclidean', euclidean_dist, euclidean_top_k), 
+                                   ('cosine', cosine_sim, cosine_top_k)):
+        t = time.perf_counter()
+        _ = [pair_func(queries[0], x) for x in lib[:n]]
+        pair_time = (time.perf_counter()-t)/n
+
+        t = time.perf_counter()
+        _ = top_k(queries, lib, args.k, dtype=args.dtype)
+        block_time = (time.perf_counter()-t)/(args.queries*args.size)
+
+        print(f"{name} per pair: {pair_time*1e9:.0f} ns/pair, "
+              f"blocked top-{args.k}: {block_time*1e9:.1f} ns/pair ({pair_time/block_time:.0f}x)")
+
+
+if __name__=='__main__':
+    main()
@@ -2,7 +2,7 @@ from .io import *
 from . import algo
 from .containers import NucleicAcid
 from .parse_na import NA
-from .draw import edit_draw_config
+from .draw import edit_draw_config, draw_many
 from . import descriptors
 from . import metrics
 
@@ -15,7 +15,7 @@ __all__ = ["NA", "NucleicAcid",
            "bpseqRead", "bpseqDirRead", "bpseqWrite",
            "pdbRead", "pdbParse", 
            "bnaWrite", "bnaRead", 
-           "edit_draw_config",
+           "edit_draw_config", "draw_many",
            "algo", 
            "descriptors", 
            "metrics"
@@ -1,4 +1,9 @@
-from .levenshtein import levdist
+from .levenshtein import levdist, subdist, subdist_many, align, EditCosts
+from .sequence_index import SequenceIndex
+from .tree_edit import loop_tree, tree_edit_distance, tree_edit_distance_matrix
+from . import sketch
 
 
-__all__ = ["levdist"]
\ No newline at end of file
+__all__ = ["levdist", "subdist", "subdist_many", "align", "EditCosts", "SequenceIndex", 
+           "loop_tree", "tree_edit_distance", "tree_edit_distance_matrix", 
+           "sketch"]
@@ -1,60 +1,205 @@
-from ._levenshtein import c_levenshtein
-from typing import Union
+from ._levenshtein import c_levenshtein, c_semiglobal, c_semiglobal_many, c_align
+from collections import namedtuple
+from typing import Iterable, List, Optional, Tuple, Union
+import numpy as np
+from .costs import EditCosts
 from ...containers import NucleicAcid
 
 
 
-def levdist(a: Union[str, NucleicAcid], 
-            b: Union[str, NucleicAcid], 
+Sequence = Union[str, NucleicAcid, bytes, bytearray, memoryview, np.ndarray]
+
+
+def _encode(a: Sequence) -> Union[bytes, bytearray, memoryview, np.ndarray]:
+    # buffers are passed to C kernels as is, without copies
+    if isinstance(a, NucleicAcid):
+        return a.seq_bytes
+    if isinstance(a, (bytes, bytearray, memoryview)):
+        return a
+    if isinstance(a, np.ndarray):
+        if a.dtype.itemsize!=1:
+            raise TypeError(f"Sequence array must be of single byte items (uint8), got {a.dtype}")
+        return np.ascontiguousarray(a)
+    return a.encode('ascii')
+
+
+def levdist(a: Sequence, 
+            b: Sequence, 
             ins: float = 1., 
             rm: float = 1., 
-            sub: float = 1.
+            sub: float = 1., *, 
+            costs: Optional[EditCosts] = None
            ) -> float:
     """
     Calculates levenshtein distance between two strings or NucleicAcid sequences.
+    Unit weights (default) are computed with bit-parallel kernel.
+    Bytes, bytearray, memoryview and uint8 numpy arrays are compared without copies.
 
-    :param a: first ascii string or NucleicAcid.
-    :param b: second ascii string or NucleicAcid.
+    :param a: first ascii string, NucleicAcid or bytes-like sequence.
+    :param b: second ascii string, NucleicAcid or bytes-like sequence.
     :param ins: insert weight.
     :param rm: delete(remove) weight.
     :param sub: substitute weight.
+    :param costs: per character EditCosts, replaces ins, rm and sub weights.
 
     :return: distance float value.
     """
     
-    if isinstance(a, NucleicAcid):
-        a = a.seq
-    if isinstance(b, NucleicAcid):
-        b = b.seq
-        
-    a = a.encode('ascii')
-    b = b.encode('ascii')
+    a = _encode(a)
+    b = _encode(b)
     
-    if len(a)==0 or len(b)==0:
-        return float((len(a) | len(b))*ins)
+    if costs is None:
+        if len(a)==0 or len(b)==0:
+            return float(len(a)*rm + len(b)*ins)
+        tables = None
+    else:
+        tables = costs.tables()
 
     dist = c_levenshtein(a, b, 
-                         len(a), len(b), 
                          float(ins), 
                          float(rm), 
-                         float(sub)
+                         float(sub), 
+                         tables
                         )
     
-    ### temporary bug fix
-    c = 0
-    while abs(dist)>(max(len(a), len(b))*max(ins, rm, sub)):
-        dist = c_levenshtein(a, b, 
-                         len(a), len(b), 
-                         float(ins), 
-                         float(rm), 
-                         float(sub)
-                        )
-        c+=1
-        if c>=10:
-            raise ValueError("Something gone wrong with levenshtein.")
-    ###
-    
     return dist
 
 
-__all__ = ["levdist"]
\ No newline at end of file
+
+def subdist(probe: Sequence, 
+            text: Sequence, 
+            ins: float = 1., 
+            rm: float = 1., 
+            sub: float = 1., 
+            return_span: bool = False, *, 
+            costs: Optional[EditCosts] = None
+           ) -> Union[float, Tuple[float, int, int]]:
+    """
+    Calculates semi-global levenshtein distance - distance between probe and 
+    its best matching substring of text (gaps at text ends are free).
+
+    :param probe: ascii string, NucleicAcid or bytes-like sequence to be aligned entirely.
+    :param text: ascii string, NucleicAcid or bytes-like sequence to search probe in.
+    :param ins: insert weight.
+    :param rm: delete(remove) weight.
+    :param sub: substitute weight.
+    :param return_span: also return start and end (exclusive) of matched text substring.
+    :param costs: per character EditCosts, replaces ins, rm and sub weights.
+
+    :return: distance float value or (distance, start, end) tuple.
+    """
+    
+    probe = _encode(probe)
+    text = _encode(text)
+    
+    return c_semiglobal(probe, text, 
+                        float(ins), 
+                        float(rm), 
+                        float(sub), 
+                        return_span, 
+                        None if costs is None else costs.tables()
+                       )
+
+
+def subdist_many(probe: Sequence, 
+                 texts: Iterable[Sequence], 
+                 ins: float = 1., 
+                 rm: float = 1., 
+                 sub: float = 1., 
+                 return_span: bool = False, *, 
+                 costs: Optional[EditCosts] = None
+                ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calculates semi-global levenshtein distance between one probe and many texts.
+
+    :param probe: ascii string, NucleicAcid or bytes-like sequence to be aligned entirely.
+    :param texts: ascii strings, NucleicAcids or bytes-like sequences to search probe in.
+    :param ins: insert weight.
+    :param rm: delete(remove) weight.
+    :param sub: substitute weight.
+    :param return_span: also return (n, 2) matrix of start and end (exclusive) of matched substrings.
+    :param costs: per character EditCosts, replaces ins, rm and sub weights.
+
+    :return: float64 numpy vector of distances or (distances, spans) tuple.
+    """
+    
+    probe = _encode(probe)
+    texts = [_encode(t) for t in texts]
+    offsets = np.zeros(len(texts)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([memoryview(t).nbytes for t in texts])
+    
+    dists, spans = c_semiglobal_many(probe, b''.join(texts), offsets.tobytes(), 
+                                     float(ins), 
+                                     float(rm), 
+                                     float(sub), 
+                                     return_span, 
+                                     None if costs is None else costs.tables()
+                                    )
+    dists = np.frombuffer(dists, dtype=np.float64).copy()
+    if return_span:
+        return dists, np.frombuffer(spans, dtype=np.int64).reshape(-1, 2).copy()
+    return dists
+
+
+
+class Alignment(namedtuple("Alignment", ["dist", "ops"])):
+    """
+    Levenshtein alignment of two sequences.
+    ops - string of operations transforming first sequence into second:
+        M - match, X - substitute, I - insert char of second, D - delete char of first.
+    """
+    
+    __slots__ = ()
+    
+    def index_map(self) -> List[Tuple[Optional[int], Optional[int]]]:
+        """
+        Aligned index pairs (i, j) of first and second sequence, gaps are None.
+        """
+        
+        i, j = 0, 0
+        pairs = []
+        for op in self.ops:
+            if op=='I':
+                pairs.append((None, j))
+                j += 1
+            elif op=='D':
+                pairs.append((i, None))
+                i += 1
+            else:
+                pairs.append((i, j))
+                i += 1
+                j += 1
+        return pairs
+
+
+def align(a: Sequence, 
+          b: Sequence, 
+          ins: float = 1., 
+          rm: float = 1., 
+          sub: float = 1., *, 
+          costs: Optional[EditCosts] = None
+         ) -> Alignment:
+    """
+    Computes optimal levenshtein alignment of two strings or NucleicAcid sequences.
+    Hirschberg divide and conquer is used, memory is linear in sequence length.
+
+    :param a: first ascii string, NucleicAcid or bytes-like sequence.
+    :param b: second ascii string, NucleicAcid or bytes-like sequence.
+    :param ins: insert weight.
+    :param rm: delete(remove) weight.
+    :param sub: substitute weight.
+    :param costs: per character EditCosts, replaces ins, rm and sub weights.
+
+    :return: Alignment with distance and operations string.
+    """
+    
+    dist, ops = c_align(_encode(a), _encode(b), 
+                        float(ins), 
+                        float(rm), 
+                        float(sub), 
+                        None if costs is None else costs.tables()
+                       )
+    return Alignment(dist=dist, ops=ops.decode('ascii'))
+
+
+__all__ = ["levdist", "subdist", "subdist_many", "align", "Alignment", "EditCosts"]
\ No newline at end of file
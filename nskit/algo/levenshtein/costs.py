@@ -0,0 +1,146 @@
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+
+
+TRANSITIONS = (('A', 'G'), ('C', 'U'), ('C', 'T'))
+
+
+class EditCosts:
+    """
+    Per character edit costs for levenshtein kernels:
+    256x256 substitute table (row - char of first sequence, column - char of second)
+    and 256 insert and delete tables. Tables are read only, use set_* methods to edit them.
+    """
+
+    def __init__(self, ins: float = 1., rm: float = 1., sub: float = 1.):
+        """
+        :param ins: default insert weight.
+        :param rm: default delete(remove) weight.
+        :param sub: default substitute weight, matching chars cost 0.
+        """
+
+        self._sub = np.full((256, 256), float(sub), dtype=np.float64)
+        np.fill_diagonal(self._sub, 0.)
+        self._ins = np.full(256, float(ins), dtype=np.float64)
+        self._rm = np.full(256, float(rm), dtype=np.float64)
+        self._tables = None
+
+
+    @property
+    def sub(self) -> np.ndarray:
+        return self._readonly(self._sub)
+
+
+    @property
+    def ins(self) -> np.ndarray:
+        return self._readonly(self._ins)
+
+
+    @property
+    def rm(self) -> np.ndarray:
+        return self._readonly(self._rm)
+
+
+    def _readonly(self, arr):
+        view = arr.view()
+        view.setflags(write=False)
+        return view
+
+
+    def _codes(self, chars: Iterable[str]):
+        return [ord(ch) for ch in chars]
+
+
+    def set_sub(self, x: str, y: str, cost: float, symmetric: bool = True) -> 'EditCosts':
+        """
+        Sets substitute cost of every char of x with every char of y.
+        """
+
+        for i in self._codes(x):
+            for j in self._codes(y):
+                self._sub[i, j] = cost
+                if symmetric:
+                    self._sub[j, i] = cost
+        self._tables = None
+        return self
+
+
+    def set_ins(self, chars: str, cost: float) -> 'EditCosts':
+        self._ins[self._codes(chars)] = cost
+        self._tables = None
+        return self
+
+
+    def set_rm(self, chars: str, cost: float) -> 'EditCosts':
+        self._rm[self._codes(chars)] = cost
+        self._tables = None
+        return self
+
+
+    def set_wildcard(self, chars: str) -> 'EditCosts':
+        """
+        Makes chars match any char with zero cost.
+        """
+
+        codes = self._codes(chars)
+        self._sub[codes, :] = 0.
+        self._sub[:, codes] = 0.
+        self._tables = None
+        return self
+
+
+    def tables(self) -> Tuple[bytes, bytes, bytes]:
+        """
+        Substitute, insert and delete tables as bytes for C kernels.
+        """
+
+        if self._tables is None:
+            self._tables = (self._sub.tobytes(), self._ins.tobytes(), self._rm.tobytes())
+        return self._tables
+
+
+    def max_cost(self) -> float:
+        return float(max(self._sub.max(), self._ins.max(), self._rm.max()))
+
+
+    @classmethod
+    def nucleotide(cls,
+                   transition: float = 0.5,
+                   transversion: float = 1.,
+                   ins: float = 1.,
+                   rm: float = 1.,
+                   wildcard: Optional[str] = 'N',
+                   ignore_case: bool = True
+                  ) -> 'EditCosts':
+        """
+        Nucleotide costs with cheaper transitions (A<->G, C<->U/T) than transversions.
+        Transitions are also the substitutions preserving base pairing through G-U wobble.
+        U and T are interchangeable with zero cost.
+
+        :param transition: purine<->purine and pyrimidine<->pyrimidine substitute weight.
+        :param transversion: purine<->pyrimidine substitute weight, also used for other chars.
+        :param ins: insert weight.
+        :param rm: delete(remove) weight.
+        :param wildcard: chars matching any char with zero cost. Default - N.
+        :param ignore_case: use same costs for lower case chars. Default - True.
+
+        :return: EditCosts object.
+        """
+
+        costs = cls(ins=ins, rm=rm, sub=transversion)
+        cases = (str.upper, str.lower) if ignore_case else (str.upper, )
+
+        for case in cases:
+            for x, y in TRANSITIONS:
+                costs.set_sub(case(x), case(y), transition)
+            costs.set_sub(case('U'), case('T'), 0.)
+
+        if ignore_case:
+            for x in 'ACGUTN':
+                costs.set_sub(x, x.lower(), 0.)
+
+        if wildcard:
+            costs.set_wildcard(wildcard.upper() + wildcard.lower() if ignore_case else wildcard)
+
+        return costs
@@ -1,32 +1,349 @@
+#define PY_SSIZE_T_CLEAN
 #include <Python.h>
+#include <stdint.h>
+#include <string.h>
+#include <limits.h>
 
 
 
+// edit costs: scalar weights or per character tables (256x256 substitute, 256 insert, 256 delete)
+typedef struct {
+    double ins;
+    double rm;
+    double sub;
+    const double* sub_table;
+    const double* ins_table;
+    const double* rm_table;
+} Costs;
+
+
 double weighted_levenshtein(const char* a, const char* b, 
                               int aN, int bN, 
-                              double ins, 
-                              double rm, 
-                              double sub
+                              const Costs* c
                              );
-                             
+
+double myers_levenshtein(const char* a, const char* b, 
+                           int aN, int bN
+                          );
+
+double semiglobal_levenshtein(const char* a, const char* b, 
+                                int aN, int bN, 
+                                const Costs* c, 
+                                int* start, 
+                                int* end
+                               );
+
+double myers_semiglobal(const char* a, const char* b, 
+                          int aN, int bN
+                         );
+
+int hirschberg_alignment(const char* a, const char* b, 
+                         int aN, int bN, 
+                         const Costs* c, 
+                         char* ops, 
+                         double* dist
+                        );
+
+
+static int parse_costs(double ins, double rm, double sub, PyObject* tables, Costs* c){
+    // tables - None or (substitute, insert, delete) tuple of float64 bytes
+    c->ins = ins;
+    c->rm = rm;
+    c->sub = sub;
+    c->sub_table = NULL;
+    c->ins_table = NULL;
+    c->rm_table = NULL;
+    if (tables==NULL || tables==Py_None)
+        return 1;
+    
+    const char* sub_t;
+    const char* ins_t;
+    const char* rm_t;
+    Py_ssize_t subN, insN, rmN;
+    if (!PyArg_ParseTuple(tables, "y#y#y#", &sub_t, &subN, &ins_t, &insN, &rm_t, &rmN))
+        return 0;
+    
+    if (subN!=sizeof(double)*256*256 || insN!=sizeof(double)*256 || rmN!=sizeof(double)*256){
+        PyErr_SetString(PyExc_ValueError, "Cost tables must contain 256x256 substitute, 256 insert and 256 delete float64 values");
+        return 0;
+    }
+    c->sub_table = (const double*)sub_t;
+    c->ins_table = (const double*)ins_t;
+    c->rm_table = (const double*)rm_t;
+    return 1;
+}
+
+
+static inline int is_unit(const Costs* c){
+    return c->sub_table==NULL && c->ins==1. && c->rm==1. && c->sub==1.;
+}
+
+
+static int get_seq(PyObject* obj, Py_buffer* view){
+    // any contiguous buffer of single byte items: bytes, bytearray, memoryview, uint8 numpy array
+    if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS)!=0)
+        return 0;
+    if (view->itemsize!=1 || view->len>INT_MAX){
+        PyBuffer_Release(view);
+        PyErr_SetString(PyExc_TypeError, "Sequence must be a contiguous buffer of single byte items");
+        return 0;
+    }
+    return 1;
+}
+
+
+static int get_seqs(PyObject* a_obj, PyObject* b_obj, Py_buffer* a, Py_buffer* b){
+    if (!get_seq(a_obj, a))
+        return 0;
+    if (!get_seq(b_obj, b)){
+        PyBuffer_Release(a);
+        return 0;
+    }
+    return 1;
+}
+
+
+static void release_seqs(Py_buffer* a, Py_buffer* b){
+    PyBuffer_Release(a);
+    PyBuffer_Release(b);
+}
+
+
 PyObject *Py_levenshtein(PyObject *self, PyObject *args){
-    const char* a;
-    const char* b;
-    int aN;
-    int bN;
+    PyObject* a_obj;
+    PyObject* b_obj;
+    Py_buffer a;
+    Py_buffer b;
     double ins;
     double rm;
     double sub;
     
-    if (!PyArg_ParseTuple(args, "yyiiddd", &a, &b, &aN, &bN, &ins, &rm, &sub))
+    PyObject* tables = NULL;
+    Costs c;
+    
+    if (!PyArg_ParseTuple(args, "OOddd|O", &a_obj, &b_obj, &ins, &rm, &sub, &tables))
+        return NULL;
+    if (!parse_costs(ins, rm, sub, tables, &c))
+        return NULL;
+    if (!get_seqs(a_obj, b_obj, &a, &b))
         return NULL;
     
-    double res = weighted_levenshtein(a, b, aN, bN, ins, rm, sub);
+    double res;
+    if (is_unit(&c)){
+        res = myers_levenshtein(a.buf, b.buf, (int)a.len, (int)b.len);
+    } else {
+        res = weighted_levenshtein(a.buf, b.buf, (int)a.len, (int)b.len, &c);
+    }
+    release_seqs(&a, &b);
+    if (res<0.)
+        return PyErr_NoMemory();
         
     return PyFloat_FromDouble(res);
 }
 
 
+PyObject *Py_levenshtein_dp(PyObject *self, PyObject *args){
+    PyObject* a_obj;
+    PyObject* b_obj;
+    Py_buffer a;
+    Py_buffer b;
+    double ins;
+    double rm;
+    double sub;
+    
+    Costs c;
+    
+    if (!PyArg_ParseTuple(args, "OOddd", &a_obj, &b_obj, &ins, &rm, &sub))
+        return NULL;
+    parse_costs(ins, rm, sub, NULL, &c);
+    if (!get_seqs(a_obj, b_obj, &a, &b))
+        return NULL;
+    
+    double res = weighted_levenshtein(a.buf, b.buf, (int)a.len, (int)b.len, &c);
+    release_seqs(&a, &b);
+    if (res<0.)
+        return PyErr_NoMemory();
+        
+    return PyFloat_FromDouble(res);
+}
+
+
+PyObject *Py_levenshtein_myers(PyObject *self, PyObject *args){
+    PyObject* a_obj;
+    PyObject* b_obj;
+    Py_buffer a;
+    Py_buffer b;
+    
+    if (!PyArg_ParseTuple(args, "OO", &a_obj, &b_obj))
+        return NULL;
+    if (!get_seqs(a_obj, b_obj, &a, &b))
+        return NULL;
+    
+    double res = myers_levenshtein(a.buf, b.buf, (int)a.len, (int)b.len);
+    release_seqs(&a, &b);
+    if (res<0.)
+        return PyErr_NoMemory();
+        
+    return PyFloat_FromDouble(res);
+}
+
+
+PyObject *Py_semiglobal(PyObject *self, PyObject *args){
+    PyObject* a_obj;
+    PyObject* b_obj;
+    Py_buffer a;
+    Py_buffer b;
+    double ins;
+    double rm;
+    double sub;
+    int with_span;
+    PyObject* tables = NULL;
+    Costs c;
+    
+    if (!PyArg_ParseTuple(args, "OOdddp|O", &a_obj, &b_obj, &ins, &rm, &sub, &with_span, &tables))
+        return NULL;
+    if (!parse_costs(ins, rm, sub, tables, &c))
+        return NULL;
+    if (!get_seqs(a_obj, b_obj, &a, &b))
+        return NULL;
+    
+    double res;
+    int start = 0;
+    int end = 0;
+    if (!with_span && is_unit(&c)){
+        res = myers_semiglobal(a.buf, b.buf, (int)a.len, (int)b.len);
+    } else {
+        res = semiglobal_levenshtein(a.buf, b.buf, (int)a.len, (int)b.len, &c, &start, &end);
+    }
+    release_seqs(&a, &b);
+    if (res<0.)
+        return PyErr_NoMemory();
+    
+    if (with_span)
+        return Py_BuildValue("(dii)", res, start, end);
+    return PyFloat_FromDouble(res);
+}
+
+
+PyObject *Py_semiglobal_many(PyObject *self, PyObject *args){
+    // texts are concatenated into one buffer with int64 offsets (n+1 values)
+    PyObject* a_obj;
+    Py_buffer probe;
+    const char* texts;
+    const char* offsets_buf;
+    Py_ssize_t textsN;
+    Py_ssize_t offsetsN;
+    double ins;
+    double rm;
+    double sub;
+    int with_span;
+    PyObject* tables = NULL;
+    Costs c;
+    
+    if (!PyArg_ParseTuple(args, "Oy#y#dddp|O", &a_obj, &texts, &textsN, &offsets_buf, &offsetsN, 
+                          &ins, &rm, &sub, &with_span, &tables))
+        return NULL;
+    if (!parse_costs(ins, rm, sub, tables, &c))
+        return NULL;
+    
+    const int64_t* offsets = (const int64_t*)offsets_buf;
+    Py_ssize_t n = offsetsN/(Py_ssize_t)sizeof(int64_t) - 1;
+    if (n<0 || offsets[n]>textsN){
+        PyErr_SetString(PyExc_ValueError, "Invalid text offsets");
+        return NULL;
+    }
+    if (!get_seq(a_obj, &probe))
+        return NULL;
+    const char* a = probe.buf;
+    int aN = (int)probe.len;
+    
+    PyObject* dists = PyBytes_FromStringAndSize(NULL, sizeof(double)*n);
+    PyObject* spans = PyBytes_FromStringAndSize(NULL, sizeof(int64_t)*2*(with_span ? n : 0));
+    if (dists==NULL || spans==NULL){
+        PyBuffer_Release(&probe);
+        Py_XDECREF(dists);
+        Py_XDECREF(spans);
+        return NULL;
+    }
+    double* d = (double*)PyBytes_AS_STRING(dists);
+    int64_t* sp = (int64_t*)PyBytes_AS_STRING(spans);
+    int unit = (!with_span && is_unit(&c));
+    int failed = 0;
+    
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i=0; i<n; i++){
+        const char* b = texts + offsets[i];
+        int bN = (int)(offsets[i+1] - offsets[i]);
+        int start = 0;
+        int end = 0;
+        
+        if (unit){
+            d[i] = myers_semiglobal(a, b, aN, bN);
+        } else {
+            d[i] = semiglobal_levenshtein(a, b, aN, bN, &c, &start, &end);
+        }
+        if (d[i]<0.){failed = 1; break;}
+        
+        if (with_span){
+            sp[2*i] = start;
+            sp[2*i+1] = end;
+        }
+    }
+    Py_END_ALLOW_THREADS
+    
+    PyBuffer_Release(&probe);
+    if (failed){
+        Py_DECREF(dists);
+        Py_DECREF(spans);
+        return PyErr_NoMemory();
+    }
+    
+    return Py_BuildValue("(NN)", dists, spans);
+}
+
+
+PyObject *Py_align(PyObject *self, PyObject *args){
+    PyObject* a_obj;
+    PyObject* b_obj;
+    Py_buffer a;
+    Py_buffer b;
+    double ins;
+    double rm;
+    double sub;
+    PyObject* tables = NULL;
+    Costs c;
+    
+    if (!PyArg_ParseTuple(args, "OOddd|O", &a_obj, &b_obj, &ins, &rm, &sub, &tables))
+        return NULL;
+    if (!parse_costs(ins, rm, sub, tables, &c))
+        return NULL;
+    if (!get_seqs(a_obj, b_obj, &a, &b))
+        return NULL;
+    
+    char* ops = malloc(a.len + b.len + 1);
+    if (ops==NULL){
+        release_seqs(&a, &b);
+        return PyErr_NoMemory();
+    }
+    
+    int opsN;
+    double dist;
+    Py_BEGIN_ALLOW_THREADS
+    opsN = hirschberg_alignment(a.buf, b.buf, (int)a.len, (int)b.len, &c, ops, &dist);
+    Py_END_ALLOW_THREADS
+    release_seqs(&a, &b);
+    
+    if (opsN<0){
+        free(ops);
+        return PyErr_NoMemory();
+    }
+    
+    PyObject* res = Py_BuildValue("(dy#)", dist, ops, (Py_ssize_t)opsN);
+    free(ops);
+    return res;
+}
+
+
 static PyMethodDef methods[] = {
     {
         "c_levenshtein", 
@@ -34,6 +351,36 @@ static PyMethodDef methods[] = {
         METH_VARARGS, 
         "Computes levenshtein distance with specified weights"
      },
+    {
+        "c_levenshtein_dp", 
+        Py_levenshtein_dp, 
+        METH_VARARGS, 
+        "Computes levenshtein distance with weighted dynamic programming kernel"
+     },
+    {
+        "c_levenshtein_myers", 
+        Py_levenshtein_myers, 
+        METH_VARARGS, 
+        "Computes unit cost levenshtein distance with bit-parallel kernel"
+     },
+    {
+        "c_semiglobal", 
+        Py_semiglobal, 
+        METH_VARARGS, 
+        "Computes levenshtein distance between first string and best matching substring of second"
+     },
+    {
+        "c_semiglobal_many", 
+        Py_semiglobal_many, 
+        METH_VARARGS, 
+        "Computes semi-global levenshtein distance between one string and many texts"
+     },
+    {
+        "c_align", 
+        Py_align, 
+        METH_VARARGS, 
+        "Computes optimal levenshtein alignment operations in linear memory"
+     },
     {NULL, NULL, 0, NULL}
 };
 
@@ -60,39 +407,408 @@ double tmin(double a, double b, double c){
 }
 
 
+static inline double sub_cost(const Costs* c, char x, char y){
+    if (c->sub_table!=NULL){return c->sub_table[((unsigned char)x)*256 + (unsigned char)y];}
+    return (x==y) ? 0. : c->sub;
+}
+
+
+static inline double ins_cost(const Costs* c, char y){
+    if (c->ins_table!=NULL){return c->ins_table[(unsigned char)y];}
+    return c->ins;
+}
+
+
+static inline double rm_cost(const Costs* c, char x){
+    if (c->rm_table!=NULL){return c->rm_table[(unsigned char)x];}
+    return c->rm;
+}
+
+
+static inline double ins_prefix(const Costs* c, const char* b, int j, double prev){
+    // cost of inserting b[0:j], prev - cost of b[0:j-1]
+    if (c->ins_table!=NULL){return (j==0) ? 0. : prev + c->ins_table[(unsigned char)b[j-1]];}
+    return (double)j * c->ins;
+}
+
+
+static inline double rm_prefix(const Costs* c, const char* a, int i, double prev){
+    // cost of deleting a[0:i], prev - cost of a[0:i-1]
+    if (c->rm_table!=NULL){return (i==0) ? 0. : prev + c->rm_table[(unsigned char)a[i-1]];}
+    return (double)i * c->rm;
+}
+
+
 double weighted_levenshtein(const char* a, const char* b, 
                               int aN, int bN, 
-                              double ins, 
-                              double rm, 
-                              double sub
+                              const Costs* c
                              ){
-    aN++;
+    // two rows of the dp matrix, O(bN) memory
+    bN++;
+    
+    double* D = malloc(sizeof(double)*bN*2);
+    if (D==NULL){return -1.;}
+    double* prev = D;
+    double* cur = D + bN;
+    
+    prev[0] = 0.;
+    for (int j=1; j<bN; j++){prev[j] = ins_prefix(c, b, j, prev[j-1]);}
+    
+    for (int i=1; i<=aN; i++){
+        cur[0] = rm_prefix(c, a, i, prev[0]);
+        double rm = rm_cost(c, a[i-1]);
+        
+        for (int j=1; j<bN; j++){
+            cur[j] = tmin((prev[j-1] + sub_cost(c, a[i-1], b[j-1])), 
+                          (cur[j-1] + ins_cost(c, b[j-1])), 
+                          (prev[j] + rm)
+                         );
+        }
+        
+        double* t = prev; prev = cur; cur = t;
+    }
+    double result = prev[bN-1];
+    free(D);
+    
+    return result;
+}
+
+
+// ### Bit-parallel unit cost levenshtein (Myers 1999, Hyyro 2003 blocks)
+
+#define WORD_SIZE 64
+#define HIGH_BIT ((uint64_t)1 << (WORD_SIZE-1))
+
+
+static inline int advance_block(uint64_t* Pv, uint64_t* Mv, uint64_t Eq, 
+                                int hin, uint64_t out_bit
+                               ){
+    // one column step of a 64-row block, hin/hout - horizontal delta entering block top / leaving out_bit row
+    uint64_t pv = *Pv;
+    uint64_t mv = *Mv;
+    uint64_t Xv = Eq | mv;
+    if (hin<0){Eq |= (uint64_t)1;}
+    
+    uint64_t Xh = (((Eq & pv) + pv) ^ pv) | Eq;
+    uint64_t Ph = mv | ~(Xh | pv);
+    uint64_t Mh = pv & Xh;
+    
+    int hout = 0;
+    if (Ph & out_bit){hout = 1;}
+    else if (Mh & out_bit){hout = -1;}
+    
+    Ph <<= 1;
+    Mh <<= 1;
+    if (hin<0){Mh |= (uint64_t)1;}
+    else if (hin>0){Ph |= (uint64_t)1;}
+    
+    *Pv = Mh | ~(Xv | Ph);
+    *Mv = Ph & Xv;
+    
+    return hout;
+}
+
+
+double myers_levenshtein(const char* a, const char* b, 
+                           int aN, int bN
+                          ){
+    // distance is symmetric with unit weights, shorter string is used as bit pattern
+    if (aN>bN){
+        const char* t = a; a = b; b = t;
+        int tN = aN; aN = bN; bN = tN;
+    }
+    if (aN==0){return (double)bN;}
+    
+    int W = (aN + WORD_SIZE - 1)/WORD_SIZE;
+    uint64_t last_bit = (uint64_t)1 << ((aN-1)%WORD_SIZE);
+    
+    uint64_t* Peq = calloc((size_t)256*W, sizeof(uint64_t));
+    uint64_t* P = malloc(sizeof(uint64_t)*W*2);
+    if (Peq==NULL || P==NULL){
+        free(Peq);
+        free(P);
+        return -1.;
+    }
+    uint64_t* Pv = P;
+    uint64_t* Mv = P + W;
+    
+    for (int i=0; i<aN; i++){
+        unsigned char c = (unsigned char)a[i];
+        Peq[c*W + i/WORD_SIZE] |= (uint64_t)1 << (i%WORD_SIZE);
+    }
+    for (int w=0; w<W; w++){
+        Pv[w] = ~(uint64_t)0;
+        Mv[w] = 0;
+    }
+    
+    long score = aN;
+    for (int j=0; j<bN; j++){
+        const uint64_t* Eq = Peq + ((unsigned char)b[j])*W;
+        int h = 1; // first row of global distance grows by one per column
+        for (int w=0; w<W-1; w++){
+            h = advance_block(Pv+w, Mv+w, Eq[w], h, HIGH_BIT);
+        }
+        score += advance_block(Pv+W-1, Mv+W-1, Eq[W-1], h, last_bit);
+    }
+    
+    free(Peq);
+    free(P);
+    
+    return (double)score;
+}
+
+
+double myers_semiglobal(const char* a, const char* b, 
+                          int aN, int bN
+                         ){
+    // free start and end gaps in b: first row is zero, minimum of the last row is taken
+    if (aN==0){return 0.;}
+    
+    int W = (aN + WORD_SIZE - 1)/WORD_SIZE;
+    uint64_t last_bit = (uint64_t)1 << ((aN-1)%WORD_SIZE);
+    
+    uint64_t* Peq = calloc((size_t)256*W, sizeof(uint64_t));
+    uint64_t* P = malloc(sizeof(uint64_t)*W*2);
+    if (Peq==NULL || P==NULL){
+        free(Peq);
+        free(P);
+        return -1.;
+    }
+    uint64_t* Pv = P;
+    uint64_t* Mv = P + W;
+    
+    for (int i=0; i<aN; i++){
+        unsigned char c = (unsigned char)a[i];
+        Peq[c*W + i/WORD_SIZE] |= (uint64_t)1 << (i%WORD_SIZE);
+    }
+    for (int w=0; w<W; w++){
+        Pv[w] = ~(uint64_t)0;
+        Mv[w] = 0;
+    }
+    
+    long score = aN;
+    long best = aN;
+    for (int j=0; j<bN; j++){
+        const uint64_t* Eq = Peq + ((unsigned char)b[j])*W;
+        int h = 0;
+        for (int w=0; w<W-1; w++){
+            h = advance_block(Pv+w, Mv+w, Eq[w], h, HIGH_BIT);
+        }
+        score += advance_block(Pv+W-1, Mv+W-1, Eq[W-1], h, last_bit);
+        if (score<best){best = score;}
+    }
+    
+    free(Peq);
+    free(P);
+    
+    return (double)best;
+}
+
+
+double semiglobal_levenshtein(const char* a, const char* b, 
+                                int aN, int bN, 
+                                const Costs* c, 
+                                int* start, 
+                                int* end
+                               ){
+    // two rows of costs and alignment start positions in b, O(bN) memory
     bN++;
     
-    double result;
-    double diagonal_cost = 0.;
-    double* A = malloc(sizeof(double)*aN*bN);
-    for (int i=1; i<aN; i++){A[i*bN] = (double)i * rm;}
-    for (int j=0; j<bN; j++){A[j] = (double)j * ins;}
+    double* D = malloc(sizeof(double)*bN*2);
+    int* S = malloc(sizeof(int)*bN*2);
+    if (D==NULL || S==NULL){
+        free(D);
+        free(S);
+        return -1.;
+    }
+    double* prev = D;
+    double* cur = D + bN;
+    int* sprev = S;
+    int* scur = S + bN;
+    
+    for (int j=0; j<bN; j++){
+        prev[j] = 0.;
+        sprev[j] = j;
+    }
     
-    for (int i=1; i<aN; i++){
+    for (int i=1; i<=aN; i++){
+        cur[0] = rm_prefix(c, a, i, prev[0]);
+        scur[0] = 0;
+        double rm = rm_cost(c, a[i-1]);
+        
         for (int j=1; j<bN; j++){
+            double diagonal = prev[j-1] + sub_cost(c, a[i-1], b[j-1]);
+            double left = cur[j-1] + ins_cost(c, b[j-1]);
+            double up = prev[j] + rm;
             
-            if ( (*(a+i-1)) == (*(b+j-1)) ){
-                diagonal_cost = 0.;
+            if (diagonal<=left && diagonal<=up){
+                cur[j] = diagonal;
+                scur[j] = sprev[j-1];
+            } else if (up<=left){
+                cur[j] = up;
+                scur[j] = sprev[j];
             } else {
-                diagonal_cost = sub;
+                cur[j] = left;
+                scur[j] = scur[j-1];
             }
-            
-            A[i*bN + j] = tmin((A[(i-1)*bN + (j-1)] + diagonal_cost), 
-                               (A[i*bN + (j-1)] + ins), 
-                               (A[(i-1)*bN + j] + rm)
-                              );
+        }
+        
+        double* t = prev; prev = cur; cur = t;
+        int* st = sprev; sprev = scur; scur = st;
+    }
+    
+    double result = prev[0];
+    *start = sprev[0];
+    *end = 0;
+    for (int j=1; j<bN; j++){
+        if (prev[j]<result){
+            result = prev[j];
+            *start = sprev[j];
+            *end = j;
         }
     }
-    result = A[aN*bN - 1];
-    free(A);
+    
+    free(D);
+    free(S);
     
     return result;
 }
 
+
+// ### Hirschberg alignment, operations: M - match, X - substitute, I - insert b char, D - delete a char
+
+static void forward_row(const char* a, const char* b, int aN, int bN, 
+                        const Costs* c, double* row
+                       ){
+    // row[j] - cost of aligning a[0:aN] with b[0:j]
+    row[0] = 0.;
+    for (int j=1; j<=bN; j++){row[j] = ins_prefix(c, b, j, row[j-1]);}
+    
+    for (int i=1; i<=aN; i++){
+        double diagonal = row[0];
+        double rm = rm_cost(c, a[i-1]);
+        row[0] = rm_prefix(c, a, i, row[0]);
+        for (int j=1; j<=bN; j++){
+            double up = row[j];
+            row[j] = tmin(diagonal + sub_cost(c, a[i-1], b[j-1]), 
+                          row[j-1] + ins_cost(c, b[j-1]), 
+                          up + rm);
+            diagonal = up;
+        }
+    }
+}
+
+
+static void backward_row(const char* a, const char* b, int aN, int bN, 
+                         const Costs* c, double* row
+                        ){
+    // row[j] - cost of aligning a[0:aN] with b[j:bN]
+    row[bN] = 0.;
+    for (int j=bN-1; j>=0; j--){row[j] = row[j+1] + ins_cost(c, b[j]);}
+    
+    for (int i=aN-1; i>=0; i--){
+        double diagonal = row[bN];
+        double rm = rm_cost(c, a[i]);
+        row[bN] += rm;
+        for (int j=bN-1; j>=0; j--){
+            double down = row[j];
+            row[j] = tmin(diagonal + sub_cost(c, a[i], b[j]), 
+                          row[j+1] + ins_cost(c, b[j]), 
+                          down + rm);
+            diagonal = down;
+        }
+    }
+}
+
+
+static int align_one(char x, const char* b, int bN, 
+                     const Costs* c, char* ops
+                    ){
+    // single char of a: either deleted or aligned to the cheapest position of b
+    double all_ins = 0.;
+    for (int j=0; j<bN; j++){all_ins += ins_cost(c, b[j]);}
+    
+    int k = -1;
+    double best = rm_cost(c, x) + all_ins;
+    for (int j=0; j<bN; j++){
+        double cost = all_ins - ins_cost(c, b[j]) + sub_cost(c, x, b[j]);
+        if (cost<best){
+            best = cost;
+            k = j;
+        }
+    }
+    
+    int n = 0;
+    if (k<0){
+        ops[n++] = 'D';
+        for (int j=0; j<bN; j++){ops[n++] = 'I';}
+        return n;
+    }
+    for (int j=0; j<bN; j++){
+        if (j==k){ops[n++] = (x==b[j]) ? 'M' : 'X';}
+        else {ops[n++] = 'I';}
+    }
+    return n;
+}
+
+
+static int hirschberg(const char* a, const char* b, int aN, int bN, 
+                      const Costs* c, 
+                      char* ops, double* F, double* R
+                     ){
+    int n = 0;
+    if (aN==0){
+        for (int j=0; j<bN; j++){ops[n++] = 'I';}
+        return n;
+    }
+    if (bN==0){
+        for (int i=0; i<aN; i++){ops[n++] = 'D';}
+        return n;
+    }
+    if (aN==1){
+        return align_one(a[0], b, bN, c, ops);
+    }
+    
+    int mid = aN/2;
+    forward_row(a, b, mid, bN, c, F);
+    backward_row(a+mid, b, aN-mid, bN, c, R);
+    
+    int k = 0;
+    double best = F[0] + R[0];
+    for (int j=1; j<=bN; j++){
+        if (F[j] + R[j]<best){
+            best = F[j] + R[j];
+            k = j;
+        }
+    }
+    
+    n = hirschberg(a, b, mid, k, c, ops, F, R);
+    n += hirschberg(a+mid, b+k, aN-mid, bN-k, c, ops+n, F, R);
+    return n;
+}
+
+
+int hirschberg_alignment(const char* a, const char* b, 
+                         int aN, int bN, 
+                         const Costs* c, 
+                         char* ops, 
+                         double* dist
+                        ){
+    double* F = malloc(sizeof(double)*(bN+1)*2);
+    if (F==NULL){return -1;}
+    
+    int n = hirschberg(a, b, aN, bN, c, ops, F, F+bN+1);
+    free(F);
+    
+    double d = 0.;
+    int i = 0;
+    int j = 0;
+    for (int k=0; k<n; k++){
+        if (ops[k]=='I'){d += ins_cost(c, b[j++]);}
+        else if (ops[k]=='D'){d += rm_cost(c, a[i++]);}
+        else {d += sub_cost(c, a[i++], b[j++]);}
+    }
+    *dist = d;
+    
+    return n;
+}
@@ -0,0 +1,313 @@
+from typing import Iterable, List, Tuple, Union
+from pathlib import Path
+import heapq
+import random
+import numpy as np
+
+from .levenshtein import Sequence, _encode
+from .levenshtein._levenshtein import c_levenshtein
+
+
+
+BK_TREE = 'bk'
+VP_TREE = 'vp'
+
+
+class SequenceIndex:
+    """
+    Metric tree over sequences for levenshtein distance range and nearest neighbour queries.
+    BK-tree is built for integer weights, VP-tree for all other weights.
+    Weights must be symmetric (ins==rm) for levenshtein distance to be a metric.
+    """
+
+    def __init__(self, seqs: Iterable[Sequence], *,
+                 ins: float = 1.,
+                 rm: float = 1.,
+                 sub: float = 1.,
+                 seed: int = 0
+                ):
+        """
+        :param seqs: ascii strings, NucleicAcids or bytes-like sequences.
+        :param ins: insert weight.
+        :param rm: delete(remove) weight.
+        :param sub: substitute weight.
+        :param seed: random seed for VP-tree vantage points selection.
+        """
+
+        ins, rm, sub = float(ins), float(rm), float(sub)
+        if ins!=rm:
+            raise ValueError(f"Index requires symmetric distance, got ins={ins} and rm={rm}")
+        if ins<=0 or sub<=0:
+            raise ValueError("Weights must be positive")
+
+        self._weights = (ins, rm, sub)
+        self._seqs = [bytes(_encode(s)) for s in seqs] # buffers are copied, index must not change with them
+        self.kind = BK_TREE if all([w.is_integer() for w in self._weights]) else VP_TREE
+
+        if self.kind==BK_TREE:
+            self._build_bk()
+        else:
+            self._build_vp(seed)
+
+
+    def _dist(self, a: bytes, b: bytes) -> float:
+        ins, rm, sub = self._weights
+        if len(a)==0 or len(b)==0:
+            return float(len(a)*rm + len(b)*ins)
+        return c_levenshtein(a, b, ins, rm, sub)
+
+
+    def __len__(self):
+        return len(self._seqs)
+
+
+    def __getitem__(self, idx: int) -> str:
+        return self._seqs[idx].decode('ascii')
+
+    ################################  BK-tree
+
+    def _build_bk(self):
+        n = len(self._seqs)
+        self._parent = np.full(n, -1, dtype=np.int64)
+        self._parent_dist = np.zeros(n, dtype=np.float64)
+        self._children = [{} for _ in range(n)]
+
+        for i in range(1, n):
+            node = 0
+            while True:
+                d = self._dist(self._seqs[node], self._seqs[i])
+                child = self._children[node].get(d)
+                if child is None:
+                    self._children[node][d] = i
+                    self._parent[i] = node
+                    self._parent_dist[i] = d
+                    break
+                node = child
+
+
+    def _restore_bk(self, parent: np.ndarray, parent_dist: np.ndarray):
+        self._parent = parent
+        self._parent_dist = parent_dist
+        self._children = [{} for _ in range(len(parent))]
+        for i in range(1, len(parent)):
+            self._children[parent[i]][float(parent_dist[i])] = i
+
+
+    def _bk_range(self, q: bytes, k: float) -> List[Tuple[int, float]]:
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            d = self._dist(q, self._seqs[node])
+            if d<=k:
+                found.append((node, d))
+
+            for cd, child in self._children[node].items():
+                if d-k<=cd<=d+k:
+                    stack.append(child)
+
+        return found
+
+
+    def _bk_knn(self, q: bytes, k: int) -> List[Tuple[float, int]]:
+        best = [] # max heap of (-dist, -idx)
+        tau = np.inf
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            d = self._dist(q, self._seqs[node])
+            if len(best)<k:
+                heapq.heappush(best, (-d, -node))
+            elif (d, node)<(-best[0][0], -best[0][1]):
+                heapq.heapreplace(best, (-d, -node))
+            if len(best)==k:
+                tau = -best[0][0]
+
+            # push farthest first to visit closest children first
+            children = [(abs(cd-d), child) for cd, child in self._children[node].items() if abs(cd-d)<=tau]
+            children.sort(reverse=True)
+            stack.extend([child for _, child in children])
+
+        return [(-d, -i) for d, i in best]
+
+    ################################  VP-tree
+
+    def _build_vp(self, seed: int):
+        n = len(self._seqs)
+        rng = random.Random(seed)
+        self._vp_item = np.full(n, -1, dtype=np.int64)
+        self._vp_mu = np.zeros(n, dtype=np.float64)
+        self._vp_left = np.full(n, -1, dtype=np.int64)
+        self._vp_right = np.full(n, -1, dtype=np.int64)
+        if n==0:
+            return
+
+        n_nodes = 1
+        stack = [(0, list(range(n)))]
+        while stack:
+            node, items = stack.pop()
+            vp = items.pop(rng.randrange(len(items)))
+            self._vp_item[node] = vp
+            if not items:
+                continue
+
+            dists = np.array([self._dist(self._seqs[vp], self._seqs[i]) for i in items])
+            mu = float(np.median(dists))
+            self._vp_mu[node] = mu
+
+            inside = [i for i, d in zip(items, dists) if d<=mu]
+            outside = [i for i, d in zip(items, dists) if d>mu]
+            if inside:
+                self._vp_left[node] = n_nodes
+                stack.append((n_nodes, inside))
+                n_nodes += 1
+            if outside:
+                self._vp_right[node] = n_nodes
+                stack.append((n_nodes, outside))
+                n_nodes += 1
+
+
+    def _vp_range(self, q: bytes, k: float) -> List[Tuple[int, float]]:
+        found = []
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            item = self._vp_item[node]
+            d = self._dist(q, self._seqs[item])
+            if d<=k:
+                found.append((int(item), d))
+
+            mu = self._vp_mu[node]
+            if self._vp_left[node]>=0 and d-k<=mu:
+                stack.append(self._vp_left[node])
+            if self._vp_right[node]>=0 and d+k>mu:
+                stack.append(self._vp_right[node])
+
+        return found
+
+
+    def _vp_knn(self, q: bytes, k: int) -> List[Tuple[float, int]]:
+        best = [] # max heap of (-dist, -idx)
+        tau = np.inf
+        stack = [0] if len(self) else []
+        while stack:
+            node = stack.pop()
+            item = int(self._vp_item[node])
+            d = self._dist(q, self._seqs[item])
+            if len(best)<k:
+                heapq.heappush(best, (-d, -item))
+            elif (d, item)<(-best[0][0], -best[0][1]):
+                heapq.heapreplace(best, (-d, -item))
+            if len(best)==k:
+                tau = -best[0][0]
+
+            mu = self._vp_mu[node]
+            left, right = self._vp_left[node], self._vp_right[node]
+            visit_left = left>=0 and d-tau<=mu
+            visit_right = right>=0 and d+tau>mu
+            # nearest side is pushed last to be visited first
+            if d<=mu:
+                if visit_right: stack.append(right)
+                if visit_left: stack.append(left)
+            else:
+                if visit_left: stack.append(left)
+                if visit_right: stack.append(right)
+
+        return [(-d, -i) for d, i in best]
+
+    ################################  Queries
+
+    def range(self, query: Sequence, k: float) -> List[Tuple[int, float]]:
+        """
+        Finds all indexed sequences within distance k from query.
+
+        :param query: ascii string, NucleicAcid or bytes-like sequence.
+        :param k: maximum distance.
+
+        :return: list of (index, distance) sorted by distance.
+        """
+
+        q = _encode(query)
+        if len(self)==0:
+            return []
+
+        if self.kind==BK_TREE:
+            found = self._bk_range(q, k)
+        else:
+            found = self._vp_range(q, k)
+
+        return sorted(found, key=lambda x: (x[1], x[0]))
+
+
+    def knn(self, query: Sequence, k: int) -> List[Tuple[int, float]]:
+        """
+        Finds k nearest indexed sequences to query, ties are resolved by lower index.
+
+        :param query: ascii string, NucleicAcid or bytes-like sequence.
+        :param k: number of neighbours.
+
+        :return: list of (index, distance) sorted by distance.
+        """
+
+        if k<1:
+            raise ValueError("Number of neighbours must be positive")
+
+        q = _encode(query)
+        if len(self)==0:
+            return []
+
+        if self.kind==BK_TREE:
+            best = self._bk_knn(q, k)
+        else:
+            best = self._vp_knn(q, k)
+
+        return [(i, d) for d, i in sorted(best)]
+
+    ################################  IO
+
+    def save(self, path: Union[str, Path]):
+        """
+        Saves index into numpy .npz archive.
+        """
+
+        lengths = np.array([len(s) for s in self._seqs], dtype=np.int64)
+        data = dict(
+            kind=np.array(self.kind),
+            weights=np.array(self._weights, dtype=np.float64),
+            seqs=np.frombuffer(b''.join(self._seqs), dtype=np.uint8),
+            offsets=np.concatenate([[0], np.cumsum(lengths)])
+        )
+        if self.kind==BK_TREE:
+            data.update(parent=self._parent, parent_dist=self._parent_dist)
+        else:
+            data.update(vp_item=self._vp_item, vp_mu=self._vp_mu,
+                        vp_left=self._vp_left, vp_right=self._vp_right)
+
+        with open(path, 'wb') as f:
+            np.savez(f, **data)
+
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'SequenceIndex':
+        """
+        Loads index saved with SequenceIndex.save.
+        """
+
+        with np.load(path, allow_pickle=False) as data:
+            index = cls.__new__(cls)
+            index.kind = str(data['kind'])
+            index._weights = tuple([float(w) for w in data['weights']])
+
+            seqs = data['seqs'].tobytes()
+            offsets = data['offsets']
+            index._seqs = [seqs[offsets[i]:offsets[i+1]] for i in range(len(offsets)-1)]
+
+            if index.kind==BK_TREE:
+                index._restore_bk(data['parent'], data['parent_dist'])
+            else:
+                index._vp_item = data['vp_item']
+                index._vp_mu = data['vp_mu']
+                index._vp_left = data['vp_left']
+                index._vp_right = data['vp_right']
+
+        return index
@@ -0,0 +1,230 @@
+from collections import namedtuple
+from typing import Iterable, Optional, Union
+import numpy as np
+
+from ..containers import NucleicAcid
+
+
+
+MAX_HASH = np.iinfo(np.uint64).max
+CHUNK_KMERS = 1<<16 # k-mers hashed at once, bounds (CHUNK_KMERS x num_perm) temporary matrix
+
+
+def _as_uint8(seq: Union[str, NucleicAcid]) -> np.ndarray:
+    if isinstance(seq, NucleicAcid):
+        return np.frombuffer(seq.seq_bytes, dtype=np.uint8)
+    return np.frombuffer(seq.encode('ascii'), dtype=np.uint8)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def kmer_hashes(seq: Union[str, NucleicAcid], k: int) -> np.ndarray:
+    """
+    Computes 64 bit hashes of all k-mers of sequence.
+
+    :param seq: ascii string or NucleicAcid.
+    :param k: k-mer length.
+
+    :return: uint64 numpy vector of len(seq)-k+1 hashes.
+    """
+
+    arr = _as_uint8(seq).astype(np.uint64)
+    n = len(arr) - k + 1
+    if n<=0:
+        return np.zeros(0, dtype=np.uint64)
+
+    h = np.zeros(n, dtype=np.uint64)
+    for i in range(k):
+        h = h*np.uint64(257) + arr[i:i+n]
+    return _mix64(h)
+
+
+def _permutations(num_perm: int, seed: int):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MAX_HASH, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, MAX_HASH, size=num_perm, dtype=np.uint64, endpoint=True)
+    return a, b
+
+
+def minhash(seqs: Iterable[Union[str, NucleicAcid]],
+            k: int = 5,
+            num_perm: int = 64,
+            seed: int = 0
+           ) -> np.ndarray:
+    """
+    Computes k-mer MinHash sketches of sequences.
+
+    :param seqs: ascii strings or NucleicAcids.
+    :param k: k-mer length.
+    :param num_perm: number of hash permutations (sketch size).
+    :param seed: random seed of permutations, sketches are comparable only with equal seed.
+
+    :return: uint64 numpy matrix (len(seqs), num_perm). Sequences shorter than k have all values set to maximum.
+    """
+
+    if k<1 or num_perm<1:
+        raise ValueError("k and num_perm must be positive")
+
+    a, b = _permutations(num_perm, seed)
+    hashes = [kmer_hashes(s, k) for s in seqs]
+    sketches = np.full((len(hashes), num_perm), MAX_HASH, dtype=np.uint64)
+
+    start = 0
+    while start<len(hashes):
+        # group sequences into chunks of about CHUNK_KMERS k-mers
+        end, total = start, 0
+        while end<len(hashes) and (total==0 or total+len(hashes[end])<=CHUNK_KMERS):
+            total += len(hashes[end])
+            end += 1
+
+        lengths = np.array([len(h) for h in hashes[start:end]])
+        rows = np.nonzero(lengths)[0]
+        if len(rows):
+            h = np.concatenate(hashes[start:end])
+            perm = a[:, None]*h + b[:, None] # (num_perm, kmers), reduced along contiguous axis
+            offsets = np.concatenate([[0], np.cumsum(lengths[rows])[:-1]])
+            sketches[start + rows] = np.minimum.reduceat(perm, offsets, axis=1).T
+        start = end
+
+    return sketches
+
+
+def lsh_probability(similarity: Union[float, np.ndarray], bands: int, rows: int) -> Union[float, np.ndarray]:
+    """
+    Probability of a pair with given Jaccard similarity to become LSH candidate.
+    """
+    return 1 - (1 - np.power(similarity, rows))**bands
+
+
+def lsh_candidates(sketches: np.ndarray, bands: int) -> np.ndarray:
+    """
+    Finds candidate pairs sharing at least one identical band of MinHash sketch.
+
+    :param sketches: matrix returned by minhash.
+    :param bands: number of bands, must divide sketch size.
+
+    :return: int64 numpy matrix (n_pairs, 2) of unique sorted pairs with i<j.
+    """
+
+    n, num_perm = sketches.shape
+    if bands<1 or num_perm%bands!=0:
+        raise ValueError(f"Number of bands must divide sketch size {num_perm}, got {bands}")
+    rows = num_perm//bands
+
+    valid = np.nonzero(np.any(sketches!=MAX_HASH, axis=1))[0] # skip sequences without k-mers
+    pairs = []
+    for band in range(bands):
+        keys = np.zeros(len(valid), dtype=np.uint64)
+        for r in range(band*rows, (band+1)*rows):
+            keys = _mix64(keys ^ sketches[valid, r])
+
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        bounds = np.nonzero(np.diff(keys))[0] + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(keys)]])
+
+        for s, e in zip(starts[(ends-starts)>1], ends[(ends-starts)>1]):
+            bucket = valid[order[s:e]]
+            i, j = np.triu_indices(len(bucket), 1)
+            pairs.append(np.stack([bucket[i], bucket[j]], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0).astype(np.int64)
+
+
+def _similarity_func(metric: str):
+    from ..metrics import levsim, sublevsim
+
+    if metric=='levsim':
+        return levsim
+    if metric=='sublevsim':
+        return sublevsim
+    raise ValueError(f"Unknown metric {metric}, available - levsim, sublevsim")
+
+
+NearDuplicates = namedtuple("NearDuplicates", ["pairs", "similarity"])
+
+def near_duplicates(seqs: Iterable[Union[str, NucleicAcid]],
+                    threshold: float, *,
+                    metric: str = 'levsim',
+                    k: int = 5,
+                    num_perm: int = 64,
+                    bands: int = 16,
+                    seed: int = 0
+                   ) -> NearDuplicates:
+    """
+    Finds pairs of sequences with similarity >= threshold.
+    Candidate pairs are generated with MinHash LSH and verified with exact metric.
+
+    :param seqs: ascii strings or NucleicAcids.
+    :param threshold: minimum similarity.
+    :param metric: verification metric - levsim or sublevsim. Default - levsim.
+    :param k: k-mer length.
+    :param num_perm: sketch size.
+    :param bands: number of LSH bands.
+    :param seed: random seed of permutations.
+
+    :return: NearDuplicates with (n_pairs, 2) pairs matrix and similarity vector.
+    """
+
+    sim_func = _similarity_func(metric)
+    seqs = [s.seq if isinstance(s, NucleicAcid) else s for s in seqs]
+
+    sketches = minhash(seqs, k=k, num_perm=num_perm, seed=seed)
+    candidates = lsh_candidates(sketches, bands)
+
+    similarity = np.array([sim_func(seqs[i], seqs[j]) for i, j in candidates], dtype=np.float64)
+    mask = similarity>=threshold
+    return NearDuplicates(pairs=candidates[mask], similarity=similarity[mask])
+
+
+LSHRecall = namedtuple("LSHRecall", ["recall", "found", "total"])
+
+def lsh_recall(seqs: Iterable[Union[str, NucleicAcid]],
+               pairs: np.ndarray,
+               threshold: float, *,
+               metric: str = 'levsim',
+               sample: Optional[int] = None,
+               seed: int = 0
+              ) -> LSHRecall:
+    """
+    Estimates recall of found pairs against exact all-vs-all search.
+
+    :param seqs: ascii strings or NucleicAcids used for search.
+    :param pairs: found pairs, e.g. NearDuplicates.pairs.
+    :param threshold: minimum similarity.
+    :param metric: levsim or sublevsim. Default - levsim.
+    :param sample: number of randomly sampled sequences for exact search, all pairs within sample are compared. Default - all sequences.
+    :param seed: random seed of sample.
+
+    :return: LSHRecall with recall value, number of found and total true pairs.
+    """
+
+    sim_func = _similarity_func(metric)
+    seqs = [s.seq if isinstance(s, NucleicAcid) else s for s in seqs]
+
+    idx = np.arange(len(seqs))
+    if sample is not None and sample<len(seqs):
+        idx = np.sort(np.random.default_rng(seed).choice(len(seqs), size=sample, replace=False))
+
+    true_pairs = set()
+    for a in range(len(idx)):
+        for b in range(a+1, len(idx)):
+            i, j = idx[a], idx[b]
+            if sim_func(seqs[i], seqs[j])>=threshold:
+                true_pairs.add((int(i), int(j)))
+
+    found = true_pairs & set([(int(min(i, j)), int(max(i, j))) for i, j in pairs])
+    recall = len(found)/len(true_pairs) if true_pairs else 1.
+    return LSHRecall(recall=recall, found=len(found), total=len(true_pairs))
@@ -0,0 +1,147 @@
+from ._tree_edit import c_tree_edit_batch
+from collections import namedtuple
+from typing import Iterable, Optional, Union
+import numpy as np
+
+from ...containers import NucleicAcid, Hairpin, InternalLoop, Bulge, Junction
+from ...parse_na import NA
+
+
+
+EXTERIOR, HELIX, HAIRPIN, INTERNAL_LOOP, BULGE, JUNCTION = range(6)
+LOOP_TYPES = ((Hairpin, HAIRPIN), (InternalLoop, INTERNAL_LOOP), (Bulge, BULGE), (Junction, JUNCTION))
+
+
+LoopTree = namedtuple("LoopTree", ["types", "sizes", "lml"])
+
+def loop_tree(na: Union[str, NucleicAcid]) -> LoopTree:
+    """
+    Builds coarse grained helix/loop tree of NucleicAcid (pseudoknot helixes are omitted).
+    Root is the exterior loop, each helix has its closing loop as a child,
+    each loop has helixes branching from it as children.
+    Helix size is number of pairs, loop size is number of unpaired nbs.
+
+    :param na: NucleicAcid or dot bracket string.
+
+    :return: LoopTree of postorder node types, sizes and leftmost leaf descendant indexes.
+    """
+
+    na = NA(na)
+
+    knots = set(na.knots)
+    helixes = [h for i, h in enumerate(na.helixes) if i not in knots]
+    loops = na.loops # one loop for each non knot helix in the same order
+    helix_by_root = {h[0]:i for i, h in enumerate(helixes)}
+
+    children = [[] for _ in range(len(helixes))]
+    branched = set()
+    for i, l in enumerate(loops):
+        for b in l.branches[1:]: # first branch is the closing pair
+            children[i].append(helix_by_root[b])
+            branched.add(helix_by_root[b])
+    top = [i for i in range(len(helixes)) if i not in branched]
+
+    paired = 2*len(na.pairs) - 2*len(na.knot_pairs)
+    exterior = len(na) - paired - sum([len(l.nts) - 2*len(l.branches) for l in loops])
+
+    types, sizes, lml = [], [], []
+
+    def add_node(t, size, leftmost):
+        types.append(t)
+        sizes.append(size)
+        lml.append(len(types)-1 if leftmost is None else leftmost)
+        return lml[-1]
+
+    def add_helix(i):
+        # postorder: helix -> loop -> branches
+        leftmost = None
+        for c in children[i]:
+            l = add_helix(c)
+            leftmost = l if leftmost is None else leftmost
+
+        l = loops[i]
+        loop_type = [t for cls, t in LOOP_TYPES if isinstance(l, cls)][0]
+        leftmost = add_node(loop_type, len(l.nts) - 2*len(l.branches), leftmost)
+        _ = add_node(HELIX, len(helixes[i]), leftmost)
+        return leftmost
+
+    leftmost = None
+    for i in top:
+        l = add_helix(i)
+        leftmost = l if leftmost is None else leftmost
+    _ = add_node(EXTERIOR, exterior, leftmost)
+
+    return LoopTree(types=np.array(types, dtype=np.int32),
+                    sizes=np.array(sizes, dtype=np.float64),
+                    lml=np.array(lml, dtype=np.int32))
+
+
+def _forest(trees):
+    offsets = np.zeros(len(trees)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(t.types) for t in trees])
+    return (np.concatenate([t.types for t in trees]),
+            np.concatenate([t.sizes for t in trees]),
+            np.concatenate([t.lml for t in trees]),
+            offsets)
+
+
+def tree_edit_distance_matrix(nas: Iterable[Union[str, NucleicAcid, LoopTree]],
+                              other: Optional[Iterable[Union[str, NucleicAcid, LoopTree]]] = None, *,
+                              ins: float = 1.,
+                              rm: float = 1.,
+                              sub: float = 1.,
+                              size: float = 0.
+                             ) -> np.ndarray:
+    """
+    Computes Zhang-Shasha tree edit distance between loop trees of all structures.
+    Insert and delete costs of node are ins/rm + size*node_size,
+    relabel cost is sub for different node types plus size*|size difference|.
+
+    :param nas: NucleicAcids, dot bracket strings or LoopTrees.
+    :param other: second set of structures. Default - nas.
+    :param ins: node insert weight.
+    :param rm: node delete(remove) weight.
+    :param sub: node type substitute weight.
+    :param size: weight of node size.
+
+    :return: float64 numpy matrix (len(nas), len(other)).
+    """
+
+    a = [t if isinstance(t, LoopTree) else loop_tree(t) for t in nas]
+    b = a if other is None else [t if isinstance(t, LoopTree) else loop_tree(t) for t in other]
+    if len(a)==0 or len(b)==0:
+        return np.zeros((len(a), len(b)), dtype=np.float64)
+
+    types, sizes, lml, offsets = _forest(a + b)
+    a_offsets, b_offsets = offsets[:len(a)+1], offsets[len(a):]
+
+    res = c_tree_edit_batch(types.tobytes(), sizes.tobytes(), lml.tobytes(),
+                            a_offsets.tobytes(), b_offsets.tobytes(),
+                            float(ins), float(rm), float(sub), float(size))
+    return np.frombuffer(res, dtype=np.float64).reshape(len(a), len(b)).copy()
+
+
+def tree_edit_distance(a: Union[str, NucleicAcid, LoopTree],
+                       b: Union[str, NucleicAcid, LoopTree],
+                       ins: float = 1.,
+                       rm: float = 1.,
+                       sub: float = 1.,
+                       size: float = 0.
+                      ) -> float:
+    """
+    Computes Zhang-Shasha tree edit distance between loop trees of two structures.
+
+    :param a: first NucleicAcid, dot bracket string or LoopTree.
+    :param b: second NucleicAcid, dot bracket string or LoopTree.
+    :param ins: node insert weight.
+    :param rm: node delete(remove) weight.
+    :param sub: node type substitute weight.
+    :param size: weight of node size.
+
+    :return: distance float value.
+    """
+
+    return float(tree_edit_distance_matrix([a], [b], ins=ins, rm=rm, sub=sub, size=size)[0, 0])
+
+
+__all__ = ["loop_tree", "LoopTree", "tree_edit_distance", "tree_edit_distance_matrix"]
@@ -0,0 +1,229 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+
+
+
+int forest_tree_edit(const int32_t* types, const double* sizes, const int32_t* lml,
+                     const int64_t* a_offsets, Py_ssize_t aN,
+                     const int64_t* b_offsets, Py_ssize_t bN,
+                     double ins, double rm, double sub, double size_w,
+                     double* out
+                    );
+
+PyObject *Py_tree_edit_batch(PyObject *self, PyObject *args){
+    const char* types;
+    const char* sizes;
+    const char* lml;
+    const char* a_offsets;
+    const char* b_offsets;
+    Py_ssize_t types_len, sizes_len, lml_len, a_len, b_len;
+    double ins;
+    double rm;
+    double sub;
+    double size_w;
+
+    if (!PyArg_ParseTuple(args, "y#y#y#y#y#dddd",
+                          &types, &types_len, &sizes, &sizes_len, &lml, &lml_len,
+                          &a_offsets, &a_len, &b_offsets, &b_len,
+                          &ins, &rm, &sub, &size_w))
+        return NULL;
+
+    Py_ssize_t aN = a_len/sizeof(int64_t) - 1;
+    Py_ssize_t bN = b_len/sizeof(int64_t) - 1;
+    if (aN<0 || bN<0){
+        PyErr_SetString(PyExc_ValueError, "Offsets must contain at least one value");
+        return NULL;
+    }
+
+    PyObject* res = PyBytes_FromStringAndSize(NULL, sizeof(double)*aN*bN);
+    if (res==NULL)
+        return NULL;
+
+    int status;
+    Py_BEGIN_ALLOW_THREADS
+    status = forest_tree_edit((const int32_t*)types, (const double*)sizes, (const int32_t*)lml,
+                              (const int64_t*)a_offsets, aN, (const int64_t*)b_offsets, bN,
+                              ins, rm, sub, size_w,
+                              (double*)PyBytes_AS_STRING(res));
+    Py_END_ALLOW_THREADS
+
+    if (status!=0){
+        Py_DECREF(res);
+        return PyErr_NoMemory();
+    }
+
+    return res;
+}
+
+
+static PyMethodDef methods[] = {
+    {
+        "c_tree_edit_batch",
+        Py_tree_edit_batch,
+        METH_VARARGS,
+        "Computes tree edit distance between every pair of trees from two sets"
+     },
+    {NULL, NULL, 0, NULL}
+};
+
+
+static struct PyModuleDef _tree_edit = {
+    PyModuleDef_HEAD_INIT,
+    "_tree_edit",
+    "C implementation of Zhang-Shasha tree edit distance",
+    -1,
+    methods
+};
+
+
+PyMODINIT_FUNC PyInit__tree_edit(){
+    return PyModule_Create(&_tree_edit);
+};
+
+// ###
+
+typedef struct {
+    int n;
+    const int32_t* types;
+    const double* sizes;
+    const int32_t* lml; // leftmost leaf descendant in postorder
+} Tree;
+
+
+static inline double tmin(double a, double b, double c){
+    double s;
+    if (a<b){s = a;} else {s = b;}
+    if (c<s){return c;} else {return s;}
+}
+
+
+static int keyroots(const Tree* t, int* kr){
+    // node is a keyroot if no node with greater index has the same leftmost leaf
+    int k = 0;
+    for (int i=0; i<t->n; i++){
+        int is_keyroot = 1;
+        for (int j=i+1; j<t->n; j++){
+            if (t->lml[j]==t->lml[i]){is_keyroot = 0; break;}
+        }
+        if (is_keyroot){kr[k++] = i;}
+    }
+    return k;
+}
+
+
+static double tree_edit(const Tree* a, const Tree* b,
+                        const int* akr, int akrN, const int* bkr, int bkrN,
+                        double ins, double rm, double sub, double size_w,
+                        double* td, double* fd
+                       ){
+    int bW = b->n + 1;
+
+    for (int ki=0; ki<akrN; ki++){
+        int i = akr[ki];
+        int li = a->lml[i];
+
+        for (int kj=0; kj<bkrN; kj++){
+            int j = bkr[kj];
+            int lj = b->lml[j];
+
+            fd[0] = 0.;
+            for (int x=li; x<=i; x++){
+                fd[(x-li+1)*bW] = fd[(x-li)*bW] + rm + size_w*a->sizes[x];
+            }
+            for (int y=lj; y<=j; y++){
+                fd[y-lj+1] = fd[y-lj] + ins + size_w*b->sizes[y];
+            }
+
+            for (int x=li; x<=i; x++){
+                int dx = x-li+1;
+                double del = rm + size_w*a->sizes[x];
+
+                for (int y=lj; y<=j; y++){
+                    int dy = y-lj+1;
+                    double add = ins + size_w*b->sizes[y];
+
+                    if (a->lml[x]==li && b->lml[y]==lj){
+                        double ren = size_w*fabs(a->sizes[x] - b->sizes[y]);
+                        if (a->types[x]!=b->types[y]){ren += sub;}
+
+                        double d = tmin(fd[(dx-1)*bW + dy] + del,
+                                        fd[dx*bW + dy-1] + add,
+                                        fd[(dx-1)*bW + dy-1] + ren);
+                        fd[dx*bW + dy] = d;
+                        td[x*b->n + y] = d;
+                    } else {
+                        int p = a->lml[x] - li;
+                        int q = b->lml[y] - lj;
+                        fd[dx*bW + dy] = tmin(fd[(dx-1)*bW + dy] + del,
+                                              fd[dx*bW + dy-1] + add,
+                                              fd[p*bW + q] + td[x*b->n + y]);
+                    }
+                }
+            }
+        }
+    }
+
+    return td[(a->n-1)*b->n + b->n-1];
+}
+
+
+int forest_tree_edit(const int32_t* types, const double* sizes, const int32_t* lml,
+                     const int64_t* a_offsets, Py_ssize_t aN,
+                     const int64_t* b_offsets, Py_ssize_t bN,
+                     double ins, double rm, double sub, double size_w,
+                     double* out
+                    ){
+    int max_a = 1;
+    int max_b = 1;
+    for (Py_ssize_t i=0; i<aN; i++){
+        int n = (int)(a_offsets[i+1] - a_offsets[i]);
+        if (n>max_a){max_a = n;}
+    }
+    for (Py_ssize_t j=0; j<bN; j++){
+        int n = (int)(b_offsets[j+1] - b_offsets[j]);
+        if (n>max_b){max_b = n;}
+    }
+
+    // buffers are allocated once for the whole batch
+    double* td = malloc(sizeof(double)*max_a*max_b);
+    double* fd = malloc(sizeof(double)*(max_a+1)*(max_b+1));
+    int* akr = malloc(sizeof(int)*max_a);
+    int* bkr = malloc(sizeof(int)*max_b*bN);
+    int* bkrN = malloc(sizeof(int)*(bN+1));
+    if (td==NULL || fd==NULL || akr==NULL || bkr==NULL || bkrN==NULL){
+        free(td); free(fd); free(akr); free(bkr); free(bkrN);
+        return -1;
+    }
+
+    Tree* b_trees = malloc(sizeof(Tree)*(bN+1));
+    if (b_trees==NULL){
+        free(td); free(fd); free(akr); free(bkr); free(bkrN);
+        return -1;
+    }
+    for (Py_ssize_t j=0; j<bN; j++){
+        Tree* t = b_trees + j;
+        t->n = (int)(b_offsets[j+1] - b_offsets[j]);
+        t->types = types + b_offsets[j];
+        t->sizes = sizes + b_offsets[j];
+        t->lml = lml + b_offsets[j];
+        bkrN[j] = keyroots(t, bkr + j*max_b);
+    }
+
+    for (Py_ssize_t i=0; i<aN; i++){
+        Tree a;
+        a.n = (int)(a_offsets[i+1] - a_offsets[i]);
+        a.types = types + a_offsets[i];
+        a.sizes = sizes + a_offsets[i];
+        a.lml = lml + a_offsets[i];
+        int akrN = keyroots(&a, akr);
+
+        for (Py_ssize_t j=0; j<bN; j++){
+            out[i*bN + j] = tree_edit(&a, b_trees + j, akr, akrN, bkr + j*max_b, bkrN[j],
+                                      ins, rm, sub, size_w, td, fd);
+        }
+    }
+
+    free(td); free(fd); free(akr); free(bkr); free(bkrN); free(b_trees);
+    return 0;
+}
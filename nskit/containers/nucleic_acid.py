@@ -47,6 +47,14 @@ class NucleicAcid(NucleicAcidGraph, DrawNA):
         return ''.join(self._nodes)
     
     
+    @cached_property
+    def seq_bytes(self) -> bytes:
+        """
+        Ascii encoded sequence, cached to be passed to C kernels without copies.
+        """
+        return self.seq.encode('ascii')
+    
+    
     @cached_property
     def struct(self) -> str:
         return self.assemble_dot_structure()
@@ -17,6 +17,15 @@ class NucleicAcidGraph(SimplifiedLinearGraph):
     
     def __init__(self):
         super().__init__()
+        self._graph_version = 0
+        
+        
+    @property
+    def graph_version(self) -> int:
+        """
+        Number of graph edits, caches derived from complementary bonds are valid for one version.
+        """
+        return self._graph_version
         
         
     def complnb(self, n: int) -> Optional[int]:
@@ -97,6 +106,7 @@ class NucleicAcidGraph(SimplifiedLinearGraph):
 
 
     def clear_graph_cache(self):
+        self._graph_version += 1
         for key in self.GRAPH_CACHE_KEYS:
             if key in self.__dict__:
                 del self.__dict__[key]
@@ -1,4 +1,9 @@
 from .fragment_count import FragmentCount, FragmentFingerprint
+from .fragment_descriptor import FragmentDescriptor
+from .sparse import SparseDescriptors, SparseDescriptorsWriter, sparse_descriptors
+from .pipeline import compute_to_file
+from .cache import DescriptorCache, na_digest
+from .fingerprint_index import FingerprintIndex
 
 
-__all__ = ['FragmentCount', 'FragmentFingerprint']
\ No newline at end of file
+__all__ = ['FragmentCount', 'FragmentFingerprint', 'FragmentDescriptor', 'SparseDescriptors', 'SparseDescriptorsWriter', 'sparse_descriptors', 'compute_to_file', 'DescriptorCache', 'na_digest', 'FingerprintIndex']
\ No newline at end of file
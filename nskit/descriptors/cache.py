@@ -0,0 +1,249 @@
+from typing import Callable, Iterable, List, Optional, Union
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+import hashlib
+import inspect
+import sqlite3
+import os
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+
+
+
+DIGEST_SIZE = 16
+MAXSIZE = 100000
+SQLITE_TIMEOUT = 60.
+SQLITE_MAX_VARIABLES = 900 # keys selected by one query
+
+
+def na_digest(na: NucleicAcid, digest_size: int = DIGEST_SIZE) -> bytes:
+    """
+    Stable blake2b digest of NucleicAcid sequence and complementary pairs, same identity as NucleicAcid hash.
+    Unlike hash(), digest does not change between processes and runs.
+
+    :param na: NucleicAcid object.
+    :param digest_size: digest size in bytes (8 - 64 bit, 16 - 128 bit).
+
+    :return: digest bytes.
+    """
+
+    h = hashlib.blake2b(na.seq_bytes, digest_size=digest_size)
+    h.update(b'|')
+    h.update(np.array(na.pairs, dtype=np.int32).tobytes())
+    return h.digest()
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "disk_hits", "misses", "size"])
+
+
+class DescriptorCache:
+    """
+    Memoized descriptor computation keyed by NucleicAcid content digest:
+    NucleicAcids with the same sequence and pairs share one vector regardless of name and meta.
+    Vectors are kept in memory LRU and optionally in sqlite file shared by processes.
+    """
+
+    def __init__(self, descriptor: Optional[Callable] = None, *,
+                 maxsize: int = MAXSIZE,
+                 path: Optional[Union[str, Path]] = None,
+                 digest_size: int = DIGEST_SIZE,
+                 namespace: Optional[str] = None,
+                 **kwargs
+                ):
+        """
+        :param descriptor: descriptor function with batch method. Default - FragmentCount.
+        :param maxsize: maximum number of vectors in memory, 0 - no memory cache.
+        :param path: sqlite file of on-disk store. Default - memory only.
+        :param digest_size: digest size in bytes.
+        :param namespace: name of descriptor vectors in on-disk store. Default - descriptor name and arguments,
+            for descriptor objects also digest of their spec (e.g. FragmentDescriptor config).
+            Required for on-disk store of descriptor objects without spec, e.g. config with lambda functions.
+        :param kwargs: descriptor arguments, e.g. with_knot_features.
+        """
+
+        if descriptor is None:
+            from .fragment_count import FragmentCount
+            descriptor = FragmentCount
+
+        self.descriptor = descriptor
+        self.kwargs = kwargs
+        self.maxsize = maxsize
+        self.path = None if path is None else Path(path)
+        self.digest_size = digest_size
+
+        empty = descriptor.batch([], **kwargs)
+        self._dtype, self._n_features = empty.dtype, empty.shape[1]
+        # vectors of different descriptors and arguments are stored apart in one file
+        if namespace is None:
+            namespace = self._default_namespace(descriptor, kwargs, self.path is not None)
+        self._namespace = namespace
+
+        self._lru = OrderedDict()
+        self._hits = self._disk_hits = self._misses = 0
+        self._connection = None
+        self._pid = None
+
+
+    @staticmethod
+    def _default_namespace(descriptor: Callable, kwargs: dict, stored: bool) -> str:
+        # functions and classes are identified by import name, objects by digest of their configuration
+        if isinstance(descriptor, type) or inspect.isroutine(descriptor):
+            return f"{descriptor.__module__}.{descriptor.__qualname__}{sorted(kwargs.items())}"
+        spec = getattr(descriptor, 'spec', None)
+        if spec is None:
+            if stored:
+                raise ValueError(f"Configuration of {type(descriptor).__qualname__} object can't be identified, "
+                                 "set namespace of its vectors in on-disk store")
+            spec = str(id(descriptor))
+        digest = hashlib.blake2b(spec.encode(), digest_size=DIGEST_SIZE).hexdigest()
+        return f"{type(descriptor).__module__}.{type(descriptor).__qualname__}:{digest}{sorted(kwargs.items())}"
+
+
+    def __getstate__(self):
+        # sqlite connection is opened again in other process
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_pid'] = None
+        return state
+
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid!=os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS descriptors "
+                                     "(namespace TEXT, key BLOB, value BLOB, PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+            self._connection.commit()
+            self._pid = os.getpid()
+        return self._connection
+
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        if self.maxsize<=0:
+            return
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        if len(self._lru)>self.maxsize:
+            self._lru.popitem(last=False)
+
+
+    def _disk_get(self, keys: List[bytes]) -> dict:
+        found = {}
+        db = self._db()
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            part = keys[start:start+SQLITE_MAX_VARIABLES]
+            rows = db.execute(f"SELECT key, value FROM descriptors WHERE namespace=? AND key IN ({','.join(['?']*len(part))})",
+                              [self._namespace] + part)
+            for key, value in rows:
+                found[key] = np.frombuffer(value, dtype=self._dtype)
+        return found
+
+
+    def _disk_put(self, items: dict):
+        db = self._db()
+        with db:
+            db.executemany("INSERT OR IGNORE INTO descriptors VALUES (?, ?, ?)",
+                           [(self._namespace, key, v.tobytes()) for key, v in items.items()])
+
+
+    def batch(self, nas: Iterable[NucleicAcid]) -> np.ndarray:
+        """
+        Descriptor matrix of NucleicAcids, only unseen structures are computed.
+
+        :param nas: NucleicAcid objects.
+
+        :return: numpy matrix (len(nas), n_features).
+        """
+
+        nas = list(nas)
+        for na in nas:
+            if not isinstance(na, NucleicAcid):
+                raise ValueError("NA argument must be NucleicAcid object.")
+
+        keys = [na_digest(na, self.digest_size) for na in nas]
+        vectors = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                vectors[key] = self._lru[key]
+            else:
+                missing.append(key)
+        self._hits += len(keys) - len(missing)
+
+        if len(missing) and self.path is not None:
+            found = self._disk_get(missing)
+            for key, v in found.items():
+                vectors[key] = v
+                self._remember(key, v)
+            self._disk_hits += len(found)
+            missing = [key for key in missing if key not in found]
+
+        if len(missing):
+            missing = set(missing)
+            first = {}
+            for na, key in zip(nas, keys):
+                if key in missing and key not in first:
+                    first[key] = na
+            X = self.descriptor.batch(list(first.values()), **self.kwargs)
+            computed = {}
+            for key, v in zip(first, X):
+                v.flags.writeable = False
+                computed[key] = v
+                vectors[key] = v
+                self._remember(key, v)
+            self._misses += len(computed)
+            if self.path is not None:
+                self._disk_put(computed)
+
+        res = np.empty((len(nas), self._n_features), dtype=self._dtype)
+        for i, key in enumerate(keys):
+            res[i] = vectors[key]
+        return res
+
+
+    def __call__(self, na: NucleicAcid) -> np.ndarray:
+        return self.batch([na])[0]
+
+
+    def __contains__(self, na: NucleicAcid) -> bool:
+        key = na_digest(na, self.digest_size)
+        if key in self._lru:
+            return True
+        return self.path is not None and len(self._disk_get([key]))>0
+
+
+    def info(self) -> CacheInfo:
+        """
+        Number of memory hits, disk hits, computed structures and vectors in memory.
+        """
+
+        return CacheInfo(self._hits, self._disk_hits, self._misses, len(self._lru))
+
+
+    def clear(self, disk: bool = False):
+        """
+        Clears memory cache and statistics, also vectors of this descriptor on disk if disk is True.
+        """
+
+        self._lru.clear()
+        self._hits = self._disk_hits = self._misses = 0
+        if disk and self.path is not None:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM descriptors WHERE namespace=?", (self._namespace, ))
+
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
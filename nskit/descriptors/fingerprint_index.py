@@ -0,0 +1,271 @@
+from typing import Iterable, List, Optional, Tuple, Union
+from pathlib import Path
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+from ..metrics.fingerprint import PackedFingerprints, pack_fingerprints, tanimoto_bulk, _bit_count
+
+
+
+EPS = 1e-9
+GROUP_ROWS = 1<<16 # minimal number of candidates compared at once by knn
+MIN_PENDING = 1<<14 # inserted fingerprints are scanned directly until compaction
+
+
+def _word_counts(words: np.ndarray) -> np.ndarray:
+    # number of set bits in each uint64 word
+    return _bit_count(words).astype(np.int16)
+
+
+def _expand_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    # concatenated np.arange(s, e) of all ranges
+    lengths = ends - starts
+    if lengths.sum()==0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum(), dtype=np.int64) + offsets
+
+
+class FingerprintIndex:
+    """
+    Tanimoto similarity index over binary fingerprints.
+    Fingerprints are packed into uint64 words and grouped by numbers of set bits a_w in every word:
+    similarity of two fingerprints is at most sum(min(a_w, b_w))/sum(max(a_w, b_w)),
+    so threshold and top-k queries only compare fingerprints of groups which can be similar enough.
+    Inserted fingerprints are kept apart and scanned directly until they are merged into groups.
+    """
+
+    def __init__(self, fingerprints: Optional[Union[np.ndarray, PackedFingerprints, Iterable[NucleicAcid]]] = None, *,
+                 ids: Optional[Iterable[int]] = None,
+                 n_bits: Optional[int] = None
+                ):
+        """
+        :param fingerprints: dense fingerprint matrix, PackedFingerprints or NucleicAcids (FragmentFingerprint is used).
+        :param ids: int ids of fingerprints. Default - insertion order.
+        :param n_bits: number of fingerprint bits, required for empty index. Default - from fingerprints.
+        """
+
+        self.n_bits = None
+        self._next_id = 0
+
+        # compacted fingerprints sorted by group, group keys and row offsets
+        self._words = self._ids = self._counts = None
+        self._keys = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._pending = [] # (words, ids) chunks
+        self._n_pending = 0
+
+        if n_bits is not None:
+            self._set_bits(n_bits)
+        if fingerprints is not None:
+            self.add(fingerprints, ids)
+            self.compact()
+
+
+    def _set_bits(self, n_bits: int):
+        self.n_bits = n_bits
+        n_words = (n_bits + 63)//64
+        self._words = np.zeros((0, n_words), dtype=np.uint64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._keys = np.zeros((0, n_words), dtype=np.int16)
+
+
+    def __len__(self):
+        return len(self._ids if self._ids is not None else []) + self._n_pending
+
+
+    def _pack(self, fingerprints) -> PackedFingerprints:
+        if isinstance(fingerprints, PackedFingerprints):
+            packed = fingerprints
+        elif isinstance(fingerprints, NucleicAcid):
+            packed = self._pack([fingerprints])
+        elif isinstance(fingerprints, np.ndarray):
+            packed = pack_fingerprints(fingerprints)
+        else:
+            from .fragment_count import FragmentFingerprint
+            packed = pack_fingerprints(FragmentFingerprint.batch(fingerprints))
+
+        if self.n_bits is None:
+            self._set_bits(packed.n_bits)
+        elif packed.n_bits!=self.n_bits:
+            raise ValueError(f"Index contains {self.n_bits} bits fingerprints, got {packed.n_bits}")
+        return packed
+
+
+    def add(self, fingerprints: Union[np.ndarray, PackedFingerprints, Iterable[NucleicAcid]],
+            ids: Optional[Iterable[int]] = None
+           ) -> np.ndarray:
+        """
+        Inserts fingerprints into index.
+
+        :param fingerprints: dense fingerprint matrix, PackedFingerprints or NucleicAcids.
+        :param ids: int ids of fingerprints. Default - continue insertion order.
+
+        :return: int64 ids of inserted fingerprints.
+        """
+
+        packed = self._pack(fingerprints)
+        if ids is None:
+            ids = np.arange(self._next_id, self._next_id+len(packed), dtype=np.int64)
+        else:
+            ids = np.asarray(list(ids), dtype=np.int64)
+            if len(ids)!=len(packed):
+                raise ValueError(f"Got {len(ids)} ids for {len(packed)} fingerprints")
+        if len(ids)==0:
+            return ids
+
+        self._next_id = max(self._next_id, int(ids.max())+1)
+        self._pending.append((packed.words, ids))
+        self._n_pending += len(ids)
+        if self._n_pending>max(MIN_PENDING, len(self._ids)//4):
+            self.compact()
+        return ids
+
+
+    def compact(self):
+        """
+        Merges inserted fingerprints into groups.
+        """
+
+        if self._n_pending==0:
+            return
+        words = np.concatenate([self._words] + [w for w, _ in self._pending])
+        ids = np.concatenate([self._ids] + [i for _, i in self._pending])
+        self._pending = []
+        self._n_pending = 0
+
+        keys, inverse = np.unique(_word_counts(words), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        self._words = words[order]
+        self._ids = ids[order]
+        self._counts = keys.sum(axis=1, dtype=np.int64)[inverse[order]]
+        self._keys = keys
+        self._offsets = np.zeros(len(keys)+1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(np.bincount(inverse, minlength=len(keys)))
+
+
+    def _query(self, query) -> Tuple[PackedFingerprints, np.ndarray]:
+        if isinstance(query, np.ndarray) and query.ndim==1:
+            query = query[None]
+        q = self._pack(query)
+        if len(q)!=1:
+            raise ValueError(f"Expected one query fingerprint, got {len(q)}")
+
+        # similarity bound of every group
+        a = _word_counts(q.words)[0].astype(np.int64)
+        inter = np.minimum(self._keys, a).sum(axis=1)
+        union = np.maximum(self._keys, a).sum(axis=1)
+        bounds = np.divide(inter, union, out=np.zeros(len(union), dtype=np.float64), where=union>0)
+        return q, bounds
+
+
+    def _compare(self, q: PackedFingerprints, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        fps = PackedFingerprints(self._words[rows], self.n_bits, self._counts[rows])
+        return self._ids[rows], tanimoto_bulk(q, fps)
+
+
+    def _compare_pending(self, q: PackedFingerprints) -> Tuple[np.ndarray, np.ndarray]:
+        if self._n_pending==0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        words = np.concatenate([w for w, _ in self._pending])
+        ids = np.concatenate([i for _, i in self._pending])
+        return ids, tanimoto_bulk(q, PackedFingerprints(words, self.n_bits))
+
+
+    def search(self, query: Union[np.ndarray, PackedFingerprints, NucleicAcid],
+               threshold: float
+              ) -> List[Tuple[int, float]]:
+        """
+        Finds all fingerprints with Tanimoto similarity to query not less than threshold.
+
+        :param query: dense fingerprint vector, PackedFingerprints or NucleicAcid.
+        :param threshold: minimal similarity.
+
+        :return: list of (id, similarity) sorted by descending similarity, then id.
+        """
+
+        q, bounds = self._query(query)
+        groups = np.nonzero(bounds>=threshold-EPS)[0]
+        rows = _expand_ranges(self._offsets[groups], self._offsets[groups+1])
+
+        ids, sims = self._compare(q, rows)
+        pending_ids, pending_sims = self._compare_pending(q)
+        ids = np.concatenate([ids, pending_ids])
+        sims = np.concatenate([sims, pending_sims])
+
+        mask = sims>=threshold
+        ids, sims = ids[mask], sims[mask]
+        order = np.lexsort((ids, -sims))
+        return [(int(i), float(s)) for i, s in zip(ids[order], sims[order])]
+
+
+    def knn(self, query: Union[np.ndarray, PackedFingerprints, NucleicAcid], k: int) -> List[Tuple[int, float]]:
+        """
+        Finds k fingerprints most similar to query. Groups are compared in order of
+        decreasing similarity bound until the bound falls below the k-th best similarity.
+
+        :param query: dense fingerprint vector, PackedFingerprints or NucleicAcid.
+        :param k: number of neighbours.
+
+        :return: list of (id, similarity) sorted by descending similarity, then id.
+        """
+
+        q, bounds = self._query(query)
+        if k<=0:
+            return []
+        best_ids, best_sims = self._compare_pending(q)
+        order = np.lexsort((best_ids, -best_sims))[:k]
+        best_ids, best_sims = best_ids[order], best_sims[order]
+
+        groups = np.argsort(-bounds, kind='stable')
+        sizes = np.cumsum(self._offsets[groups+1] - self._offsets[groups])
+        start = 0
+        while start<len(groups):
+            if len(best_ids)>=k and bounds[groups[start]]<best_sims[-1]:
+                break
+            # next groups with at least GROUP_ROWS fingerprints
+            done = sizes[start-1] if start>0 else 0
+            end = min(int(np.searchsorted(sizes, done+GROUP_ROWS))+1, len(groups))
+            part = groups[start:end]
+            if len(best_ids)>=k:
+                part = part[bounds[part]>=best_sims[-1]]
+            start = end
+
+            ids, sims = self._compare(q, _expand_ranges(self._offsets[part], self._offsets[part+1]))
+            if len(best_ids)>=k:
+                mask = sims>=best_sims[-1]
+                ids, sims = ids[mask], sims[mask]
+            ids = np.concatenate([best_ids, ids])
+            sims = np.concatenate([best_sims, sims])
+            order = np.lexsort((ids, -sims))[:k]
+            best_ids, best_sims = ids[order], sims[order]
+
+        return [(int(i), float(s)) for i, s in zip(best_ids, best_sims)]
+
+
+    def save(self, path: Union[str, Path]):
+        """
+        Saves index into .npz file.
+        """
+
+        self.compact()
+        np.savez(path,
+                 words=self._words if self._words is not None else np.zeros((0, 0), dtype=np.uint64),
+                 ids=self._ids if self._ids is not None else np.zeros(0, dtype=np.int64),
+                 n_bits=np.array(-1 if self.n_bits is None else self.n_bits),
+                 next_id=np.array(self._next_id)
+                )
+
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'FingerprintIndex':
+        with np.load(path) as data:
+            n_bits = int(data['n_bits'])
+            index = cls(n_bits=None if n_bits<0 else n_bits)
+            if len(data['ids']):
+                index.add(PackedFingerprints(data['words'], n_bits), data['ids'])
+                index.compact()
+            index._next_id = int(data['next_id'])
+        return index
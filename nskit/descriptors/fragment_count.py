@@ -1,7 +1,7 @@
 from ..containers.nucleic_acid import NucleicAcid
 import numpy as np
 from itertools import product
-from typing import Union, Tuple, List
+from typing import Iterable, Union, Tuple, List
 
 
 
@@ -226,11 +226,34 @@ def FragmentFingerprint(na: NucleicAcid,
     return (FragmentCount(na, with_knot_features) > 0).astype(np.int32)
 
 
+def _fragment_count_batch(nas: Iterable[NucleicAcid], 
+                          with_knot_features: bool = True
+                         ) -> np.ndarray:
+    """
+    Computes fragment count descriptors of many NucleicAcids at once.
+    Fragment properties of the whole batch are binned with vectorized range lookups,
+    result is identical to stacked FragmentCount vectors.
 
+    :param nas: NucleicAcid objects.
+    :param with_knot_features: whether to count knot features. Default - True.
 
+    :return: int32 numpy matrix (len(nas), 192).
+    """
+    
+    from .fragment_descriptor import _preset
+    return _preset(with_knot_features, False).batch(nas)
 
 
+def _fragment_fingerprint_batch(nas: Iterable[NucleicAcid], 
+                                with_knot_features: bool = True
+                               ) -> np.ndarray:
+    """
+    Computes fragment fingerprints of many NucleicAcids at once.
+    """
+    
+    from .fragment_descriptor import _preset
+    return _preset(with_knot_features, True).batch(nas)
 
 
-
-
+FragmentCount.batch = _fragment_count_batch
+FragmentFingerprint.batch = _fragment_fingerprint_batch
\ No newline at end of file
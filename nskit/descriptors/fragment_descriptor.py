@@ -0,0 +1,222 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+from itertools import product
+from numbers import Real
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+
+
+
+def _no_fragments(na):
+    return []
+
+
+class FragmentDescriptor:
+    """
+    Fragment count descriptor compiled from user config of the same form as FRAGMENT_COUNT_CONFIG:
+
+        {fragment_name: {
+            'get_fragment_func': NucleicAcid -> list of fragments,
+            'properties': {property_name: {
+                'get_property_func': fragment -> number,
+                'ranges': [(lower, upper), ...] # lower inclusive, upper exclusive, may overlap
+            }}
+        }}
+
+    Each fragment adds one count to every combination of ranges matching its properties.
+    Config is validated once and compiled into range tables, batches are binned with vectorized lookups.
+    """
+
+    def __init__(self, config: dict, *, binary: bool = False):
+        """
+        :param config: fragment config.
+        :param binary: return fingerprints (0/1) instead of counts. Default - False.
+        """
+
+        self._validate(config)
+        self.config = config
+        self.binary = binary
+        self._plan, self.n_features = self._compile(config)
+        self._linear_dangling_feature = None # FragmentCount preset rule, see fragment_count
+        self._preset_spec = None # spec of preset config made of lambdas
+
+
+    @staticmethod
+    def _validate(config: dict):
+        if not isinstance(config, dict) or len(config)==0:
+            raise ValueError("Config must be non empty dict of fragments")
+
+        for name, fragment_dict in config.items():
+            if not callable(fragment_dict.get('get_fragment_func')):
+                raise ValueError(f"Fragment '{name}' must have callable 'get_fragment_func'")
+            properties = fragment_dict.get('properties')
+            if not isinstance(properties, dict) or len(properties)==0:
+                raise ValueError(f"Fragment '{name}' must have non empty 'properties' dict")
+
+            for pname, property_dict in properties.items():
+                if not callable(property_dict.get('get_property_func')):
+                    raise ValueError(f"Property '{name}.{pname}' must have callable 'get_property_func'")
+                ranges = property_dict.get('ranges')
+                if not ranges:
+                    raise ValueError(f"Property '{name}.{pname}' must have non empty 'ranges'")
+                for r in ranges:
+                    if len(r)!=2 or not all([isinstance(x, Real) for x in r]) or not r[0]<r[1]:
+                        raise ValueError(f"Invalid range {r} of property '{name}.{pname}', "
+                                         "expected (lower, upper) numbers with lower < upper")
+
+
+    @staticmethod
+    def _compile(config: dict) -> Tuple[List[Tuple], int]:
+        # for each fragment type (get_fragment_func, property funcs, (lower, upper) bound arrays, first feature index)
+        # features of fragment are enumerated as itertools.product of property ranges
+        plan = []
+        first = 0
+        for fragment_dict in config.values():
+            funcs, bounds = [], []
+            n_features = 1
+            for property_dict in fragment_dict['properties'].values():
+                ranges = np.array(property_dict['ranges'], dtype=np.float64)
+                funcs.append(property_dict['get_property_func'])
+                bounds.append((ranges[:, 0], ranges[:, 1]))
+                n_features *= len(ranges)
+
+            plan.append((fragment_dict['get_fragment_func'], funcs, bounds, first))
+            first += n_features
+        return plan, first
+
+
+    @property
+    def feature_indexes(self) -> Dict[tuple, int]:
+        """
+        Feature index of (fragment index, range of each property) tuples, same as FEATURE_INDEXES.
+        """
+
+        indexes = {}
+        for i, fragment_dict in enumerate(self.config.values()):
+            for f in product(*[p['ranges'] for p in fragment_dict['properties'].values()]):
+                indexes[(i, ) + f] = len(indexes)
+        return indexes
+
+
+    @property
+    def feature_names(self) -> List[str]:
+        names = []
+        for name, fragment_dict in self.config.items():
+            properties = fragment_dict['properties']
+            for f in product(*[p['ranges'] for p in properties.values()]):
+                names.append(' & '.join([f"{name}.{pname}[{l}, {r})" for pname, (l, r) in zip(properties, f)]))
+        return names
+
+
+    @property
+    def spec(self) -> Optional[str]:
+        """
+        Stable text of compiled config: fragment and property names, import names of functions and ranges.
+        None if some function has no import name (lambda or local function), such config is not identified.
+        """
+
+        if self._preset_spec is not None:
+            return self._preset_spec
+        funcs = []
+        def func_name(func):
+            funcs.append(f"{getattr(func, '__module__', None)}.{getattr(func, '__qualname__', '<unnamed>')}")
+            return funcs[-1]
+
+        parts = [f"binary={self.binary}", f"linear_dangling={self._linear_dangling_feature}"]
+        for name, fragment_dict in self.config.items():
+            parts.append(f"{name}: {func_name(fragment_dict['get_fragment_func'])}")
+            for pname, property_dict in fragment_dict['properties'].items():
+                ranges = [(float(l), float(r)) for l, r in property_dict['ranges']]
+                parts.append(f"{name}.{pname}: {func_name(property_dict['get_property_func'])} {ranges}")
+        if any(['<' in f for f in funcs]):
+            return None
+        return '\n'.join(parts)
+
+
+    def batch(self, nas: Iterable[NucleicAcid]) -> np.ndarray:
+        """
+        Computes descriptors of many NucleicAcids at once.
+
+        :param nas: NucleicAcid objects.
+
+        :return: int32 numpy matrix (len(nas), n_features).
+        """
+
+        nas = list(nas)
+        for na in nas:
+            if not isinstance(na, NucleicAcid):
+                raise ValueError("NA argument must be NucleicAcid object.")
+
+        n = len(nas)
+        flat_idx = []
+        for get_fragments, funcs, bounds, first in self._plan:
+            rows = []
+            values = [[] for _ in funcs]
+            for k, na in enumerate(nas):
+                fragments = get_fragments(na)
+                if len(fragments)==0:
+                    continue
+                rows.extend([k]*len(fragments))
+                for v, func in zip(values, funcs):
+                    v.extend([func(f) for f in fragments])
+            if len(rows)==0:
+                continue
+
+            # (fragments, features) match matrix as outer product of range matches of each property
+            match = np.ones((len(rows), 1), dtype=bool)
+            for v, (lower, upper) in zip(values, bounds):
+                v = np.array(v, dtype=np.float64)[:, None]
+                m = (v>=lower) & (v<upper)
+                match = (match[:, :, None] & m[:, None, :]).reshape(len(rows), -1)
+
+            fragment_idx, feature_idx = np.nonzero(match)
+            flat_idx.append(np.array(rows, dtype=np.int64)[fragment_idx]*self.n_features + first + feature_idx)
+
+        if len(flat_idx)==0:
+            X = np.zeros((n, self.n_features), dtype=np.int32)
+        else:
+            counts = np.bincount(np.concatenate(flat_idx), minlength=n*self.n_features)
+            X = counts.reshape(n, self.n_features).astype(np.int32)
+
+        if self._linear_dangling_feature is not None:
+            for k, na in enumerate(nas):
+                if len(na.pairs)==0:
+                    X[k, self._linear_dangling_feature] = 1 if len(na)==1 else 0
+
+        if self.binary:
+            return (X > 0).astype(np.int32)
+        return X
+
+
+    def __call__(self, na: NucleicAcid) -> np.ndarray:
+        return self.batch([na])[0]
+
+
+    @classmethod
+    def fragment_count(cls, with_knot_features: bool = True, binary: bool = False) -> 'FragmentDescriptor':
+        """
+        Preset of 192 features FragmentCount (binary - FragmentFingerprint) descriptor.
+        """
+
+        from .fragment_count import FRAGMENT_COUNT_CONFIG, FIRST_KNOT_FRAGMENT_INDEX
+
+        config = {}
+        for i, (name, fragment_dict) in enumerate(FRAGMENT_COUNT_CONFIG.items()):
+            if i>=FIRST_KNOT_FRAGMENT_INDEX and not with_knot_features:
+                # knot features are kept as zero columns
+                fragment_dict = dict(fragment_dict, get_fragment_func=_no_fragments)
+            config[name] = fragment_dict
+
+        descriptor = cls(config, binary=binary)
+        # 3'end dangling end feature is not counted for linear structure, one end feature for single nb
+        dangling_idx = list(config).index('dangling_ends')
+        first_range = tuple(config['dangling_ends']['properties']['len']['ranges'][0])
+        descriptor._linear_dangling_feature = descriptor.feature_indexes[(dangling_idx, first_range)]
+        descriptor._preset_spec = f"fragment_count(with_knot_features={with_knot_features}, binary={binary})"
+        return descriptor
+
+
+@lru_cache(maxsize=None)
+def _preset(with_knot_features: bool, binary: bool) -> FragmentDescriptor:
+    return FragmentDescriptor.fragment_count(with_knot_features, binary)
@@ -0,0 +1,196 @@
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from itertools import islice
+from pathlib import Path
+import multiprocessing
+import io
+import hashlib
+import pickle
+import json
+import os
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+from ..io import dotRead, bnaRead
+from .cache import na_digest, DIGEST_SIZE
+from .sparse import _describe_valid
+
+
+
+CHUNK_SIZE = 1000
+DOT_OPTIONS = ('raise_na_errors', 'ignore_unclosed_bonds', 'upper_sequence', 'meta_separator')
+
+
+def _dot_chunk_offsets(path: Path, chunk_size: int) -> Tuple[List[int], int]:
+    # byte offsets of every chunk_size-th record and number of records
+    starts = []
+    n = 0
+    pos = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.startswith(b'>'):
+                if n%chunk_size==0:
+                    starts.append(pos)
+                n += 1
+            pos += len(line)
+    return starts, n
+
+
+def _bna_chunk_offsets(path: Path, chunk_size: int) -> Tuple[List[int], int]:
+    starts = []
+    n = 0
+    pos = 0
+    with open(path, 'rb') as f:
+        while True:
+            size = int.from_bytes(f.read(2), 'big', signed=False)
+            if size==0:
+                break
+            if n%chunk_size==0:
+                starts.append(pos)
+            n += 1
+            pos += size
+            f.seek(pos)
+    return starts, n
+
+
+def _read_chunk(kind: str, path: str, offset: int, count: int, options: dict) -> List[Optional[NucleicAcid]]:
+    # offsets are byte positions, text is decoded from binary file opened at offset
+    f = open(path, 'rb')
+    f.seek(offset)
+    if kind=='bna':
+        reader = bnaRead(f)
+    else:
+        reader = dotRead(io.TextIOWrapper(f), **options)
+    with reader:
+        return list(islice(reader, count))
+
+
+def _describe_chunk(task: tuple) -> Tuple[np.ndarray, List[str]]:
+    # runs in worker: parses chunk records and describes valid NucleicAcids, invalid rows are zeros
+    kind, source, offset, count, options, descriptor, kwargs = task
+    nas = source if kind=='nas' else _read_chunk(kind, source, offset, count, options)
+    return _describe_valid(descriptor, nas, kwargs), [na.name if na is not None else '' for na in nas]
+
+
+def _nas_digest(nas: List[Optional[NucleicAcid]]) -> str:
+    # names and content of NucleicAcids list for resume check
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for na in nas:
+        if na is not None:
+            h.update(na_digest(na))
+            h.update(na.name.encode())
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def _resolve_source(source, chunk_size):
+    # tasks as (kind, source, offset, count, options) tuples, number of rows and source identity for resume check:
+    # [size, mtime] of file or digest of NucleicAcids list
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        kind = 'bna' if path.suffix=='.bna' else 'dot'
+        options = {}
+    elif isinstance(source, dotRead):
+        path, kind = Path(source._file.name), 'dot'
+        options = {k:getattr(source, k) for k in DOT_OPTIONS}
+    elif isinstance(source, bnaRead):
+        path, kind, options = Path(source._file.name), 'bna', {}
+    else:
+        nas = list(source)
+        tasks = [('nas', nas[i:i+chunk_size], 0, len(nas[i:i+chunk_size]), {})
+                 for i in range(0, len(nas), chunk_size)]
+        return tasks, len(nas), _nas_digest(nas)
+
+    starts, n = (_bna_chunk_offsets if kind=='bna' else _dot_chunk_offsets)(path, chunk_size)
+    tasks = [(kind, str(path), offset, min(chunk_size, n - i*chunk_size), options) for i, offset in enumerate(starts)]
+    stat = path.stat()
+    return tasks, n, [stat.st_size, stat.st_mtime_ns]
+
+
+def compute_to_file(source: Union[str, Path, dotRead, bnaRead, Sequence[NucleicAcid]],
+                    out: Union[str, Path], *,
+                    descriptor: Optional[Callable] = None,
+                    workers: int = 1,
+                    chunk_size: int = CHUNK_SIZE,
+                    resume: bool = True,
+                    **kwargs
+                   ) -> np.ndarray:
+    """
+    Computes descriptors of all NucleicAcids of a file into .npy matrix.
+    Chunks of records are parsed and described in a process pool, main process only
+    scans record offsets and writes rows in file order into preallocated memory mapped matrix.
+    Names are written line by line into <out>.names, invalid records get zero rows and empty names.
+    Progress is saved into <out>.progress after every chunk, interrupted computation continues from it
+    if source file size and modification time (names and content of NucleicAcids list) did not change.
+    Progress file is removed on completion.
+
+    :param source: .dot/.fasta/.bna path, dotRead/bnaRead reader (whole file is read) or NucleicAcids list.
+    :param out: path of .npy matrix.
+    :param descriptor: descriptor function with batch method. Default - FragmentCount.
+    :param workers: number of processes, descriptor must be picklable for more than one.
+        Default - 1, compute in main process.
+    :param chunk_size: number of records in one chunk.
+    :param resume: continue from progress file if it matches source. Default - True.
+    :param kwargs: descriptor arguments, e.g. with_knot_features.
+
+    :return: read only memory mapped matrix (n, n_features).
+    """
+
+    if descriptor is None:
+        from .fragment_count import FragmentCount
+        descriptor = FragmentCount
+
+    out = Path(out)
+    names_path = out.with_suffix('.names')
+    progress_path = out.with_suffix('.progress')
+
+    if workers>1:
+        try:
+            pickle.dumps((descriptor, kwargs))
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise ValueError("Descriptor can't be sent to worker processes, "
+                             "use workers=1 or module level functions instead of lambdas in its config") from e
+
+    tasks, n, source_id = _resolve_source(source, chunk_size)
+    empty = descriptor.batch([], **kwargs)
+    state = {'n_rows':n, 'n_features':empty.shape[1], 'chunk_size':chunk_size, 'source':source_id}
+
+    progress = None
+    if resume and progress_path.exists() and out.exists() and names_path.exists():
+        with open(progress_path) as f:
+            progress = json.load(f)
+        if any([progress.get(k)!=v for k, v in state.items()]) or names_path.stat().st_size<progress['names_size']:
+            progress = None
+
+    if progress is None:
+        X = np.lib.format.open_memmap(out, mode='w+', dtype=empty.dtype, shape=(n, empty.shape[1]))
+        progress = dict(state, done_rows=0, names_size=0)
+        open(names_path, 'wb').close()
+    else:
+        X = np.lib.format.open_memmap(out, mode='r+')
+        os.truncate(names_path, progress['names_size'])
+
+    done_chunks = progress['done_rows']//chunk_size
+    tasks = [t + (descriptor, kwargs) for t in tasks[done_chunks:]]
+
+    def save_progress(rows, names):
+        X[progress['done_rows']:progress['done_rows']+len(rows)] = rows
+        X.flush()
+        with open(names_path, 'ab') as f:
+            f.write(''.join([f"{name}\n" for name in names]).encode())
+            progress['names_size'] = f.tell()
+        progress['done_rows'] += len(rows)
+        with open(f"{progress_path}.tmp", 'w') as f:
+            json.dump(progress, f)
+        os.replace(f"{progress_path}.tmp", progress_path)
+
+    if workers<=1:
+        for task in tasks:
+            save_progress(*_describe_chunk(task))
+    else:
+        with multiprocessing.get_context().Pool(workers) as pool:
+            for rows, names in pool.imap(_describe_chunk, tasks):
+                save_progress(rows, names)
+    progress_path.unlink(missing_ok=True)
+
+    del X
+    return np.load(out, mmap_mode='r')
@@ -0,0 +1,250 @@
+from typing import Callable, Iterable, List, Optional, Union
+from itertools import islice
+from pathlib import Path
+import json
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+
+
+
+CHUNK_SIZE = 10000
+INDEX_DTYPE = np.int32 # column indexes, indptr is int64 for files over 2**31 values (csr_matrix upcasts indices to it)
+VALUE_DTYPE = np.int32
+META_FILE = 'meta.json'
+
+
+class SparseDescriptors:
+    """
+    CSR matrix of descriptors: values of row i are data[indptr[i]:indptr[i+1]]
+    at columns indices[indptr[i]:indptr[i+1]]. Arrays may be memory mapped from disk.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_features = n_features
+
+
+    @property
+    def shape(self):
+        return (len(self.indptr)-1, self.n_features)
+
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+
+    def __len__(self):
+        return len(self.indptr)-1
+
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        n = len(self)
+        if not -n<=idx<n:
+            raise IndexError(f"Row index {idx} is out of range for {n} rows")
+        idx = idx%n
+        return self.to_dense(idx, idx+1)[0]
+
+
+    def to_dense(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        Dense int32 matrix of rows from start to end (exclusive).
+        """
+
+        n = len(self)
+        start, end, _ = slice(start, end).indices(n)
+        end = max(start, end)
+        X = np.zeros((end-start, self.n_features), dtype=VALUE_DTYPE)
+        lo, hi = int(self.indptr[start]), int(self.indptr[end])
+        rows = np.repeat(np.arange(end-start), np.diff(self.indptr[start:end+1]))
+        X[rows, self.indices[lo:hi]] = self.data[lo:hi]
+        return X
+
+
+    def to_scipy(self):
+        """
+        Converts to scipy.sparse.csr_matrix, requires scipy.
+        """
+
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("scipy is required for conversion to csr_matrix") from None
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+    @classmethod
+    def from_dense(cls, X: np.ndarray) -> 'SparseDescriptors':
+        X = np.asarray(X)
+        rows, cols = np.nonzero(X)
+        indptr = np.zeros(len(X)+1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=len(X)))
+        return cls(indptr, cols.astype(INDEX_DTYPE), X[rows, cols].astype(VALUE_DTYPE), X.shape[1])
+
+
+    def save(self, path: Union[str, Path]):
+        """
+        Saves matrix into directory, see load.
+        """
+
+        with SparseDescriptorsWriter(path, self.n_features) as writer:
+            writer._write(np.diff(self.indptr), self.indices, self.data)
+
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> 'SparseDescriptors':
+        """
+        Loads matrix from directory.
+
+        :param path: directory written by save, SparseDescriptorsWriter or sparse_descriptors.
+        :param mmap: memory map arrays instead of reading them into memory. Default - True.
+
+        :return: SparseDescriptors object.
+        """
+
+        path = Path(path)
+        with open(path / META_FILE) as f:
+            meta = json.load(f)
+
+        def read(name, dtype):
+            file = path / f'{name}.bin'
+            if not mmap or file.stat().st_size==0: # empty files can not be mapped
+                return np.fromfile(file, dtype=dtype)
+            return np.memmap(file, dtype=dtype, mode='r')
+
+        return cls(read('indptr', np.int64), read('indices', INDEX_DTYPE),
+                   read('data', VALUE_DTYPE), meta['n_features'])
+
+
+
+class SparseDescriptorsWriter:
+    """
+    Appends dense descriptor chunks to on disk CSR matrix.
+    Directory contains raw indptr (int64), indices and data (int32) files and meta.json.
+    """
+
+    def __init__(self, path: Union[str, Path], n_features: int):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.n_features = n_features
+        self.n_rows = 0
+        self.nnz = 0
+
+        # meta.json of previous matrix marks directory valid, it is written again on close
+        (self.path / META_FILE).unlink(missing_ok=True)
+        self._indptr = open(self.path / 'indptr.bin', 'wb')
+        self._indices = open(self.path / 'indices.bin', 'wb')
+        self._data = open(self.path / 'data.bin', 'wb')
+        self._indptr.write(np.zeros(1, dtype=np.int64).tobytes())
+
+
+    def _write(self, row_nnz: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self._indptr.write((self.nnz + np.cumsum(row_nnz, dtype=np.int64)).tobytes())
+        self._indices.write(np.ascontiguousarray(indices, dtype=INDEX_DTYPE).tobytes())
+        self._data.write(np.ascontiguousarray(data, dtype=VALUE_DTYPE).tobytes())
+        self.n_rows += len(row_nnz)
+        self.nnz += int(np.sum(row_nnz))
+
+
+    def append(self, X: np.ndarray):
+        """
+        Appends rows of dense (n, n_features) matrix.
+        """
+
+        X = np.asarray(X)
+        if X.ndim!=2 or X.shape[1]!=self.n_features:
+            raise ValueError(f"Expected matrix with {self.n_features} columns, got shape {X.shape}")
+
+        rows, cols = np.nonzero(X)
+        self._write(np.bincount(rows, minlength=len(X)), cols, X[rows, cols])
+
+
+    def _close_files(self) -> bool:
+        if self._indptr.closed:
+            return False
+        for f in (self._indptr, self._indices, self._data):
+            f.close()
+        return True
+
+
+    def close(self):
+        if not self._close_files():
+            return
+        with open(self.path / META_FILE, 'w') as f:
+            json.dump({'n_rows':self.n_rows, 'n_features':self.n_features, 'nnz':self.nnz}, f)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # meta.json is not written for matrix interrupted by exception, so it can't be loaded
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+
+
+
+def _describe_valid(descriptor: Callable, nas: List[Optional[NucleicAcid]], kwargs: dict) -> np.ndarray:
+    # describes valid NucleicAcids, invalid records of readers (None) get zero rows
+    valid = [i for i, na in enumerate(nas) if na is not None]
+    X = descriptor.batch([nas[i] for i in valid], **kwargs)
+    if len(valid)!=len(nas):
+        full = np.zeros((len(nas), X.shape[1]), dtype=X.dtype)
+        full[valid] = X
+        X = full
+    return X
+
+
+def _chunks(items, chunk_size):
+    items = iter(items)
+    while len(chunk := list(islice(items, chunk_size))):
+        yield chunk
+
+
+def sparse_descriptors(nas: Iterable[NucleicAcid],
+                       path: Optional[Union[str, Path]] = None, *,
+                       descriptor: Optional[Callable] = None,
+                       chunk_size: int = CHUNK_SIZE,
+                       **kwargs
+                      ) -> SparseDescriptors:
+    """
+    Computes descriptors of NucleicAcids as sparse CSR matrix.
+    NucleicAcids are consumed in chunks, so readers of any size can be streamed to disk.
+    Invalid records of reader (None) get empty rows, same as in compute_to_file.
+
+    :param nas: NucleicAcid objects or reader.
+    :param path: directory to stream matrix into. Default - keep matrix in memory.
+    :param descriptor: descriptor function with batch method. Default - FragmentCount.
+    :param chunk_size: number of NucleicAcids described at once.
+    :param kwargs: descriptor arguments, e.g. with_knot_features.
+
+    :return: SparseDescriptors object, memory mapped if path is specified.
+    """
+
+    if descriptor is None:
+        from .fragment_count import FragmentCount
+        descriptor = FragmentCount
+
+    n_features = descriptor.batch([], **kwargs).shape[1]
+    chunks = (_describe_valid(descriptor, chunk, kwargs) for chunk in _chunks(nas, chunk_size))
+
+    if path is None:
+        parts = [SparseDescriptors.from_dense(X) for X in chunks]
+        indptr = [np.zeros(1, dtype=np.int64)]
+        for p in parts:
+            indptr.append(p.indptr[1:] + indptr[-1][-1])
+        return SparseDescriptors(np.concatenate(indptr),
+                                 np.concatenate([np.zeros(0, dtype=INDEX_DTYPE)] + [p.indices for p in parts]),
+                                 np.concatenate([np.zeros(0, dtype=VALUE_DTYPE)] + [p.data for p in parts]),
+                                 n_features)
+
+    with SparseDescriptorsWriter(path, n_features) as writer:
+        for X in chunks:
+            writer.append(X)
+    return SparseDescriptors.load(path)
@@ -1,2 +1,4 @@
 from .draw_na import DrawNA
-from .config import edit_draw_config
\ No newline at end of file
+from .config import edit_draw_config
+from .bulk import draw_many
+from .cache import DrawCache, draw_cache
\ No newline at end of file
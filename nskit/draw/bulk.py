@@ -0,0 +1,205 @@
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+from collections import deque, namedtuple
+from itertools import islice
+from pathlib import Path
+import multiprocessing
+import copy
+import html
+import time
+import os
+import re
+
+from .config import draw_config
+
+
+
+CHUNK_SIZE = 100
+CHUNKS_IN_FLIGHT = 2 # chunks per worker read ahead of drawing
+SHEET_COLUMNS = 8
+CAPTION_HEIGHT = 20
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.\-+=@,]+')
+
+DrawStats = namedtuple("DrawStats", ["n", "failed", "seconds", "per_second", "sheet", "duplicates"])
+
+
+def _init_worker(config: dict):
+    # worker process uses draw_config of main process regardless of start method
+    draw_config.clear()
+    draw_config.update(config)
+
+
+def _filename(template: str, name: str, index: int) -> str:
+    name = UNSAFE_FILENAME_CHARS.sub('_', name) or str(index)
+    return template.format(name=name, index=index)
+
+
+def _draw_chunk(task: tuple) -> List[Tuple[int, str, Optional[str]]]:
+    # runs in worker: draws chunk of (index, NucleicAcid, file path or None) items and writes files,
+    # returns (index, name, svg) rows, svg is None for failed drawing, empty when sheet is not built
+    items, keep_svg = task
+    rows = []
+    for i, na, path in items:
+        if na is None: # invalid record of reader
+            rows.append((i, '', None))
+            continue
+        try:
+            svg = na.draw()
+        except Exception:
+            rows.append((i, na.name, None))
+            continue
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(svg)
+        rows.append((i, na.name, svg if keep_svg else ''))
+    return rows
+
+
+class _Sheet:
+    """
+    Tiles of drawn structures with captions, written into SVG or HTML file as they are drawn.
+    """
+
+    def __init__(self, path: Path, columns: int):
+        self.path = path
+        self.columns = columns
+        self.html = path.suffix.lower() in ('.html', '.htm')
+        self.tile = draw_config["max_canvas_size"]
+        self.n = 0
+        # svg size is known after all tiles, they are kept in temporary file until closing
+        self._body_path = path if self.html else path.with_name(path.name + '.tmp')
+        self._f = open(self._body_path, 'w')
+        if self.html:
+            self._f.write('<!DOCTYPE html>\n<html>\n<body>\n'
+                          f'<div style="display:grid;grid-template-columns:repeat({columns}, {self.tile}px);gap:4px">\n')
+
+
+    def add(self, name: str, svg: str):
+        caption = html.escape(name)
+        if self.html:
+            self._f.write(f'<figure style="margin:0">\n{svg}\n<figcaption>{caption}</figcaption>\n</figure>\n')
+        else:
+            x = (self.n%self.columns)*self.tile
+            y = (self.n//self.columns)*(self.tile + CAPTION_HEIGHT)
+            # drawn svg without its outer tag
+            body = svg[svg.index('\n')+1:svg.rindex('\n')]
+            self._f.write(f'<g transform="translate({x},{y})">\n{body}\n'
+                          f'<text x="4" y="{self.tile + CAPTION_HEIGHT - 6}" font-size="12px">{caption}</text>\n</g>\n')
+        self.n += 1
+
+
+    def close(self):
+        if self.html:
+            self._f.write('</div>\n</body>\n</html>\n')
+            self._f.close()
+            return
+
+        self._f.close()
+        width = self.columns*self.tile
+        height = -(-self.n//self.columns)*(self.tile + CAPTION_HEIGHT)
+        with open(self.path, 'w') as out, open(self._body_path) as body:
+            out.write('<svg version = "1.1" '
+                      'baseProfile="full" '
+                      'xmlns = "http://www.w3.org/2000/svg" '
+                      f'height = "{height}px"  width = "{width}px">\n')
+            for line in body:
+                out.write(line)
+            out.write('</svg>')
+        os.remove(self._body_path)
+
+
+def draw_many(nas: Iterable,
+              out_dir: Optional[Union[str, Path]] = None, *,
+              workers: int = 1,
+              filename: str = "{name}.svg",
+              sheet: Optional[Union[str, Path]] = None,
+              sheet_columns: int = SHEET_COLUMNS,
+              chunk_size: int = CHUNK_SIZE,
+              progress: Optional[Callable[[DrawStats], None]] = None
+             ) -> DrawStats:
+    """
+    Draws NucleicAcids into SVG files. Chunks of structures are drawn in a process pool,
+    workers are initialized with current draw_config. NucleicAcids are read from iterable
+    chunk by chunk, at most CHUNKS_IN_FLIGHT chunks per worker are read ahead of drawing.
+    Structures whose file name was already used are skipped and counted as duplicates,
+    so files are never overwritten (file names are kept in memory to detect this).
+
+    :param nas: iterable of NucleicAcids, e.g. dotRead/bnaRead reader.
+    :param out_dir: directory of SVG files, created if not exists. Default - files are not written.
+    :param workers: number of processes. Default - 1, draw in main process.
+    :param filename: template of file names with {name} (NucleicAcid name with unsafe characters
+        replaced by '_', index if name is empty) and {index} (position in nas) fields.
+    :param sheet: path of .svg or .html file with all structures tiled with captions. Default - not built.
+    :param sheet_columns: number of tiles in sheet row.
+    :param chunk_size: number of structures drawn by one task.
+    :param progress: function called with DrawStats of drawn structures after every chunk.
+
+    :return: DrawStats of number of drawn structures, structures failed to draw (skipped),
+        elapsed seconds, structures per second, sheet path and skipped structures with duplicated file names.
+    """
+
+    if out_dir is None and sheet is None:
+        raise ValueError("Nothing to draw into, provide out_dir or sheet")
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out_dir = str(out_dir)
+    sheet = _Sheet(Path(sheet), sheet_columns) if sheet is not None else None
+
+    t = time.perf_counter()
+    n = failed = duplicates = 0
+    used = set()
+    def tasks():
+        nonlocal duplicates
+        it = iter(nas)
+        start = 0
+        while chunk := list(islice(it, chunk_size)):
+            items = []
+            for i, na in enumerate(chunk, start):
+                path = None
+                if out_dir is not None and na is not None:
+                    path = os.path.join(out_dir, _filename(filename, na.name, i))
+                    if path in used:
+                        duplicates += 1
+                        continue
+                    used.add(path)
+                items.append((i, na, path))
+            yield items, sheet is not None
+            start += len(chunk)
+
+    def stats():
+        seconds = time.perf_counter() - t
+        return DrawStats(n, failed, seconds, n/seconds if seconds>0 else 0.,
+                         None if sheet is None else str(sheet.path), duplicates)
+
+    def collect(rows):
+        nonlocal n, failed
+        for _, name, svg in rows:
+            if svg is None:
+                failed += 1
+                continue
+            n += 1
+            if sheet is not None:
+                sheet.add(name, svg)
+        if progress is not None:
+            progress(stats())
+
+    try:
+        if workers<=1:
+            for task in tasks():
+                collect(_draw_chunk(task))
+        else:
+            config = copy.deepcopy(draw_config)
+            with multiprocessing.get_context().Pool(workers, initializer=_init_worker, initargs=(config, )) as pool:
+                # bounded window of submitted chunks, Pool.imap would read and pickle the whole iterable
+                pending = deque()
+                for task in tasks():
+                    pending.append(pool.apply_async(_draw_chunk, (task, )))
+                    if len(pending)>=CHUNKS_IN_FLIGHT*workers:
+                        collect(pending.popleft().get())
+                while pending:
+                    collect(pending.popleft().get())
+    finally:
+        if sheet is not None:
+            sheet.close()
+
+    return stats()
@@ -0,0 +1,81 @@
+from collections import OrderedDict, namedtuple
+from typing import Any, Hashable, Optional
+
+
+
+MAX_BYTES = 64<<20
+
+DrawCacheInfo = namedtuple("DrawCacheInfo", ["hits", "misses", "size", "nbytes", "max_bytes"])
+
+
+class DrawCache:
+    """
+    Process-wide LRU of drawing results (layouts and SVGs) bounded by their total size in bytes.
+    Keys are content digests, so NucleicAcids of the same structure share one layout.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        """
+        :param max_bytes: maximum total size of cached results, 0 - no caching.
+        """
+
+        self.max_bytes = max_bytes
+        self._lru = OrderedDict() # key: (value, nbytes)
+        self._nbytes = 0
+        self._hits = self._misses = 0
+
+
+    def __len__(self):
+        return len(self._lru)
+
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._lru.get(key)
+        if item is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._lru.move_to_end(key)
+        return item[0]
+
+
+    def put(self, key: Hashable, value: Any, nbytes: int):
+        """
+        Caches value of given size, values larger than max_bytes are not cached.
+        """
+
+        if key in self._lru:
+            self._nbytes -= self._lru.pop(key)[1]
+        if nbytes>self.max_bytes:
+            return
+        self._lru[key] = (value, nbytes)
+        self._nbytes += nbytes
+        self._shrink()
+
+
+    def _shrink(self):
+        while self._nbytes>self.max_bytes:
+            _, (_, nbytes) = self._lru.popitem(last=False)
+            self._nbytes -= nbytes
+
+
+    def resize(self, max_bytes: int):
+        """
+        Sets size limit, least recently used results are evicted.
+        """
+
+        self.max_bytes = max_bytes
+        self._shrink()
+
+
+    def clear(self):
+        self._lru.clear()
+        self._nbytes = 0
+        self._hits = self._misses = 0
+
+
+    def info(self) -> DrawCacheInfo:
+        return DrawCacheInfo(self._hits, self._misses, len(self._lru), self._nbytes, self.max_bytes)
+
+
+draw_cache = DrawCache()
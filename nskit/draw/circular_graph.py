@@ -8,34 +8,31 @@ class CircularGraph:
         N = n + 2
         R = 1/(np.sin(np.pi/N))
         dela = 2*np.pi/N
-        rotm = np.array([[np.cos(dela), np.sin(dela)], [-np.sin(dela), np.cos(dela)]], dtype=np.float32)
 
-        vec = np.array([0, -R])@rotm
-        vecs = np.zeros((n, 2), dtype=np.float32)
-        for i in range(n):
-            new_vec = vec@rotm
-            nbc = (vec+new_vec)/2
-            vecs[i] = nbc
-            vec = new_vec
+        # layout is defined by rotation matrix with float32 cos and sin, i.e. rotation by angle
+        # a = atan2(s, c) with scaling rho = |(c, s)|. Vertex k is (0, -R) transformed k times,
+        # nucleotide i is in the middle of vertexes i+1 and i+2
+        c, s = np.float32(np.cos(dela)).item(), np.float32(np.sin(dela)).item()
+        a = np.arctan2(s, c)
+        k = np.arange(1, n+2)
+        scale = R*np.hypot(c, s)**k
+        vertexes = np.stack([scale*np.sin(k*a), -scale*np.cos(k*a)], axis=1)
+        vecs = ((vertexes[:-1] + vertexes[1:])/2).astype(np.float32)
             
         return vecs, R
 
 
     def calculate_helix_radiuses(self, nb_coords, R):
-        helix_radiuses = []
-
-        for h in self.helixes:
-            radiuses = []
-
-            for i, j in h:
-                iv = nb_coords[i]
-                jv = nb_coords[j]
-            
-                C = iv + (jv - iv)/2
-                clen = np.linalg.norm(C)
-                r = (R**2)/clen
-
-                radiuses.append(r)
-            helix_radiuses.append(radiuses)
-
-        return helix_radiuses
\ No newline at end of file
+        helixes = self.helixes
+        if len(helixes)==0:
+            return []
+        
+        pairs = np.array([p for h in helixes for p in h], dtype=np.int64).reshape(-1, 2)
+        iv = nb_coords[pairs[:, 0]]
+        jv = nb_coords[pairs[:, 1]]
+        C = iv + (jv - iv)/2
+        clen = np.sqrt(C[:, 0]*C[:, 0] + C[:, 1]*C[:, 1])
+        radiuses = ((R**2)/clen).tolist()
+
+        bounds = np.cumsum([0] + [len(h) for h in helixes]).tolist()
+        return [radiuses[s:e] for s, e in zip(bounds[:-1], bounds[1:])]
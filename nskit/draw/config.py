@@ -10,7 +10,12 @@ draw_config = {
     "unknown_nb_color":"#7B8FA1",
     "core_bond_color":"#555", 
     "compl_bond_color":"#526D82", 
-    "knot_bond_color":"#B70404"
+    "knot_bond_color":"#B70404",
+    "detail":"full",
+    "lod_threshold":2000,
+    "lod_min_font_size":4.,
+    "lod_min_nb_radius":1.,
+    "lod_min_segment":1.
 }
 
 
@@ -24,8 +29,25 @@ def edit_draw_config(
                 unknown_nb_color: str = "#7B8FA1",
                 core_bond_color: str = "#555", 
                 compl_bond_color: str = "#526D82", 
-                knot_bond_color: str = "#B70404"
+                knot_bond_color: str = "#B70404",
+                detail: str = "full",
+                lod_threshold: int = 2000,
+                lod_min_font_size: float = 4.,
+                lod_min_nb_radius: float = 1.,
+                lod_min_segment: float = 1.
                      ):
+        """
+        Sets drawing options, options which are not passed are reset to defaults.
+
+        :param detail: 'full' - every nucleotide, bond and pair is a separate element,
+            'lod' - level of detail drawing: backbone is one path, every helix is one band,
+            nucleotide circles and letters smaller than lod_min_nb_radius and lod_min_font_size are not drawn,
+            'auto' - 'lod' for structures longer than lod_threshold, 'full' otherwise.
+        :param lod_min_segment: backbone vertexes closer than this in px are merged in 'lod' drawing.
+        """
+
+        if detail not in ('full', 'lod', 'auto'):
+            raise ValueError(f"Detail must be 'full', 'lod' or 'auto', got '{detail}'")
         
         draw_config["max_canvas_size"] = max_canvas_size
         draw_config["nb_colors"]["A"] = A_color
@@ -37,4 +59,9 @@ def edit_draw_config(
         draw_config["core_bond_color"] = core_bond_color
         draw_config["compl_bond_color"] = compl_bond_color
         draw_config["knot_bond_color"] = knot_bond_color
+        draw_config["detail"] = detail
+        draw_config["lod_threshold"] = lod_threshold
+        draw_config["lod_min_font_size"] = lod_min_font_size
+        draw_config["lod_min_nb_radius"] = lod_min_nb_radius
+        draw_config["lod_min_segment"] = lod_min_segment
         
\ No newline at end of file
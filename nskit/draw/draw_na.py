@@ -1,24 +1,59 @@
+import hashlib
+import numpy as np
+
 from .circular_graph import CircularGraph
 from .svg import DrawSVG
+from .config import draw_config
+from .cache import draw_cache
+
 
 
+DIGEST_SIZE = 16
+
 
 class DrawNA(CircularGraph, DrawSVG):
 
     def _repr_svg_(self):
-        if not hasattr(self, 'svg'):
-            self.__dict__['svg'] = self.draw()
-        return self.__dict__['svg']
+        return self.draw()
     
 
-    def draw(self):
-        n = len(self)
+    def _draw_keys(self):
+        # layout depends only on length and pairs, its digest is kept until graph edit,
+        # svg also depends on sequence and draw_config
+        version, layout_key = self.__dict__.get('_draw_layout_key', (None, None))
+        if version!=self.graph_version:
+            h = hashlib.blake2b(np.array([len(self)], dtype=np.int64).tobytes(), digest_size=DIGEST_SIZE)
+            h.update(np.array(self.pairs, dtype=np.int32).tobytes())
+            layout_key = ('layout', h.digest())
+            self.__dict__['_draw_layout_key'] = (self.graph_version, layout_key)
+        
+        h = hashlib.blake2b(layout_key[1], digest_size=DIGEST_SIZE)
+        h.update(self.seq.encode())
+        h.update(repr(draw_config).encode())
+        return layout_key, ('svg', h.digest())
 
-        nb_coords, R = self.calculate_circular_coords(n)
-        helix_radiuses = self.calculate_helix_radiuses(nb_coords, R)
-        svg = self.make_svg(nb_coords, helix_radiuses, R)
 
-        return svg
-    
+    def draw(self):
+        """
+        SVG drawing of circular layout. Layouts and drawings are cached in process-wide
+        draw_cache, graph edits invalidate them, sequence edits reuse the layout.
+        """
+        layout_key, svg_key = self._draw_keys()
+        svg = draw_cache.get(svg_key)
+        if svg is not None:
+            return svg
+
+        layout = draw_cache.get(layout_key)
+        if layout is None:
+            n = len(self)
+            nb_coords, R = self.calculate_circular_coords(n)
+            nb_coords.setflags(write=False)
+            helix_radiuses = self.calculate_helix_radiuses(nb_coords, R)
+            layout = (nb_coords, helix_radiuses, R)
+            # python floats of radiuses take 32 bytes with list pointers
+            draw_cache.put(layout_key, layout, nb_coords.nbytes + 32*sum(map(len, helix_radiuses)))
+        
+        svg = self.make_svg(*layout)
+        draw_cache.put(svg_key, svg, len(svg))
 
-    
\ No newline at end of file
+        return svg
@@ -5,6 +5,18 @@ from .config import draw_config
 
 
 
+def _norm_rows(v):
+    # row-wise euclidean norms of (n, 2) vectors
+    return np.sqrt(v[:, 0]*v[:, 0] + v[:, 1]*v[:, 1])
+
+
+def _bond_ends(iv, jv, shift):
+    # ends of bonds between circles of nucleotides iv and jv
+    ijv = jv - iv
+    ijv = ijv/_norm_rows(ijv)[:, None]
+    return iv + ijv*shift, jv - ijv*shift
+
+
 class DrawSVG:    
     
     def make_svg(self, nb_coords, helix_radiuses, R):
@@ -26,17 +38,25 @@ class DrawSVG:
         stroke = max(1.5, 1.5*(canvas/100)*(15/(len(self)+3)))
         radius = (nb_diam - stroke/2)*(25/(stroke+30) + 0.1)
 
-        # nucleic bases
-        nucleotides_lines = self._draw_nucleotides(nb_coords, stroke, radius)
-        svg.extend(nucleotides_lines)
-
-        # core bonds
-        core_bonds_lines = self._draw_core_bonds(nb_coords, stroke, radius)
-        svg.extend(core_bonds_lines)
-
-        # complementary bonds
-        compl_bonds_lines = self._draw_compl_bonds(nb_coords, helix_radiuses, stroke, radius)
-        svg.extend(compl_bonds_lines)
+        if self._use_lod():
+            nb_fontsize = max(1, 2.5*(radius - stroke/2)/math.sqrt(2))
+            svg.extend(self._draw_nucleotides(nb_coords, stroke, radius,
+                                              circles=radius>=draw_config["lod_min_nb_radius"],
+                                              letters=nb_fontsize>=draw_config["lod_min_font_size"]))
+            svg.extend(self._draw_backbone(nb_coords, stroke))
+            svg.extend(self._draw_helix_bands(nb_coords, helix_radiuses, stroke))
+        else:
+            # nucleic bases
+            nucleotides_lines = self._draw_nucleotides(nb_coords, stroke, radius)
+            svg.extend(nucleotides_lines)
+
+            # core bonds
+            core_bonds_lines = self._draw_core_bonds(nb_coords, stroke, radius)
+            svg.extend(core_bonds_lines)
+
+            # complementary bonds
+            compl_bonds_lines = self._draw_compl_bonds(nb_coords, helix_radiuses, stroke, radius)
+            svg.extend(compl_bonds_lines)
 
         svg.append("</svg>")
         svg = '\n'.join(svg)
@@ -44,24 +64,29 @@ class DrawSVG:
         return svg
     
 
-    def _draw_nucleotides(self, nb_coords, stroke, radius):
+    def _use_lod(self):
+        detail = draw_config["detail"]
+        return detail=='lod' or (detail=='auto' and len(self)>draw_config["lod_threshold"])
+
+
+    def _draw_nucleotides(self, nb_coords, stroke, radius, circles=True, letters=True):
         nb_fontsize = max(1, 2.5*(radius - stroke/2)/math.sqrt(2))
         text_shift = 0.35*nb_fontsize
         text_coords = nb_coords + np.array([-text_shift, text_shift])
         
-        lines = [f'<g stroke-width="{stroke:.2f}" fill="none">']
-        text_lines = [f'<g font-weight="bold" font-size="{nb_fontsize:.2f}px">']
-
-        for i, nb in enumerate(self.seq):
-            color = draw_config["nb_colors"].get(nb, draw_config["unknown_nb_color"])
-            x, y = nb_coords[i]
-            tx, ty = text_coords[i]
-            lines.append(f'    <circle cx="{x:.1f}px" cy="{y:.1f}px" r="{radius:.1f}px" stroke="{color}"/>')
-            text_lines.append(f'    <text x="{tx:.1f}" y="{ty:.1f}">{nb}</text>')
-            
-        lines.append('</g>')
-        text_lines.append('</g>')
-        lines.extend(text_lines)
+        seq = self.seq
+        lines = []
+        if circles:
+            colors = [draw_config["nb_colors"].get(nb, draw_config["unknown_nb_color"]) for nb in seq]
+            circle = f'    <circle cx="{{:.1f}}px" cy="{{:.1f}}px" r="{radius:.1f}px" stroke="{{}}"/>'.format
+            lines.append(f'<g stroke-width="{stroke:.2f}" fill="none">')
+            lines.extend(map(circle, nb_coords[:, 0].tolist(), nb_coords[:, 1].tolist(), colors))
+            lines.append('</g>')
+        if letters:
+            text = '    <text x="{:.1f}" y="{:.1f}">{}</text>'.format
+            lines.append(f'<g font-weight="bold" font-size="{nb_fontsize:.2f}px">')
+            lines.extend(map(text, text_coords[:, 0].tolist(), text_coords[:, 1].tolist(), seq))
+            lines.append('</g>')
 
         return lines
     
@@ -70,14 +95,9 @@ class DrawSVG:
         lines = [f'<g stroke="{draw_config["core_bond_color"]}" stroke-width="{stroke:.2f}">']
         shift = radius + stroke/2
         
-        for j in range(1, nb_coords.shape[0]):
-            iv = nb_coords[j-1]
-            jv = nb_coords[j]
-            ijv = (ijv:=jv-iv)/np.linalg.norm(ijv)
-            
-            d1 = iv + ijv*shift
-            d2 = jv - ijv*shift
-            lines.append(f'    <line x1="{d1[0]:.1f}" y1="{d1[1]:.1f}" x2="{d2[0]:.1f}" y2="{d2[1]:.1f}"/>')
+        d1, d2 = _bond_ends(nb_coords[:-1], nb_coords[1:], shift)
+        line = '    <line x1="{:.1f}" y1="{:.1f}" x2="{:.1f}" y2="{:.1f}"/>'.format
+        lines.extend(map(line, d1[:, 0].tolist(), d1[:, 1].tolist(), d2[:, 0].tolist(), d2[:, 1].tolist()))
         
         lines.append('</g>')
         return lines
@@ -86,24 +106,78 @@ class DrawSVG:
     def _draw_compl_bonds(self, nb_coords, helix_coords, stroke, radius):
         lines = [f'<g stroke-width="{stroke:.2f}" fill="none" >']
         shift = radius + stroke/2
-        knots = self.knots
+        helixes = self.helixes
+        knots = set(self.knots)
+
+        if len(helixes):
+            pairs = np.array([p for h in helixes for p in h], dtype=np.int64).reshape(-1, 2)
+            # long bonds are drawn from closing to opening nucleotide
+            swap = np.abs(pairs[:, 1]-pairs[:, 0]+1)>((len(self)+2)//2)
+            pairs[swap] = pairs[swap, ::-1]
+
+            d1, d2 = _bond_ends(nb_coords[pairs[:, 0]], nb_coords[pairs[:, 1]], shift)
+            radiuses = [r for hr in helix_coords for r in hr]
+            colors = [draw_config['knot_bond_color'] if n in knots else draw_config['compl_bond_color']
+                      for n, h in enumerate(helixes) for _ in h]
+            arc = '    <path  d="M {0:.1f} {1:.1f} A {4:.1f} {4:.1f} 0 0 1 {2:.1f} {3:.1f}" stroke="{5}"/>'.format
+            lines.extend(map(arc, d1[:, 0].tolist(), d1[:, 1].tolist(), d2[:, 0].tolist(), d2[:, 1].tolist(),
+                             radiuses, colors))
         
-        for n, (h, hr) in enumerate(zip(self.helixes, helix_coords)):
-            color = draw_config['knot_bond_color'] if n in knots else draw_config['compl_bond_color']
-
-            for i, (nb1, nb2) in enumerate(h):
-                if abs(nb2-nb1+1)>((len(self)+2)//2):
-                    nb1, nb2 = nb2, nb1
-
-                iv = nb_coords[nb1]
-                r = hr[i]
-                jv = nb_coords[nb2]
-
-                ijv = (ijv:=jv-iv)/np.linalg.norm(ijv)
-                d1 = iv + ijv*shift
-                d2 = jv - ijv*shift
-                arc = f'    <path  d="M {d1[0]:.1f} {d1[1]:.1f} A {r:.1f} {r:.1f} 0 0 1 {d2[0]:.1f} {d2[1]:.1f}" stroke="{color}"/>'
-                lines.append(arc)
+        lines.append('</g>')
+        return lines
+    
+
+    def _draw_backbone(self, nb_coords, stroke):
+        # one path through nucleotide centers, vertexes closer than lod_min_segment px are merged
+        step = 1
+        if len(nb_coords)>1:
+            spacing = _norm_rows(nb_coords[1:2] - nb_coords[:1])[0]
+            step = max(1, math.ceil(draw_config["lod_min_segment"]/spacing))
+        idx = np.arange(0, len(nb_coords), step)
+        if idx[-1]!=len(nb_coords)-1:
+            idx = np.append(idx, len(nb_coords)-1)
+        
+        x, y = nb_coords[idx, 0].tolist(), nb_coords[idx, 1].tolist()
+        d = ' '.join(map('{:.1f} {:.1f}'.format, x[1:], y[1:]))
+        d = f'M {x[0]:.1f} {y[0]:.1f} L {d}' if d else f'M {x[0]:.1f} {y[0]:.1f}'
+        return [f'<path d="{d}" stroke="{draw_config["core_bond_color"]}" stroke-width="{stroke:.2f}" fill="none"/>']
+
+
+    def _draw_helix_bands(self, nb_coords, helix_coords, stroke):
+        # helix is a band between arcs of its outer and inner pairs, arcs go through nucleotide centers,
+        # bands of one color are subpaths of one path
+        lines = []
+        helixes = self.helixes
+        if len(helixes)==0:
+            return lines
+
+        knots = set(self.knots)
+        outer = np.array([h[0] for h in helixes], dtype=np.int64)
+        inner = np.array([h[-1] for h in helixes], dtype=np.int64)
+        outer_r = np.array([hr[0] for hr in helix_coords])
+        inner_r = np.array([hr[-1] for hr in helix_coords])
         
+        # arcs are drawn clockwise from opening to closing nucleotide or back for long bonds
+        half = (len(self)+2)//2
+        outer_swap = np.abs(outer[:, 1]-outer[:, 0]+1)>half
+        inner_swap = np.abs(inner[:, 1]-inner[:, 0]+1)>half
+        start = np.where(outer_swap, outer[:, 1], outer[:, 0])
+        end = np.where(outer_swap, outer[:, 0], outer[:, 1])
+        # inner arc goes back from nucleotide of the same strand as outer arc end
+        back_start = np.where(outer_swap, inner[:, 0], inner[:, 1])
+        back_end = np.where(outer_swap, inner[:, 1], inner[:, 0])
+        back_sweep = (outer_swap!=inner_swap).astype(np.int64)
+
+        xy = nb_coords.tolist()
+        band = 'M {0[0]:.1f} {0[1]:.1f} A {4:.1f} {4:.1f} 0 0 1 {1[0]:.1f} {1[1]:.1f} L {2[0]:.1f} {2[1]:.1f} A {5:.1f} {5:.1f} 0 0 {6} {3[0]:.1f} {3[1]:.1f} Z'.format
+        bands = list(map(band, [xy[i] for i in start.tolist()], [xy[i] for i in end.tolist()],
+                         [xy[i] for i in back_start.tolist()], [xy[i] for i in back_end.tolist()],
+                         outer_r.tolist(), inner_r.tolist(), back_sweep.tolist()))
+
+        lines.append(f'<g stroke-width="{stroke/2:.2f}" stroke-linejoin="round">')
+        for color, is_knot in ((draw_config['compl_bond_color'], False), (draw_config['knot_bond_color'], True)):
+            d = ' '.join([b for n, b in enumerate(bands) if (n in knots)==is_knot])
+            if d:
+                lines.append(f'    <path d="{d}" stroke="{color}" fill="{color}"/>')
         lines.append('</g>')
-        return lines
\ No newline at end of file
+        return lines
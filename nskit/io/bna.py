@@ -1,6 +1,6 @@
 from typing import Union, Iterator
 from pathlib import Path
-from io import BufferedWriter, BufferedRandom
+from io import BufferedReader, BufferedWriter, BufferedRandom
 import math
 
 from ..containers import NucleicAcid
@@ -159,13 +159,13 @@ class bnaWrite:
 
 class bnaRead:
 
-    def __init__(self, file: Union[str, Path, BufferedWriter, BufferedRandom]):
+    def __init__(self, file: Union[str, Path, BufferedReader, BufferedWriter, BufferedRandom]):
         if isinstance(file, (str, Path)):
             self._file = open(file, 'rb')
-        elif isinstance(file, (BufferedWriter, BufferedRandom)):
+        elif isinstance(file, (BufferedReader, BufferedWriter, BufferedRandom)):
             self._file = file
         else:
-            raise TypeError(f"Invalid file type. Accepted - string, Path, TextIOWrapper")
+            raise TypeError(f"Invalid file type. Accepted - string, Path, BufferedReader")
         
         self._iterator = self._iterate()
         
@@ -1,13 +1,21 @@
 from .sequence import levsim, sublevsim
-from .vector import tanimoto, euclidean_dist, cosine_sim
+from .vector import tanimoto, euclidean_dist, cosine_sim, euclidean_dist_matrix, cosine_sim_matrix, euclidean_top_k, cosine_top_k
 from .binary_classification import * 
+from .structure import bp_distance, bp_distance_matrix
+from .evaluation import MetricsAccumulator, evaluate_files
+from .fingerprint import PackedFingerprints, pack_fingerprints, tanimoto_bulk, tanimoto_matrix, tanimoto_top_k
 
 
 __all__ = ["levsim", "sublevsim", 
            "tanimoto", "euclidean_dist", "cosine_sim", 
-           "confusion_matrix", "binary_eval", 
+           "euclidean_dist_matrix", "cosine_sim_matrix", "euclidean_top_k", "cosine_top_k", 
+           "bp_distance", "bp_distance_matrix", 
+           "PackedFingerprints", "pack_fingerprints", 
+           "tanimoto_bulk", "tanimoto_matrix", "tanimoto_top_k", 
+           "confusion_matrix", "binary_eval", "binary_eval_batch", 
+           "MetricsAccumulator", "evaluate_files", 
            "recall", "precision", 
            "f_score", "accuracy", 
            "specificity", 
-           "tpr", "tnr", "fpr", "fnr"
+           "tpr", "tnr", "fpr", "fnr", "MCC"
           ]
\ No newline at end of file
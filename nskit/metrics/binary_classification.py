@@ -1,8 +1,9 @@
+from typing import Iterable, List, Optional, Tuple, Union
 from collections import namedtuple
 import math
 import numpy as np
 
-from ..parse_na import NA
+from ..parse_na import parse_structure, parse_partners
 from ..containers.nucleic_acid import NucleicAcid
 
 
@@ -10,28 +11,216 @@ from ..containers.nucleic_acid import NucleicAcid
 ROUND_VALUE = 6
 
 
+def _partners(struct) -> np.ndarray:
+    # partner index of each nucleotide, -1 for unpaired
+    if isinstance(struct, np.ndarray):
+        if struct.ndim!=1:
+            raise ValueError(f"Partner array must be 1 dimensional, got shape {struct.shape}")
+        return struct
+    if isinstance(struct, NucleicAcid):
+        pairs, length = struct.pairs, len(struct)
+    else:
+        pairs, length = parse_structure(struct, ignore_unclosed_bonds=False), len(struct)
+    partners = np.full(length, -1, dtype=np.int64)
+    if len(pairs):
+        pairs = np.array(pairs, dtype=np.int64)
+        partners[pairs[:, 0]] = pairs[:, 1]
+        partners[pairs[:, 1]] = pairs[:, 0]
+    return partners
+
+
+def _flat_partners(structs):
+    # concatenated partner arrays, local index of each position and lengths
+    check = True
+    if isinstance(structs, np.ndarray) and structs.ndim==2:
+        n, length = structs.shape
+        lengths = np.full(n, length, dtype=np.int64)
+        flat = structs.astype(np.int64).ravel()
+        local = np.tile(np.arange(length, dtype=np.int64), n)
+        offsets = local - np.arange(len(flat), dtype=np.int64)
+        bound = length
+    else:
+        if all([isinstance(s, str) for s in structs]):
+            flat, lengths = parse_partners(structs) # brackets are matched for all strings at once
+            check = False
+        else:
+            arrays = [_partners(s) for s in structs]
+            lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+            flat = np.concatenate(arrays).astype(np.int64) if len(arrays) else np.zeros(0, dtype=np.int64)
+        offsets = -np.repeat(np.cumsum(lengths) - lengths, lengths)
+        local = np.arange(len(flat), dtype=np.int64) + offsets
+        bound = np.repeat(lengths, lengths)
+
+    if check:
+        if np.any(flat<-1) or np.any(flat>=bound):
+            raise ValueError("Partner indexes must be -1 or positions of the same structure")
+        paired = np.nonzero(flat>=0)[0]
+        if np.any(flat[flat[paired] - offsets[paired]] != local[paired]):
+            raise ValueError("Partner arrays must be symmetric")
+    return flat, local, lengths
+
+
+def _pairs_and_length(struct) -> Tuple[List[Tuple[int, int]], Optional[int]]:
+    # complementary pairs (i<j) and length, unknown for pair arrays
+    if isinstance(struct, NucleicAcid):
+        return struct.pairs, len(struct)
+    if isinstance(struct, str):
+        return parse_structure(struct, ignore_unclosed_bonds=False), len(struct)
+
+    struct = np.asarray(struct)
+    if struct.ndim==2 and struct.shape[1]==2:
+        pairs = np.sort(struct.astype(np.int64), axis=1)
+        if np.any(pairs[:, 0]<0) or np.any(pairs[:, 0]==pairs[:, 1]):
+            raise ValueError("Pair array must contain pairs of distinct non negative indexes")
+        return list(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist())), None
+
+    partners, local, _ = _flat_partners([struct])
+    idx = np.nonzero(partners>local)[0]
+    return list(zip(idx.tolist(), partners[idx].tolist())), len(partners)
+
+
 def _prepare_complementary_pairs(true, pred):
-    if len(true)!=len(pred):
+    # dot structures, partner and pair arrays are matched directly without NucleicAcid construction
+    true, true_len = _pairs_and_length(true)
+    pred, pred_len = _pairs_and_length(pred)
+    if true_len is None and pred_len is None:
+        raise ValueError("Length of compared structures is unknown, "
+                         "pass dot structure, NucleicAcid or partner array as one of them")
+    if true_len is not None and pred_len is not None and true_len!=pred_len:
         raise ValueError((f"Compared nucleic acids must be the same length, "
-                          f"got {len(true)} and {len(pred)}."))
-        
-    true = NA(true)
-    if len(true.pairs)==0:
-        raise ValueError(f"True structure has no complementary bonds.")
+                          f"got {true_len} and {pred_len}."))
+    length = pred_len if true_len is None else true_len
     
-    pred = NA(pred)
+    if len(true)==0:
+        raise ValueError(f"True structure has no complementary bonds.")
+    for pairs in (true, pred):
+        if len(pairs) and max([j for _, j in pairs])>=length:
+            raise ValueError(f"Pair index out of structure of length {length}")
     
-    return true, pred
+    return set(true), set(pred), length
+
+
+PAIR_SUBSETS = ('all', 'nested', 'knot')
+
+
+def _pairs_to_partners(pairs, length: int) -> np.ndarray:
+    partners = np.full(length, -1, dtype=np.int64)
+    if len(pairs):
+        pairs = np.array(list(pairs), dtype=np.int64)
+        partners[pairs[:, 0]] = pairs[:, 1]
+        partners[pairs[:, 1]] = pairs[:, 0]
+    return partners
+
+
+def _row_sums(mask: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # number of True values of each structure in concatenated mask
+    cumsum = np.zeros(len(mask)+1, dtype=np.int64)
+    np.cumsum(mask, out=cumsum[1:])
+    ends = np.cumsum(lengths)
+    return cumsum[ends] - cumsum[ends-lengths]
+
+
+def _knot_mask(partners: np.ndarray, local: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # nucleotides of knot_pairs - pairs of helixes with order > 0, see NucleicAcidGraph.helix_orders
+    mask = np.zeros(len(partners), dtype=bool)
+    start = np.arange(len(partners), dtype=np.int64) - local
+    step = (partners>local).astype(np.int32) - ((partners>=0) & (partners<local))
+    pos = np.nonzero(step)[0]
+    if len(pos)==0:
+        return mask
+
+    # pairs of structure without knots are the same as matching of all brackets by nesting depth
+    depth = np.cumsum(step[pos])
+    level = depth + (step[pos]<0)
+    nested = pos[np.lexsort((pos, level))].reshape(-1, 2)
+    crossing = nested[partners[nested[:, 0]] + start[nested[:, 0]]!=nested[:, 1], 0]
+    ends = np.cumsum(lengths)
+    knotted = np.unique(np.searchsorted(ends, crossing, side='right'))
+
+    # helixes of knotted structures are ordered greedily: helix is nested (order 0) 
+    # if it does not cross previous nested helixes, which are kept in stack of closing indexes
+    for k in knotted.tolist():
+        st = int(ends[k] - lengths[k])
+        part = partners[st:ends[k]]
+        o = np.nonzero(part>np.arange(len(part)))[0]
+        e = part[o]
+        new = np.ones(len(o), dtype=bool)
+        new[1:] = (np.diff(o)!=1) | (e[:-1] - e[1:]!=1)
+        first = np.nonzero(new)[0]
+        knot_helix = np.zeros(len(first), dtype=bool)
+        stack = []
+        for h, (c, d) in enumerate(zip(o[first].tolist(), e[first].tolist())):
+            while stack and stack[-1]<c:
+                stack.pop()
+            if stack and d>stack[-1]:
+                knot_helix[h] = True
+            else:
+                stack.append(d)
+
+        knot = knot_helix[np.cumsum(new) - 1]
+        mask[st + o[knot]] = True
+        mask[st + e[knot]] = True
+    return mask
+
+
+def _select_pairs(partners: np.ndarray, local: np.ndarray, lengths: np.ndarray, pairs: str) -> np.ndarray:
+    # partner arrays with pairs out of subset removed
+    if pairs not in PAIR_SUBSETS:
+        raise ValueError(f"Unknown pairs subset '{pairs}', expected one of {', '.join(PAIR_SUBSETS)}")
+    if pairs=='all':
+        return partners
+    knot = _knot_mask(partners, local, lengths)
+    return np.where(knot if pairs=='knot' else ~knot, partners, -1)
+
+
+def _matched(a: np.ndarray, b: np.ndarray, local: np.ndarray, shift: int) -> np.ndarray:
+    # opening positions of pairs (i, j) of a if b has pair (i, j +- shift) or (i +- shift, j)
+    i = np.nonzero(a>local)[0]
+    j = a[i]
+    mask = np.zeros(len(a), dtype=bool)
+    if shift==0:
+        mask[i] = b[i]==j
+        return mask
+    
+    bi = b[i]
+    bj = b[i - local[i] + j]
+    m = ((bi>local[i]) & (np.abs(bi - j)<=shift)) | ((bj>=0) & (bj<j) & (np.abs(bj - local[i])<=shift))
+    mask[i[m]] = True
+    return mask
+
+
+def _pair_counts(true: np.ndarray, pred: np.ndarray, local: np.ndarray, lengths: np.ndarray, shift: int):
+    # tp, fp, fn, tn and number of true pairs of each structure
+    # tp - true pairs with matching predicted pair, fp - predicted pairs without matching true pair
+    if shift<0:
+        raise ValueError(f"Shift must be non negative, got {shift}")
+    positive = _row_sums(true>local, lengths)
+    tp = _row_sums(_matched(true, pred, local, shift), lengths)
+    fp = _row_sums(pred>local, lengths) - (tp if shift==0 else _row_sums(_matched(pred, true, local, shift), lengths))
+    fn = positive - tp
+    tn = (lengths**2 - lengths)//2 - positive - fp
+    return tp, fp, fn, tn, positive
 
 
 ConfusionMatrix = namedtuple("ConfusionMatrix", ["cm", "P", "N"])
 
-def confusion_matrix(true, pred):
-    true, pred = _prepare_complementary_pairs(true, pred)
-    positive = set(true.pairs) # true positive bonds
-    pred = set(pred.pairs)
+def confusion_matrix(true, pred, *, pairs: str = 'all', shift: int = 0):
+    """
+    Confusion matrix of predicted complementary bonds.
+
+    :param true: true dot structure, NucleicAcid, partner array (partner index of each nucleotide, -1 - unpaired) 
+        or (k, 2) pair array.
+    :param pred: predicted structure in the same form, length of pair arrays is taken from other structure.
+    :param pairs: evaluated pairs - 'all', 'nested' or 'knot' (knot_pairs), subset is taken from both structures.
+    :param shift: predicted pair (i, j) matches true pair (i, j +- shift) or (i +- shift, j). Default - 0, exact match.
+
+    :return: ConfusionMatrix of [[TN, FP], [FN, TP]] matrix, set of true bonds and number of negatives.
+    """
+
+    positive, pred, N = _prepare_complementary_pairs(true, pred) # true positive bonds
+    if pairs!='all' or shift!=0:
+        return _confusion_matrix_arrays(positive, pred, N, pairs, shift)
     
-    N = len(true)
     N = int((N**2 - N)/2) - len(positive) # all possible bonds minus existing
     
     TP = positive & pred # true positive (correctly predicted bonds)
@@ -44,6 +233,21 @@ def confusion_matrix(true, pred):
                   dtype=np.int32)
     
     return ConfusionMatrix(cm=cm, P=positive, N=N)
+
+
+def _confusion_matrix_arrays(positive, pred, length, pairs, shift):
+    local = np.arange(length, dtype=np.int64)
+    lengths = np.array([length], dtype=np.int64)
+    true = _select_pairs(_pairs_to_partners(positive, length), local, lengths, pairs)
+    pred = _select_pairs(_pairs_to_partners(pred, length), local, lengths, pairs)
+    tp, fp, fn, tn, _ = [int(x[0]) for x in _pair_counts(true, pred, local, lengths, shift)]
+    
+    idx = np.nonzero(true>local)[0]
+    positive = set(zip(idx.tolist(), true[idx].tolist()))
+    cm = np.array([[tn, fp], 
+                   [fn, tp]], 
+                  dtype=np.int32)
+    return ConfusionMatrix(cm=cm, P=positive, N=tn + fp)
     
     
 ###  Metrics
@@ -51,8 +255,13 @@ def confusion_matrix(true, pred):
 metrics_list = ["recall", "precision", "f1", "accuracy", "specificity", "tpr", "tnr", "fpr", "fnr"]
 BinaryMetrics = namedtuple("BinaryMetrics", metrics_list)
 
-def binary_eval(true, pred):
-    conf_matrix = confusion_matrix(true, pred)
+def binary_eval(true, pred, *, pairs: str = 'all', shift: int = 0):
+    """
+    All binary metrics of predicted complementary bonds, see confusion_matrix for arguments.
+    Rates of true pairs are nan if evaluated subset of true structure is empty.
+    """
+    
+    conf_matrix = confusion_matrix(true, pred, pairs=pairs, shift=shift)
     
     tpr = _tpr(conf_matrix)
     tnr = _tnr(conf_matrix)
@@ -73,6 +282,8 @@ def binary_eval(true, pred):
 # recall - true positive rate
 def _tpr(conf_matrix):
     tn, fp, fn, tp = conf_matrix.cm.ravel()
+    if len(conf_matrix.P)==0: # empty pairs subset
+        return math.nan
     x = tp/len(conf_matrix.P)
     return round(x, ROUND_VALUE)
     
@@ -139,7 +350,10 @@ def precision(true, pred):
 # F-score
 def _f_score(conf_matrix, beta):
     tn, fp, fn, tp = conf_matrix.cm.ravel()
-    x = (1 + beta**2)*tp / ((1 + beta**2)*tp + (beta**2)*fn + fp)
+    denom = (1 + beta**2)*tp + (beta**2)*fn + fp
+    if denom==0: # empty pairs subset of both structures
+        return math.nan
+    x = (1 + beta**2)*tp / denom
     return round(x, ROUND_VALUE)
     
 
@@ -163,26 +377,90 @@ def accuracy(true, pred):
 # Matthews correlation coefficient
 def _mcc(conf_matrix):
     tn, fp, fn, tp = conf_matrix.cm.ravel()
+    tn, fp, fn, tp = [float(x) for x in (tn, fp, fn, tp)] # int32 products overflow
     denom = math.sqrt( (tp+fp)*(tp+fn)*(tn+fp)*(tn+fn) )
     if denom==0:
         return 0
-    x = (tp*tn + fp*fn) / denom
+    x = (tp*tn - fp*fn) / denom
     return round(x, ROUND_VALUE)
     
     
 def MCC(true, pred):
     conf_matrix = confusion_matrix(true, pred)
     return _mcc(conf_matrix)
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
\ No newline at end of file
+
+
+### BATCH
+
+BATCH_METRICS_DTYPE = np.dtype([("tp", np.int64), ("fp", np.int64), ("fn", np.int64), ("tn", np.int64)] + 
+                               [(name, np.float64) for name in metrics_list + ["mcc"]])
+
+
+def _safe_div(x, y, fill: float = 0.):
+    return np.divide(x, y, out=np.full(len(x), fill, dtype=np.float64), where=y!=0)
+
+
+def binary_eval_batch(trues: Union[np.ndarray, Iterable[Union[str, NucleicAcid, np.ndarray]]], 
+                      preds: Union[np.ndarray, Iterable[Union[str, NucleicAcid, np.ndarray]]], *, 
+                      pairs: str = 'all', 
+                      shift: int = 0
+                     ) -> np.ndarray:
+    """
+    Evaluates many predicted structures against true ones at once, same metrics as binary_eval and MCC.
+    Structures are converted into partner arrays and confusion matrices of all pairs are counted with
+    vectorized operations over concatenated arrays.
+
+    :param trues: true dot structures, NucleicAcids or int partner arrays (partner index of each nucleotide, -1 - unpaired), 
+        or (n, length) partner matrix.
+    :param preds: predicted structures in the same form.
+    :param pairs: evaluated pairs - 'all', 'nested' or 'knot' (knot_pairs), subset is taken from both structures.
+    :param shift: predicted pair (i, j) matches true pair (i, j +- shift) or (i +- shift, j). Default - 0, exact match.
+
+    :return: structured numpy array (n, ) with int64 fields tp, fp, fn, tn and float64 fields 
+        recall, precision, f1, accuracy, specificity, tpr, tnr, fpr, fnr, mcc.
+    """
+
+    if not (isinstance(trues, np.ndarray) and trues.ndim==2):
+        trues = list(trues)
+    if not (isinstance(preds, np.ndarray) and preds.ndim==2):
+        preds = list(preds)
+    if len(trues)!=len(preds):
+        raise ValueError(f"Got {len(trues)} true and {len(preds)} predicted structures")
+
+    true, local, lengths = _flat_partners(trues)
+    pred, _, pred_lengths = _flat_partners(preds)
+    if np.any(lengths!=pred_lengths):
+        i = int(np.nonzero(lengths!=pred_lengths)[0][0])
+        raise ValueError((f"Compared nucleic acids must be the same length, "
+                          f"got {lengths[i]} and {pred_lengths[i]} at index {i}."))
+
+    # each pair is counted once at its opening position
+    empty = _row_sums(true>local, lengths)==0
+    if np.any(empty):
+        raise ValueError(f"True structure at index {int(np.nonzero(empty)[0][0])} has no complementary bonds.")
+    true = _select_pairs(true, local, lengths, pairs)
+    pred = _select_pairs(pred, local, lengths, pairs)
+    tp, fp, fn, tn, _ = _pair_counts(true, pred, local, lengths, shift)
+
+    return _metrics_from_counts(tp, fp, fn, tn)
+
+
+def _metrics_from_counts(tp, fp, fn, tn) -> np.ndarray:
+    # structured array of metrics of confusion matrices, rates of true pairs are nan for empty pairs subset
+    tp, fp, fn, tn = [np.atleast_1d(np.asarray(x, dtype=np.int64)) for x in (tp, fp, fn, tn)]
+    res = np.zeros(len(tp), dtype=BATCH_METRICS_DTYPE)
+    res['tp'], res['fp'], res['fn'], res['tn'] = tp, fp, fn, tn
+
+    tp, fp, fn, tn = [x.astype(np.float64) for x in (tp, fp, fn, tn)]
+    res['tpr'] = res['recall'] = _safe_div(tp, tp + fn, np.nan)
+    res['fnr'] = 1 - res['tpr']
+    res['fpr'] = _safe_div(fp, fp + tn)
+    res['tnr'] = res['specificity'] = 1 - res['fpr']
+    res['precision'] = _safe_div(tp, tp + fp)
+    res['f1'] = _safe_div(2*tp, 2*tp + fn + fp, np.nan)
+    res['accuracy'] = _safe_div(tp + tn, tp + tn + fp + fn, np.nan)
+    res['mcc'] = _safe_div(tp*tn - fp*fn, np.sqrt((tp+fp)*(tp+fn)*(tn+fp)*(tn+fn)))
+
+    for name in metrics_list + ["mcc"]:
+        res[name] = np.round(res[name], ROUND_VALUE)
+    return res
@@ -0,0 +1,333 @@
+from typing import Iterable, Iterator, Optional, Tuple, Union
+from collections import namedtuple
+from pathlib import Path
+import tempfile
+import sqlite3
+import numpy as np
+
+from ..containers.nucleic_acid import NucleicAcid
+from ..io import dotLinesRead, dotRead, bnaRead
+from ..io.dot import META_SEPARATOR
+from ..parse_na import parse_arguments
+from .binary_classification import binary_eval_batch, metrics_list, _metrics_from_counts
+
+
+
+BATCH_SIZE = 10000
+SQLITE_MAX_VARIABLES = 900 # names selected by one query
+METRICS = metrics_list + ["mcc"]
+
+EvalMetrics = namedtuple("EvalMetrics", METRICS)
+EvaluationResult = namedtuple("EvaluationResult", ["n", "missing", "unmatched", "invalid", "cm", "micro", "macro", "duplicates"])
+
+
+class MetricsAccumulator:
+    """
+    Running aggregates of binary metrics in constant memory:
+    micro average - metrics of summed confusion matrix of all structures,
+    macro average - mean of metrics of structures, nan values (empty pairs subsets) are skipped.
+    """
+
+    def __init__(self, *, pairs: str = 'all', shift: int = 0):
+        """
+        :param pairs: evaluated pairs - 'all', 'nested' or 'knot', see binary_eval_batch.
+        :param shift: pair shift tolerance, see binary_eval_batch.
+        """
+
+        binary_eval_batch([], [], pairs=pairs, shift=shift) # validates arguments
+        self.pairs = pairs
+        self.shift = shift
+        self.n = 0
+        self._counts = np.zeros(4, dtype=np.int64) # tp, fp, fn, tn
+        self._sums = np.zeros(len(METRICS), dtype=np.float64)
+        self._n_values = np.zeros(len(METRICS), dtype=np.int64)
+
+
+    def update(self, res: np.ndarray):
+        """
+        Adds evaluated structures.
+
+        :param res: structured array of binary_eval_batch.
+        """
+
+        self.n += len(res)
+        for k, name in enumerate(('tp', 'fp', 'fn', 'tn')):
+            self._counts[k] += res[name].sum()
+        values = np.stack([res[name] for name in METRICS], axis=1).reshape(-1, len(METRICS))
+        valid = ~np.isnan(values)
+        self._sums += np.where(valid, values, 0).sum(axis=0)
+        self._n_values += valid.sum(axis=0)
+
+
+    def add(self, trues: Iterable, preds: Iterable) -> np.ndarray:
+        """
+        Evaluates and adds structures, see binary_eval_batch for arguments.
+
+        :return: structured array of binary_eval_batch.
+        """
+
+        res = binary_eval_batch(trues, preds, pairs=self.pairs, shift=self.shift)
+        self.update(res)
+        return res
+
+
+    @property
+    def cm(self) -> np.ndarray:
+        """
+        Summed confusion matrix [[TN, FP], [FN, TP]].
+        """
+
+        tp, fp, fn, tn = self._counts
+        return np.array([[tn, fp],
+                         [fn, tp]],
+                        dtype=np.int64)
+
+
+    def micro(self) -> EvalMetrics:
+        res = _metrics_from_counts(*self._counts)[0]
+        return EvalMetrics(*[float(res[name]) for name in METRICS])
+
+
+    def macro(self) -> EvalMetrics:
+        means = np.divide(self._sums, self._n_values, out=np.full(len(METRICS), np.nan), where=self._n_values>0)
+        return EvalMetrics(*means.tolist())
+
+
+def _dot_records(reader: dotLinesRead, meta_separator: str) -> Iterator[Tuple[str, Optional[str]]]:
+    # (name, structure) of raw dot records without NucleicAcid construction,
+    # second line is structure if it is detected as structure by dotRead, record without structure has no pairs
+    for lines in reader:
+        name = lines[0].strip(" >")
+        if len(lines)<2:
+            yield name, None
+        elif len(lines)>2 and meta_separator not in lines[2]:
+            yield name, lines[2]
+        else:
+            _, struct = parse_arguments(lines[1], None)
+            yield name, '.'*len(lines[1]) if struct is None else struct
+
+
+def _na_records(nas: Iterable) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    for na in nas:
+        if na is None: # invalid record of reader
+            yield None, None
+        elif isinstance(na, NucleicAcid):
+            # struct of NucleicAcid without pairs is None, it is evaluated as unpaired structure
+            yield na.name, na.struct or '.'*len(na)
+        else:
+            yield tuple(na)
+
+
+def _open_records(source, meta_separator: str):
+    # records iterator and file opened here
+    if isinstance(source, (str, Path)):
+        if Path(source).suffix=='.bna':
+            reader = bnaRead(source)
+            return _na_records(reader), reader
+        reader = dotLinesRead(source)
+        return _dot_records(reader, meta_separator), reader
+
+    if isinstance(source, (dotRead, bnaRead)):
+        return _na_records(source), None
+    if isinstance(source, dotLinesRead):
+        return _dot_records(source, meta_separator), None
+    return _na_records(source), None
+
+
+def _is_sorted(source) -> bool:
+    # names of .dot/.fasta file are in ascending order, other sources are not checked
+    if not isinstance(source, (str, Path)) or Path(source).suffix=='.bna':
+        return False
+    prev = None
+    with open(source) as f:
+        for line in f:
+            if line.startswith('>'):
+                name = line.strip().strip(" >")
+                if prev is not None and name<prev:
+                    return False
+                prev = name
+    return True
+
+
+def _sorted_merge(truth, pred, stats):
+    # joined (true, pred) structures of two name sorted streams, first record of duplicated name is used
+    def advance(records, key):
+        for name, struct in records:
+            if name is None:
+                stats['invalid'] += 1
+                continue
+            if stats[key] is not None and name<stats[key]:
+                raise ValueError(f"Records are not sorted by name: '{name}' after '{stats[key]}', use presorted=False")
+            if name==stats[key]:
+                stats['duplicates'] += 1
+                continue
+            stats[key] = name
+            return name, struct
+        return None
+
+    t = advance(truth, 'last_true')
+    p = advance(pred, 'last_pred')
+    while t is not None and p is not None:
+        if t[0]==p[0]:
+            yield t[1], p[1]
+            t = advance(truth, 'last_true')
+            p = advance(pred, 'last_pred')
+        elif t[0]<p[0]:
+            stats['missing'] += 1
+            t = advance(truth, 'last_true')
+        else:
+            stats['unmatched'] += 1
+            p = advance(pred, 'last_pred')
+
+    while t is not None:
+        stats['missing'] += 1
+        t = advance(truth, 'last_true')
+    while p is not None:
+        stats['unmatched'] += 1
+        p = advance(pred, 'last_pred')
+
+
+def _index_join(truth, pred, stats, tmp_dir, batch_size):
+    # predictions are indexed by name in temporary sqlite file, truth is streamed in batches,
+    # first record of duplicated name is used as by _sorted_merge
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as d:
+        db = sqlite3.connect(Path(d)/'index.sqlite')
+        try:
+            db.execute("CREATE TABLE preds (name TEXT PRIMARY KEY, struct TEXT, used INTEGER) WITHOUT ROWID")
+            db.execute("CREATE TABLE truth (name TEXT PRIMARY KEY) WITHOUT ROWID")
+            def insert(rows):
+                stats['duplicates'] += len(rows) - db.executemany("INSERT OR IGNORE INTO preds VALUES (?, ?, 0)", rows).rowcount
+
+            rows = []
+            for name, struct in pred:
+                if name is None:
+                    stats['invalid'] += 1
+                    continue
+                rows.append((name, struct))
+                if len(rows)>=batch_size:
+                    insert(rows)
+                    rows = []
+            insert(rows)
+            db.commit()
+
+            batch = []
+            def lookup(batch):
+                found = {}
+                names = list(dict.fromkeys([name for name, _ in batch]))
+                for start in range(0, len(names), SQLITE_MAX_VARIABLES):
+                    part = names[start:start+SQLITE_MAX_VARIABLES]
+                    marks = ','.join(['?']*len(part))
+                    found.update(db.execute(f"SELECT name, struct FROM preds WHERE name IN ({marks})", part))
+                    db.execute(f"UPDATE preds SET used=1 WHERE name IN ({marks})", part)
+                for name, struct in batch:
+                    if name in found:
+                        yield struct, found[name]
+                    else:
+                        stats['missing'] += 1
+
+            for name, struct in truth:
+                if name is None:
+                    stats['invalid'] += 1
+                    continue
+                if db.execute("INSERT OR IGNORE INTO truth VALUES (?)", (name, )).rowcount==0:
+                    stats['duplicates'] += 1
+                    continue
+                batch.append((name, struct))
+                if len(batch)>=batch_size:
+                    yield from lookup(batch)
+                    batch = []
+            yield from lookup(batch)
+            stats['unmatched'] += db.execute("SELECT COUNT(*) FROM preds WHERE used=0").fetchone()[0]
+        finally:
+            db.close()
+
+
+def _add_batch(acc: MetricsAccumulator, trues: list, preds: list) -> int:
+    # evaluates batch, invalid pairs (different lengths, no true pairs, invalid brackets) are skipped
+    try:
+        acc.add(trues, preds)
+        return 0
+    except ValueError:
+        pass
+
+    valid = []
+    for t, p in zip(trues, preds):
+        try:
+            binary_eval_batch([t], [p])
+            valid.append((t, p))
+        except ValueError:
+            pass
+    if len(valid):
+        acc.add(*zip(*valid))
+    return len(trues) - len(valid)
+
+
+def evaluate_files(truth: Union[str, Path, dotLinesRead, bnaRead, Iterable],
+                   pred: Union[str, Path, dotLinesRead, bnaRead, Iterable], *,
+                   pairs: str = 'all',
+                   shift: int = 0,
+                   presorted: Optional[bool] = None,
+                   batch_size: int = BATCH_SIZE,
+                   tmp_dir: Optional[Union[str, Path]] = None,
+                   meta_separator: str = META_SEPARATOR
+                  ) -> EvaluationResult:
+    """
+    Evaluates predicted structures against true ones joined by name in constant memory.
+    If both sources are sorted by name they are joined by merge, otherwise predictions are indexed
+    by name in temporary sqlite file. Metrics are accumulated in batches by MetricsAccumulator.
+    Dot files are read as raw records without NucleicAcid construction.
+
+    :param truth: true structures - .dot/.bna path, reader, NucleicAcids or (name, structure) tuples.
+    :param pred: predicted structures in the same form. In both sources the first record of a name is used,
+        later records of the same name are skipped and counted as duplicates.
+    :param pairs: evaluated pairs - 'all', 'nested' or 'knot', see binary_eval_batch.
+    :param shift: pair shift tolerance, see binary_eval_batch.
+    :param presorted: both sources are sorted by name. Default - checked by scan of names of .dot files.
+    :param batch_size: number of structures evaluated at once.
+    :param tmp_dir: directory of temporary index file. Default - system temporary directory.
+    :param meta_separator: meta separator of dot records.
+
+    :return: EvaluationResult of number of evaluated structures, true structures without prediction,
+        predictions without true structure, invalid records and pairs, summed confusion matrix, micro and macro metrics
+        and number of skipped duplicated records.
+    """
+
+    acc = MetricsAccumulator(pairs=pairs, shift=shift)
+    if presorted is None:
+        presorted = _is_sorted(truth) and _is_sorted(pred)
+
+    truth_records, truth_file = _open_records(truth, meta_separator)
+    pred_records, pred_file = _open_records(pred, meta_separator)
+    stats = {'missing':0, 'unmatched':0, 'invalid':0, 'duplicates':0, 'last_true':None, 'last_pred':None}
+    try:
+        if presorted:
+            joined = _sorted_merge(truth_records, pred_records, stats)
+        else:
+            joined = _index_join(truth_records, pred_records, stats, tmp_dir, batch_size)
+
+        trues, preds = [], []
+        for t, p in joined:
+            if t is None or p is None: # record without structure
+                stats['invalid'] += 1
+                continue
+            trues.append(t)
+            preds.append(p)
+            if len(trues)>=batch_size:
+                stats['invalid'] += _add_batch(acc, trues, preds)
+                trues, preds = [], []
+        if len(trues):
+            stats['invalid'] += _add_batch(acc, trues, preds)
+    finally:
+        for f in (truth_file, pred_file):
+            if f is not None:
+                f.close()
+
+    return EvaluationResult(n=acc.n,
+                            missing=stats['missing'],
+                            unmatched=stats['unmatched'],
+                            invalid=stats['invalid'],
+                            cm=acc.cm,
+                            micro=acc.micro(),
+                            macro=acc.macro(),
+                            duplicates=stats['duplicates']
+                           )
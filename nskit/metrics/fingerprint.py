@@ -0,0 +1,205 @@
+from collections import namedtuple
+from typing import Optional, Union
+import numpy as np
+
+
+
+BLOCK_WORDS = 1<<18 # uint64 words of (queries, library rows, words) intersection block
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _bit_count_table(words: np.ndarray) -> np.ndarray:
+    # number of set bits of each uint64 word with byte lookup table
+    b = np.ascontiguousarray(words, dtype=np.uint64).view(np.uint8)
+    return POPCOUNT_TABLE[b].reshape(words.shape + (8, )).sum(axis=-1, dtype=np.uint8)
+
+
+if hasattr(np, 'bitwise_count'): # numpy>=2.0
+    _bit_count = np.bitwise_count
+else:
+    _bit_count = _bit_count_table
+
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    # number of set bits along last axis
+    return _bit_count(words).sum(axis=-1, dtype=np.int64)
+
+
+class PackedFingerprints:
+    """
+    Binary fingerprints packed into uint64 words, 64 bits per word, with precomputed bit counts.
+    """
+
+    def __init__(self, words: np.ndarray, n_bits: int, counts: Optional[np.ndarray] = None):
+        """
+        :param words: uint64 matrix (n, ceil(n_bits/64)).
+        :param n_bits: number of fingerprint bits.
+        :param counts: number of set bits of each fingerprint. Default - computed from words.
+        """
+
+        self.words = np.ascontiguousarray(words, dtype=np.uint64)
+        self.n_bits = n_bits
+        self.counts = _popcount(self.words) if counts is None else counts
+
+
+    def __len__(self):
+        return len(self.words)
+
+
+    def __getitem__(self, idx) -> 'PackedFingerprints':
+        words = self.words[idx].reshape(-1, self.words.shape[1])
+        return PackedFingerprints(words, self.n_bits, np.atleast_1d(self.counts[idx]))
+
+
+    def unpack(self) -> np.ndarray:
+        """
+        Dense int32 fingerprint matrix (n, n_bits).
+        """
+
+        bits = np.unpackbits(self.words.view(np.uint8), axis=1)[:, :self.n_bits]
+        return bits.astype(np.int32)
+
+
+def pack_fingerprints(X: np.ndarray) -> PackedFingerprints:
+    """
+    Packs dense fingerprints (non zero values are set bits) into uint64 words.
+
+    :param X: fingerprint vector or matrix (n, n_bits).
+
+    :return: PackedFingerprints object.
+    """
+
+    X = np.asarray(X)
+    if X.ndim==1:
+        X = X[None]
+    n, n_bits = X.shape
+    n_words = (n_bits + 63)//64
+
+    packed = np.zeros((n, n_words*8), dtype=np.uint8)
+    packed[:, :(n_bits+7)//8] = np.packbits(X!=0, axis=1)
+    return PackedFingerprints(packed.view(np.uint64), n_bits)
+
+
+def _as_packed(X: Union[np.ndarray, PackedFingerprints]) -> PackedFingerprints:
+    return X if isinstance(X, PackedFingerprints) else pack_fingerprints(X)
+
+
+def _tanimoto_block(q: PackedFingerprints, l: PackedFingerprints) -> np.ndarray:
+    # word by word accumulation is faster than reduction along short last axis
+    inter = np.zeros((len(q), len(l)), dtype=np.int64)
+    for w in range(q.words.shape[1]):
+        inter += _bit_count(q.words[:, None, w] & l.words[None, :, w])
+    union = q.counts[:, None] + l.counts[None, :] - inter
+    return np.divide(inter, union, out=np.zeros(inter.shape, dtype=np.float64), where=union>0)
+
+
+def _blocks(n_queries: int, n_library: int, n_words: int, block_words: int):
+    q_size = max(1, min(n_queries, block_words//max(1, n_words)))
+    l_size = max(1, block_words//(q_size*max(1, n_words)))
+    for q_start in range(0, n_queries, q_size):
+        yield slice(q_start, min(q_start+q_size, n_queries)), l_size
+
+
+def tanimoto_matrix(queries: Union[np.ndarray, PackedFingerprints],
+                    library: Optional[Union[np.ndarray, PackedFingerprints]] = None, *,
+                    block_words: int = BLOCK_WORDS
+                   ) -> np.ndarray:
+    """
+    Tanimoto similarity between all query and library fingerprints, computed in blocks with popcount.
+    Similarity of two empty fingerprints is 0.
+
+    :param queries: dense fingerprint matrix or PackedFingerprints.
+    :param library: dense fingerprint matrix or PackedFingerprints. Default - queries.
+    :param block_words: size of intersection block in uint64 words.
+
+    :return: float64 numpy matrix (len(queries), len(library)).
+    """
+
+    q = _as_packed(queries)
+    l = q if library is None else _as_packed(library)
+    sim = np.empty((len(q), len(l)), dtype=np.float64)
+    for qs, l_size in _blocks(len(q), len(l), q.words.shape[1], block_words):
+        for start in range(0, len(l), l_size):
+            sim[qs, start:start+l_size] = _tanimoto_block(q[qs], l[start:start+l_size])
+    return sim
+
+
+def tanimoto_bulk(query: Union[np.ndarray, PackedFingerprints],
+                  library: Union[np.ndarray, PackedFingerprints], *,
+                  block_words: int = BLOCK_WORDS
+                 ) -> np.ndarray:
+    """
+    Tanimoto similarity between one query fingerprint and all library fingerprints.
+
+    :return: float64 numpy vector (len(library), ).
+    """
+
+    return tanimoto_matrix(_as_packed(query)[:1], library, block_words=block_words)[0]
+
+
+def _select_k(scores: np.ndarray, indices: np.ndarray, k: int):
+    # k best scores of each row, ties are resolved by lower index, indices increase along rows
+    if k<=0:
+        return scores[:, :0], indices[:, :0]
+    if scores.shape[1]<=k:
+        return scores, indices
+    kth = -np.partition(-scores, k-1, axis=1)[:, k-1:k]
+    rows, cols = np.nonzero(scores>=kth)
+    if len(rows)<=4*k*len(scores):
+        # few candidates - sorted by row, descending score and column
+        order = np.lexsort((cols, -scores[rows, cols], rows))
+        rows, cols = rows[order], cols[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        cols = np.sort(cols[rank<k].reshape(len(scores), k), axis=1)
+    else:
+        # many ties at k-th score
+        greater = scores>kth
+        equal = scores==kth
+        keep = greater | (equal & (np.cumsum(equal, axis=1)<=k-greater.sum(axis=1, keepdims=True)))
+        cols = np.nonzero(keep)[1].reshape(len(scores), k) # row major order keeps indices increasing
+    return np.take_along_axis(scores, cols, axis=1), np.take_along_axis(indices, cols, axis=1)
+
+
+TopK = namedtuple("TopK", ["indices", "scores"])
+
+def tanimoto_top_k(queries: Union[np.ndarray, PackedFingerprints],
+                   library: Union[np.ndarray, PackedFingerprints],
+                   k: int, *,
+                   block_words: int = BLOCK_WORDS
+                  ) -> TopK:
+    """
+    Finds k most similar library fingerprints for each query, library is streamed in blocks
+    so only (queries block, k) best candidates are kept in memory.
+    Candidates are ordered by descending similarity, ties by library index.
+
+    :param queries: dense fingerprint vector/matrix or PackedFingerprints.
+    :param library: dense fingerprint matrix or PackedFingerprints.
+    :param k: number of neighbours, limited by library size, no neighbours if k<=0 (same as FingerprintIndex.knn).
+
+    :return: TopK of int64 indices and float64 scores, (len(queries), k) or (k, ) for one dense query vector.
+    """
+
+    single = isinstance(queries, np.ndarray) and queries.ndim==1
+    q = _as_packed(queries)
+    l = _as_packed(library)
+    k = max(0, min(k, len(l)))
+
+    indices = np.empty((len(q), k), dtype=np.int64)
+    scores = np.empty((len(q), k), dtype=np.float64)
+    for qs, l_size in _blocks(len(q), len(l), q.words.shape[1], block_words):
+        n = qs.stop - qs.start
+        best_i = np.empty((n, 0), dtype=np.int64)
+        best_s = np.empty((n, 0), dtype=np.float64)
+        for start in range(0, len(l), l_size):
+            s = _tanimoto_block(q[qs], l[start:start+l_size])
+            cand_s = np.concatenate([best_s, s], axis=1)
+            cand_i = np.concatenate([best_i, np.broadcast_to(np.arange(start, start+s.shape[1]), s.shape)], axis=1)
+            best_s, best_i = _select_k(cand_s, cand_i, k)
+        
+        order = np.lexsort((best_i, -best_s), axis=-1)
+        indices[qs] = np.take_along_axis(best_i, order, axis=1)
+        scores[qs] = np.take_along_axis(best_s, order, axis=1)
+
+    if single:
+        return TopK(indices[0], scores[0])
+    return TopK(indices, scores)
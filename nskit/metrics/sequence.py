@@ -1,4 +1,4 @@
-from ..algo import levdist
+from ..algo import levdist, subdist
 
 
 
@@ -7,4 +7,6 @@ def levsim(x, y):
     
 
 def sublevsim(x, y):
-    return 1 - (levdist(x, y) - abs(len(x)-len(y)))/min(len(x), len(y))
\ No newline at end of file
+    if len(x)>len(y):
+        x, y = y, x
+    return 1 - subdist(x, y)/len(x)
\ No newline at end of file
@@ -0,0 +1,109 @@
+from typing import Iterable, Optional, Union
+import numpy as np
+
+from ..parse_na import parse_structure
+from ..containers.nucleic_acid import NucleicAcid
+
+
+
+BLOCK_SIZE = 1024
+BLOCK_ELEMENTS = 1<<22
+
+
+def _unpack(words: np.ndarray) -> np.ndarray:
+    # float32 bits of uint64 words, bit order is the same for all rows
+    bits = np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis=1)
+    return bits.astype(np.float32)
+
+
+def _pairs_and_length(struct: Union[str, NucleicAcid]):
+    if isinstance(struct, NucleicAcid):
+        return struct.pairs, len(struct)
+    return parse_structure(struct, ignore_unclosed_bonds=False), len(struct)
+
+
+def _pair_codes(structs):
+    codes = []
+    length = None
+    for s in structs:
+        pairs, slen = _pairs_and_length(s)
+        if length is None:
+            length = slen
+        elif slen!=length:
+            raise ValueError(f"All structures must be the same length, got {length} and {slen}")
+
+        pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        codes.append(pairs[:, 0]*slen + pairs[:, 1])
+    return codes, length
+
+
+def bp_distance(a: Union[str, NucleicAcid], b: Union[str, NucleicAcid]) -> int:
+    """
+    Base pair distance - number of complementary pairs present in only one of two structures.
+    """
+
+    if len(a)!=len(b):
+        raise ValueError(f"Compared structures must be the same length, got {len(a)} and {len(b)}")
+
+    pa, _ = _pairs_and_length(a)
+    pb, _ = _pairs_and_length(b)
+    return len(set(pa) ^ set(pb))
+
+
+def bp_distance_matrix(structs: Iterable[Union[str, NucleicAcid]],
+                       other: Optional[Iterable[Union[str, NucleicAcid]]] = None, *,
+                       block_size: int = BLOCK_SIZE,
+                       block_elements: int = BLOCK_ELEMENTS
+                      ) -> np.ndarray:
+    """
+    Computes base pair distance between all structures of the same sequence length.
+    Structures are encoded as bitsets packed into uint64 words over pairs which can be shared
+    by structures of both sets. Shared pairs are counted by matrix multiplication of bitsets
+    unpacked in blocks of rows and words, so memory does not grow with number of distinct pairs.
+
+    :param structs: dot bracket strings or NucleicAcids.
+    :param other: second set of structures. Default - structs.
+    :param block_size: number of rows computed at once.
+    :param block_elements: maximal number of elements of unpacked bits block.
+
+    :return: int32 numpy matrix (len(structs), len(other)).
+    """
+
+    structs = list(structs)
+    other = None if other is None else list(other)
+    codes, length = _pair_codes(structs if other is None else structs + other)
+    n = len(structs)
+    m = n if other is None else len(codes) - n
+    if len(codes)==0:
+        return np.zeros((n, m), dtype=np.int32)
+
+    # bits of pairs present in both sets, other pairs can not be shared
+    counts = np.array([len(c) for c in codes], dtype=np.int64)
+    rows = np.repeat(np.arange(len(codes)), counts)
+    keys, cols = np.unique(np.concatenate(codes), return_inverse=True)
+    cols = cols.ravel()
+    if other is None:
+        both = np.ones(len(keys), dtype=bool)
+    else:
+        both = np.zeros(len(keys), dtype=bool)
+        both[cols[rows<n]] = True
+        in_other = np.zeros(len(keys), dtype=bool)
+        in_other[cols[rows>=n]] = True
+        both &= in_other
+
+    mask = both[cols]
+    bits = (np.cumsum(both) - 1)[cols[mask]]
+    words = np.zeros((len(codes), max(1, (int(both.sum())+63)//64)), dtype=np.uint64)
+    np.bitwise_or.at(words, (rows[mask], bits>>6), np.left_shift(np.uint64(1), (bits&63).astype(np.uint64)))
+
+    A, ca = words[:n], counts[:n]
+    B, cb = (words, counts) if other is None else (words[n:], counts[n:])
+
+    dist = (ca[:, None] + cb[None, :]).astype(np.int32)
+    step = max(1, block_elements//(64*max(m, block_size, 1))) # words unpacked at once
+    for w in range(0, words.shape[1], step):
+        b = _unpack(B[:, w:w+step])
+        for i in range(0, n, block_size):
+            shared = _unpack(A[i:i+block_size, w:w+step])@b.T # exact for counts below 2**24
+            dist[i:i+block_size] -= 2*shared.astype(np.int32)
+    return dist
@@ -1,5 +1,12 @@
+from typing import Optional
 import numpy as np
 
+from .fingerprint import TopK, _select_k
+
+
+
+BLOCK_SIZE = 1<<22 # elements of (queries, library) block
+BLOCK_ROWS = 1<<10 # maximal queries in one block, skinny matrix multiplications are slow
 
 
 def tanimoto(x, y):
@@ -15,4 +22,179 @@ def euclidean_dist(x, y):
 
 
 def cosine_sim(x, y):
-    return np.dot(x, y)/(np.linalg.norm(x)*np.linalg.norm(y))
\ No newline at end of file
+    return np.dot(x, y)/(np.linalg.norm(x)*np.linalg.norm(y))
+
+
+def _as_float(X: np.ndarray, dtype) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"Only float32 and float64 dtypes are supported, got {dtype}")
+    X = np.asarray(X)
+    if X.ndim==1:
+        X = X[None]
+    if X.ndim!=2:
+        raise ValueError(f"Expected vector or matrix, got {X.ndim} dimensional array")
+    return np.ascontiguousarray(X, dtype=dtype)
+
+
+def _block_shape(n: int, m: int, block_size: int):
+    # rows of queries and library in one block of at most block_size elements
+    q_size = max(1, min(n, BLOCK_ROWS, block_size))
+    l_size = max(1, min(m, block_size//q_size))
+    q_size = max(1, min(n, block_size//l_size))
+    return q_size, l_size
+
+
+def _prepare(X, Y, dtype, metric):
+    # float matrices and auxiliary vectors: squared norms for euclidean, normalized rows for cosine
+    X = _as_float(X, dtype)
+    Y = X if Y is None else _as_float(Y, dtype)
+    if X.shape[1]!=Y.shape[1]:
+        raise ValueError(f"Vectors must be the same length, got {X.shape[1]} and {Y.shape[1]}")
+
+    if metric=='cosine':
+        def normalize(A):
+            norms = np.linalg.norm(A, axis=1, keepdims=True)
+            return np.divide(A, norms, out=np.zeros_like(A), where=norms>0)
+        Xn = normalize(X)
+        return Xn, Xn if Y is X else normalize(Y), None, None
+    return X, Y, np.einsum('ij,ij->i', X, X), np.einsum('ij,ij->i', Y, Y)
+
+
+def _fill_block(out, X, Y, xx, yy, metric):
+    # writes block of distances/similarities into out in place
+    np.matmul(X, Y.T, out=out)
+    if metric=='cosine':
+        return
+    out *= -2
+    out += xx[:, None]
+    out += yy[None, :]
+    np.maximum(out, 0, out=out) # rounding errors of expansion
+    np.sqrt(out, out=out)
+
+
+def _pairwise(X, Y, metric, dtype, block_size, out):
+    self_matrix = Y is None
+    X, Y, xx, yy = _prepare(X, Y, dtype, metric)
+    n, m = len(X), len(Y)
+    if out is None:
+        out = np.empty((n, m), dtype=X.dtype)
+    elif out.shape!=(n, m) or out.dtype!=X.dtype:
+        raise ValueError(f"Output must be {X.dtype} matrix {(n, m)}, got {out.dtype} {out.shape}")
+
+    q_size, l_size = _block_shape(n, m, block_size)
+    for q in range(0, n, q_size):
+        for l in range(0, m, l_size):
+            qs, ls = slice(q, q+q_size), slice(l, l+l_size)
+            _fill_block(out[qs, ls], X[qs], Y[ls], 
+                        None if xx is None else xx[qs], None if yy is None else yy[ls], metric)
+
+    if self_matrix and metric=='euclidean':
+        np.fill_diagonal(out, 0)
+    return out
+
+
+def euclidean_dist_matrix(X: np.ndarray, Y: Optional[np.ndarray] = None, *, 
+                          dtype = np.float64, 
+                          block_size: int = BLOCK_SIZE, 
+                          out: Optional[np.ndarray] = None
+                         ) -> np.ndarray:
+    """
+    Euclidean distance between all rows of two matrices, computed in blocks as sqrt(|x|^2 + |y|^2 - 2xy)
+    with one matrix multiplication per block, blocks are written into output in place.
+
+    :param X: vector or matrix (n, d).
+    :param Y: matrix (m, d). Default - X.
+    :param dtype: float32 or float64.
+    :param block_size: maximal number of elements of one block.
+    :param out: preallocated output matrix (n, m) of dtype.
+
+    :return: distance matrix (n, m).
+    """
+
+    return _pairwise(X, Y, 'euclidean', dtype, block_size, out)
+
+
+def cosine_sim_matrix(X: np.ndarray, Y: Optional[np.ndarray] = None, *, 
+                      dtype = np.float64, 
+                      block_size: int = BLOCK_SIZE, 
+                      out: Optional[np.ndarray] = None
+                     ) -> np.ndarray:
+    """
+    Cosine similarity between all rows of two matrices, rows are normalized once and multiplied in blocks.
+    Similarity with zero vector is 0.
+
+    :param X: vector or matrix (n, d).
+    :param Y: matrix (m, d). Default - X.
+    :param dtype: float32 or float64.
+    :param block_size: maximal number of elements of one block.
+    :param out: preallocated output matrix (n, m) of dtype.
+
+    :return: similarity matrix (n, m).
+    """
+
+    return _pairwise(X, Y, 'cosine', dtype, block_size, out)
+
+
+def _top_k(queries, library, k, metric, dtype, block_size) -> TopK:
+    single = np.asarray(queries).ndim==1
+    Q, L, qq, ll = _prepare(queries, library, dtype, metric)
+    k = max(0, min(k, len(L)))
+    sign = -1 if metric=='euclidean' else 1 # best scores are the largest
+
+    indices = np.empty((len(Q), k), dtype=np.int64)
+    scores = np.empty((len(Q), k), dtype=Q.dtype)
+    q_size, l_size = _block_shape(len(Q), len(L), block_size)
+    buffer = np.empty((q_size, l_size), dtype=Q.dtype)
+    for q in range(0, len(Q), q_size):
+        qs = slice(q, q+q_size)
+        n = len(Q[qs])
+        best_i = np.empty((n, 0), dtype=np.int64)
+        best_s = np.empty((n, 0), dtype=Q.dtype)
+        for l in range(0, len(L), l_size):
+            ls = slice(l, l+l_size)
+            block = buffer[:n, :len(L[ls])]
+            _fill_block(block, Q[qs], L[ls], None if qq is None else qq[qs], None if ll is None else ll[ls], metric)
+            cand_s = np.concatenate([best_s, sign*block], axis=1)
+            cand_i = np.concatenate([best_i, np.broadcast_to(np.arange(l, l+block.shape[1]), block.shape)], axis=1)
+            best_s, best_i = _select_k(cand_s, cand_i, k)
+
+        order = np.lexsort((best_i, -best_s), axis=-1)
+        indices[qs] = np.take_along_axis(best_i, order, axis=1)
+        scores[qs] = sign*np.take_along_axis(best_s, order, axis=1)
+
+    if single:
+        return TopK(indices[0], scores[0])
+    return TopK(indices, scores)
+
+
+def euclidean_top_k(queries: np.ndarray, library: np.ndarray, k: int, *, 
+                    dtype = np.float64, 
+                    block_size: int = BLOCK_SIZE
+                   ) -> TopK:
+    """
+    Finds k nearest library vectors of each query by euclidean distance, library is streamed in blocks
+    so full distance matrix is never stored. Neighbours are ordered by ascending distance, ties by library index.
+
+    :param queries: vector or matrix (n, d).
+    :param library: matrix (m, d).
+    :param k: number of neighbours, limited by library size, no neighbours if k<=0.
+    :param dtype: float32 or float64.
+    :param block_size: maximal number of elements of one block.
+
+    :return: TopK of int64 indices and distances, (n, k) or (k, ) for one query vector.
+    """
+
+    return _top_k(queries, library, k, 'euclidean', dtype, block_size)
+
+
+def cosine_top_k(queries: np.ndarray, library: np.ndarray, k: int, *, 
+                 dtype = np.float64, 
+                 block_size: int = BLOCK_SIZE
+                ) -> TopK:
+    """
+    Finds k most similar library vectors of each query by cosine similarity, see euclidean_top_k.
+    Neighbours are ordered by descending similarity, ties by library index.
+    """
+
+    return _top_k(queries, library, k, 'cosine', dtype, block_size)
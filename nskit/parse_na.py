@@ -1,5 +1,6 @@
 from collections import defaultdict
-from typing import Optional, Union, Tuple, List
+from typing import Iterable, Optional, Union, Tuple, List
+import numpy as np
 
 from .containers import NucleicAcid
 from .exceptions import InvalidSequence, InvalidStructure
@@ -8,6 +9,9 @@ from .exceptions import InvalidSequence, InvalidStructure
 
 DOT_STRUCTURE_SYMBOLS = set(".()[]{}<>AaBbCcDdEeFf")
 STRUCTURE_DETECTION_SYMBOLS = set(".()[]{}<>")
+BRACKET_TYPES = ('()', '[]', '{}', '<>', 'Aa', 'Bb', 'Cc', 'Dd', 'Ee', 'Ff')
+_VALID_SYMBOL_CODES = np.zeros(256, dtype=bool)
+_VALID_SYMBOL_CODES[[ord(c) for c in DOT_STRUCTURE_SYMBOLS]] = True
 
 
 class NaStack:
@@ -83,6 +87,60 @@ def parse_structure(struct: str,
     return pairs
     
     
+def parse_partners(structs: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized bracket matching of many dot structures without NucleicAcid construction.
+    Structures are concatenated and brackets of each type are matched by nesting depth.
+
+    :param structs: dot structure strings.
+
+    :return: concatenated int64 partner arrays (partner index inside structure, -1 - unpaired) and int64 lengths.
+    """
+
+    structs = list(structs)
+    lengths = np.array([len(s) for s in structs], dtype=np.int64)
+    try:
+        codes = np.frombuffer(''.join(structs).encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        codes = None
+    if codes is None or not _VALID_SYMBOL_CODES[codes].all():
+        for s in structs:
+            if len(rem:=(set(s) - DOT_STRUCTURE_SYMBOLS))!=0:
+                raise InvalidStructure(f"Dot structure contains invalid symbols - {', '.join(tuple(rem))}")
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    partners = np.full(len(codes), -1, dtype=np.int64)
+    present = np.bincount(codes, minlength=256)>0
+    for o, c in BRACKET_TYPES:
+        if not (present[ord(o)] or present[ord(c)]):
+            continue
+        step = (codes==ord(o)).astype(np.int32) - (codes==ord(c))
+        idx = np.nonzero(step)[0]
+        if len(idx)==0:
+            continue
+
+        # depth is 0 at every structure end and never negative if all structures are valid
+        depth = np.cumsum(step[idx])
+        end_depth = np.zeros(len(structs), dtype=np.int64)
+        valid_end = np.searchsorted(idx, ends) - 1
+        has_brackets = valid_end>=np.searchsorted(idx, starts)
+        end_depth[has_brackets] = depth[valid_end[has_brackets]]
+        if np.any(depth<0) or np.any(end_depth!=0):
+            bad = np.nonzero(end_depth!=0)[0] if np.any(end_depth!=0) else np.searchsorted(ends, idx[depth<0][:1], side='right')
+            raise InvalidStructure(f"Structure {int(bad[0])} contains unclosed bonds")
+
+        # within one level opening and closing brackets alternate
+        level = depth + (step[idx]<0)
+        pairs = idx[np.lexsort((idx, level))].reshape(-1, 2)
+        partners[pairs[:, 0]] = pairs[:, 1]
+        partners[pairs[:, 1]] = pairs[:, 0]
+
+    paired = partners>=0
+    partners[paired] -= np.repeat(starts, lengths)[paired]
+    return partners, lengths
+
+
 def NA(a: Union[str, NucleicAcid], b: Optional[str] = None, /, *, 
        name: Optional[str] = None, 
        meta: Optional[dict] = None,
@@ -33,5 +33,6 @@ setup(
     
     ext_modules=[
         Extension('nskit.algo.levenshtein._levenshtein', ['nskit/algo/levenshtein/levenshtein.c']),
+        Extension('nskit.algo.tree_edit._tree_edit', ['nskit/algo/tree_edit/tree_edit.c']),
                 ]
 )
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Random data factories shared by test modules.
+"""
+import random
+import numpy as np
+from nskit import NA
+from nskit.descriptors import FragmentCount
+
+
+
+def random_structure(n, rng, knots=True):
+    struct = ['.']*n
+    stack = []
+    for i in range(n):
+        r = rng.random()
+        if r<0.35:
+            stack.append(i)
+        elif r<0.7 and stack and i-stack[-1]>3:
+            o = stack.pop()
+            struct[o], struct[i] = '(', ')'
+
+    if knots:
+        unpaired = [i for i, c in enumerate(struct) if c=='.']
+        for _ in range(rng.randint(0, 3)):
+            if len(unpaired)<8:
+                break
+            start = rng.randrange(len(unpaired)-6)
+            size = rng.randint(1, 3)
+            left = unpaired[start:start+size]
+            right = unpaired[-size:]
+            if left[-1]>=right[0]-3:
+                continue
+            for l in left: struct[l] = '['
+            for r in right: struct[r] = ']'
+            unpaired = unpaired[start+size:-size]
+    return ''.join(struct)
+
+
+def random_na(n, rng):
+    struct = random_structure(n, rng)
+    return NA(''.join(rng.choices('ACGU', k=n)), struct)
+
+
+def library(n, seed=0):
+    rng = random.Random(seed)
+    nas = []
+    for i in range(n):
+        na = random_na(rng.randint(2, 100), rng)
+        na.name = f'na{i}'
+        nas.append(na)
+    return nas
+
+
+class FailingDescriptor:
+    # fails after given number of batches, counts described rows
+
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.calls = 0
+        self.rows = 0
+
+    def batch(self, nas, **kwargs):
+        if len(nas):
+            self.calls += 1
+            if self.calls>self.fail_after:
+                raise RuntimeError('interrupted')
+            self.rows += len(nas)
+        return FragmentCount.batch(nas, **kwargs)
+
+
+def random_fingerprints(n, n_bits, density=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n, n_bits))<density).astype(np.int32)
+    X[:, 0] = 1 # no empty fingerprints
+    return X
@@ -0,0 +1,136 @@
+import pytest
+import hashlib
+import multiprocessing
+import numpy as np
+from nskit import NA
+from nskit.descriptors import FragmentCount, FragmentFingerprint, FragmentDescriptor, DescriptorCache, na_digest
+from helpers import library, FailingDescriptor
+
+
+
+def describe_part(args):
+    cache, nas = args
+    return cache.batch(nas)
+
+
+def helixes(na):
+    return na.helixes
+
+
+def helix_config(ranges):
+    return {'helixes': {'get_fragment_func': helixes, 'properties': {'len': {'get_property_func': len, 'ranges': ranges}}}}
+
+
+class TestNaDigest:
+    
+    def test_identity(self):
+        a = NA('GGGAAACCC', '(((...)))', name='a', meta={'x':'1'})
+        b = NA('GGGAAACCC', '(((...)))', name='b')
+        assert na_digest(a)==na_digest(b)
+        assert len(na_digest(a))==16
+        assert len(na_digest(a, 8))==8
+        assert na_digest(a)!=na_digest(NA('GGGAAACCC', '((.....))'))
+        assert na_digest(a)!=na_digest(NA('GGGAAACCC'))
+        
+        
+    def test_stable(self):
+        h = hashlib.blake2b(b'ACGU|', digest_size=16)
+        h.update(np.array([[0, 3]], dtype=np.int32).tobytes())
+        assert na_digest(NA('ACGU', '(..)'))==h.digest()
+        
+        
+class TestDescriptorCache:
+    
+    def test_duplicates(self):
+        nas = library(30)
+        dups = [NA(na.seq, na.struct, name='dup') for na in nas[:10]]
+        counter = FailingDescriptor(fail_after=100)
+        cache = DescriptorCache(counter)
+        
+        X = cache.batch(nas + dups)
+        assert np.array_equal(X, FragmentCount.batch(nas + dups))
+        assert counter.rows==len(set(na_digest(na) for na in nas))
+        assert cache.info().hits==10
+        
+        assert np.array_equal(cache(dups[0]), FragmentCount(nas[0]))
+        assert dups[0] in cache
+        assert cache.info().hits==11
+        
+        
+    def test_kwargs(self):
+        na = library(1)[0]
+        cache = DescriptorCache(FragmentFingerprint, with_knot_features=False)
+        assert np.array_equal(cache(na), FragmentFingerprint(na, with_knot_features=False))
+        
+        
+    def test_lru(self):
+        nas = library(20)
+        cache = DescriptorCache(maxsize=5)
+        cache.batch(nas)
+        assert cache.info().size==5
+        assert nas[-1] in cache
+        assert nas[0] not in cache
+        
+        
+    def test_disk(self, tmp_path):
+        nas = library(40, seed=3)
+        with DescriptorCache(path=tmp_path / 'cache.sqlite', namespace='fc') as cache:
+            cache.batch(nas)
+            
+        counter = FailingDescriptor(fail_after=0)
+        with DescriptorCache(counter, path=tmp_path / 'cache.sqlite', maxsize=0, namespace='fc') as cache:
+            assert np.array_equal(cache.batch(nas), FragmentCount.batch(nas))
+            assert cache.info().disk_hits==len(set(na_digest(na) for na in nas))
+            assert cache.info().misses==0
+            
+        # other arguments are stored apart
+        with DescriptorCache(path=tmp_path / 'cache.sqlite', with_knot_features=False) as cache:
+            cache.batch(nas[:3])
+            assert cache.info().disk_hits==0
+            cache.clear(disk=True)
+            cache.batch(nas[:3])
+            assert cache.info().disk_hits==0
+            
+            
+    def test_processes(self, tmp_path):
+        nas = library(40, seed=4)
+        cache = DescriptorCache(path=tmp_path / 'cache.sqlite')
+        cache.batch(nas[:5])
+        with multiprocessing.get_context().Pool(2) as pool:
+            parts = pool.map(describe_part, [(cache, nas[:20]), (cache, nas[20:])])
+        assert np.array_equal(np.concatenate(parts), FragmentCount.batch(nas))
+        
+        cache.clear()
+        cache.batch(nas)
+        assert cache.info().misses==0
+        
+        
+    def test_namespace(self, tmp_path):
+        nas = library(20, seed=5)
+        short = FragmentDescriptor(helix_config([(1, 5), (5, np.inf)]))
+        long = FragmentDescriptor(helix_config([(1, 10), (10, np.inf)]))
+        with DescriptorCache(short, path=tmp_path / 'cache.sqlite') as cache:
+            cache.batch(nas)
+        # same number of features, other config
+        with DescriptorCache(long, path=tmp_path / 'cache.sqlite') as cache:
+            assert np.array_equal(cache.batch(nas), long.batch(nas))
+            assert cache.info().disk_hits==0
+        with DescriptorCache(FragmentDescriptor(helix_config([(1, 5), (5, np.inf)])), path=tmp_path / 'cache.sqlite') as cache:
+            cache.batch(nas)
+            assert cache.info().misses==0
+
+        presets = [DescriptorCache(FragmentDescriptor.fragment_count(knots), path=tmp_path / 'cache.sqlite') for knots in (True, False)]
+        assert presets[0]._namespace!=presets[1]._namespace
+
+        # lambda functions of config are not identified
+        with pytest.raises(ValueError):
+            DescriptorCache(FragmentDescriptor({'helixes': dict(helix_config([(1, 5)])['helixes'], get_fragment_func=lambda na: na.helixes)}),
+                            path=tmp_path / 'cache.sqlite')
+        with pytest.raises(ValueError):
+            DescriptorCache(FailingDescriptor(fail_after=0), path=tmp_path / 'cache.sqlite')
+        assert DescriptorCache(FailingDescriptor(fail_after=1)).batch(nas).shape==(20, 192)
+
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            DescriptorCache().batch(['ACGU'])
@@ -0,0 +1,152 @@
+import pytest
+import os
+import numpy as np
+from nskit import NA, dotRead, dotWrite, bnaRead, bnaWrite
+from nskit.descriptors import FragmentCount, FragmentDescriptor, compute_to_file
+from helpers import library, FailingDescriptor
+
+
+
+def write_dot(path, nas):
+    with dotWrite(path) as w:
+        for na in nas:
+            w.write(na)
+    
+    
+class TestComputeToFile:
+    
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_dot(self, tmp_path, workers):
+        nas = library(53)
+        write_dot(tmp_path / 'lib.dot', nas)
+        
+        X = compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', workers=workers, chunk_size=10)
+        assert np.array_equal(X, FragmentCount.batch(nas))
+        names = (tmp_path / 'fc.names').read_text().splitlines()
+        assert names==[na.name for na in nas]
+        
+        
+    def test_bna(self, tmp_path):
+        nas = library(25, seed=1)
+        with bnaWrite(tmp_path / 'lib.bna') as w:
+            for na in nas:
+                w.write(na)
+        with bnaRead(tmp_path / 'lib.bna') as r:
+            expected = FragmentCount.batch(list(r), with_knot_features=False)
+        
+        with bnaRead(tmp_path / 'lib.bna') as r:
+            X = compute_to_file(r, tmp_path / 'fc.npy', chunk_size=4, with_knot_features=False)
+        assert np.array_equal(X, expected)
+        
+        
+    def test_nas_and_invalid(self, tmp_path):
+        nas = library(7)
+        X = compute_to_file(nas, tmp_path / 'fc.npy', chunk_size=3)
+        assert np.array_equal(X, FragmentCount.batch(nas))
+        
+        with open(tmp_path / 'bad.dot', 'w') as f:
+            f.write('>a\nACGU\n....\n>b\nACGU\n((..\n>c\nGGGAAACCC\n(((...)))\n')
+        X = compute_to_file(tmp_path / 'bad.dot', tmp_path / 'bad.npy')
+        assert X.shape==(3, 192)
+        assert X[1].sum()==0
+        assert (tmp_path / 'bad.names').read_text().splitlines()==['a', '', 'c']
+        
+        
+    def test_resume(self, tmp_path):
+        nas = library(45, seed=2)
+        write_dot(tmp_path / 'lib.dot', nas)
+        
+        failing = FailingDescriptor(fail_after=2)
+        with pytest.raises(RuntimeError):
+            compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', descriptor=failing, chunk_size=10)
+        
+        resumed = FailingDescriptor(fail_after=100)
+        X = compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', descriptor=resumed, chunk_size=10)
+        assert resumed.rows==25
+        assert np.array_equal(X, FragmentCount.batch(nas))
+        assert len((tmp_path / 'fc.names').read_text().splitlines())==45
+        assert not (tmp_path / 'fc.progress').exists()
+        
+        again = FailingDescriptor(fail_after=100)
+        compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', descriptor=again, chunk_size=10, resume=False)
+        assert again.rows==45
+        
+        
+    def test_resume_changed_source(self, tmp_path):
+        nas = library(30, seed=3)
+        write_dot(tmp_path / 'lib.dot', nas)
+        with pytest.raises(RuntimeError):
+            compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', descriptor=FailingDescriptor(1), chunk_size=10)
+        
+        # same size, different content
+        text = (tmp_path / 'lib.dot').read_text()
+        changed = text.replace('A', '#').replace('C', 'A').replace('#', 'C')
+        assert len(changed)==len(text)
+        (tmp_path / 'lib.dot').write_text(changed)
+        os.utime(tmp_path / 'lib.dot', ns=(0, 10**9))
+        
+        descriptor = FailingDescriptor(100)
+        X = compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', descriptor=descriptor, chunk_size=10)
+        assert descriptor.rows==30
+        with dotRead(tmp_path / 'lib.dot') as r:
+            assert np.array_equal(X, FragmentCount.batch(list(r)))
+        
+        
+    def test_resume_changed_list(self, tmp_path):
+        nas = library(30, seed=5)
+        with pytest.raises(RuntimeError):
+            compute_to_file(nas, tmp_path / 'fc.npy', descriptor=FailingDescriptor(1), chunk_size=10)
+
+        # same length, other structures
+        other = library(30, seed=6)
+        descriptor = FailingDescriptor(100)
+        X = compute_to_file(other, tmp_path / 'fc.npy', descriptor=descriptor, chunk_size=10)
+        assert descriptor.rows==30
+        assert np.array_equal(X, FragmentCount.batch(other))
+
+        with pytest.raises(RuntimeError):
+            compute_to_file(nas, tmp_path / 'fc.npy', descriptor=FailingDescriptor(1), chunk_size=10)
+        descriptor = FailingDescriptor(100)
+        X = compute_to_file(nas, tmp_path / 'fc.npy', descriptor=descriptor, chunk_size=10)
+        assert descriptor.rows==20
+        assert np.array_equal(X, FragmentCount.batch(nas))
+
+
+    def test_resume_missing_names(self, tmp_path):
+        nas = library(30, seed=7)
+        with pytest.raises(RuntimeError):
+            compute_to_file(nas, tmp_path / 'fc.npy', descriptor=FailingDescriptor(2), chunk_size=10)
+        (tmp_path / 'fc.names').unlink()
+
+        descriptor = FailingDescriptor(100)
+        X = compute_to_file(nas, tmp_path / 'fc.npy', descriptor=descriptor, chunk_size=10)
+        assert descriptor.rows==30
+        assert np.array_equal(X, FragmentCount.batch(nas))
+        assert (tmp_path / 'fc.names').read_text().splitlines()==[na.name for na in nas]
+
+
+    def test_unpicklable_descriptor(self, tmp_path):
+        config = {'helixes': {'get_fragment_func': lambda na: na.helixes,
+                              'properties': {'len': {'get_property_func': len, 'ranges': [(1, 5), (5, np.inf)]}}}}
+        descriptor = FragmentDescriptor(config)
+        nas = library(10, seed=8)
+        with pytest.raises(ValueError):
+            compute_to_file(nas, tmp_path / 'fc.npy', descriptor=descriptor, workers=2)
+        X = compute_to_file(nas, tmp_path / 'fc.npy', descriptor=descriptor)
+        assert np.array_equal(X, descriptor.batch(nas))
+
+
+    def test_multibyte_text(self, tmp_path):
+        # byte offsets of chunks differ from character positions
+        nas = library(12, seed=4)
+        for na in nas:
+            na.name = f'имя_{na.name}'
+        write_dot(tmp_path / 'lib.dot', nas)
+        X = compute_to_file(tmp_path / 'lib.dot', tmp_path / 'fc.npy', chunk_size=5)
+        assert np.array_equal(X, FragmentCount.batch(nas))
+        assert (tmp_path / 'fc.names').read_text().splitlines()==[na.name for na in nas]
+        
+        
+    def test_empty(self, tmp_path):
+        X = compute_to_file([], tmp_path / 'fc.npy')
+        assert X.shape==(0, 192)
@@ -0,0 +1,320 @@
+import pytest
+import random
+import math
+import numpy as np
+from nskit import NA, edit_draw_config, draw_many
+from nskit.draw.config import draw_config
+from nskit.draw import DrawCache, draw_cache
+from nskit.draw.bulk import CHUNKS_IN_FLIGHT
+from helpers import random_structure
+
+
+
+def reference_coords(n):
+    # step by step rotation of layout
+    N = n + 2
+    R = 1/(np.sin(np.pi/N))
+    dela = 2*np.pi/N
+    rotm = np.array([[np.cos(dela), np.sin(dela)], [-np.sin(dela), np.cos(dela)]], dtype=np.float32)
+    vec = np.array([0, -R])@rotm
+    vecs = np.zeros((n, 2), dtype=np.float32)
+    for i in range(n):
+        new_vec = vec@rotm
+        vecs[i] = (vec+new_vec)/2
+        vec = new_vec
+    return vecs, R
+
+
+def reference_svg(na):
+    # element by element drawing
+    n = len(na)
+    nb_coords, R = reference_coords(n)
+    helix_radiuses = []
+    for h in na.helixes:
+        helix_radiuses.append([])
+        for i, j in h:
+            C = nb_coords[i] + (nb_coords[j] - nb_coords[i])/2
+            helix_radiuses[-1].append((R**2)/np.linalg.norm(C))
+
+    canvas = min(draw_config["max_canvas_size"], 150 + (250/80)*n)
+    r = R+1
+    nb_diam = canvas/(2*r)
+    nb_coords = nb_diam*(nb_coords*np.array([1,-1]) + r)
+    helix_radiuses = [[r*nb_diam for r in h] for h in helix_radiuses]
+    stroke = max(1.5, 1.5*(canvas/100)*(15/(n+3)))
+    radius = (nb_diam - stroke/2)*(25/(stroke+30) + 0.1)
+    shift = radius + stroke/2
+
+    def ends(iv, jv):
+        ijv = (jv-iv)/np.linalg.norm(jv-iv)
+        return iv + ijv*shift, jv - ijv*shift
+
+    nb_fontsize = max(1, 2.5*(radius - stroke/2)/math.sqrt(2))
+    text_shift = 0.35*nb_fontsize
+    circles = [f'<g stroke-width="{stroke:.2f}" fill="none">']
+    texts = [f'<g font-weight="bold" font-size="{nb_fontsize:.2f}px">']
+    for i, nb in enumerate(na.seq):
+        color = draw_config["nb_colors"].get(nb, draw_config["unknown_nb_color"])
+        x, y = nb_coords[i]
+        circles.append(f'    <circle cx="{x:.1f}px" cy="{y:.1f}px" r="{radius:.1f}px" stroke="{color}"/>')
+        texts.append(f'    <text x="{x-text_shift:.1f}" y="{y+text_shift:.1f}">{nb}</text>')
+
+    core = [f'<g stroke="{draw_config["core_bond_color"]}" stroke-width="{stroke:.2f}">']
+    for j in range(1, n):
+        d1, d2 = ends(nb_coords[j-1], nb_coords[j])
+        core.append(f'    <line x1="{d1[0]:.1f}" y1="{d1[1]:.1f}" x2="{d2[0]:.1f}" y2="{d2[1]:.1f}"/>')
+
+    compl = [f'<g stroke-width="{stroke:.2f}" fill="none" >']
+    for k, (h, hr) in enumerate(zip(na.helixes, helix_radiuses)):
+        color = draw_config['knot_bond_color'] if k in na.knots else draw_config['compl_bond_color']
+        for (nb1, nb2), r in zip(h, hr):
+            if abs(nb2-nb1+1)>((n+2)//2):
+                nb1, nb2 = nb2, nb1
+            d1, d2 = ends(nb_coords[nb1], nb_coords[nb2])
+            compl.append(f'    <path  d="M {d1[0]:.1f} {d1[1]:.1f} A {r:.1f} {r:.1f} 0 0 1 {d2[0]:.1f} {d2[1]:.1f}" stroke="{color}"/>')
+
+    svg = [('<svg version = "1.1" '
+            'baseProfile="full" '
+            'xmlns = "http://www.w3.org/2000/svg" '
+            'xmlns:xlink = "http://www.w3.org/1999/xlink" '
+            'xmlns:ev = "http://www.w3.org/2001/xml-events" '
+            f'height = "{canvas}px"  width = "{canvas}px">')]
+    svg += circles + ['</g>'] + texts + ['</g>'] + core + ['</g>'] + compl + ['</g>', '</svg>']
+    return '\n'.join(svg)
+
+
+class TestDraw:
+
+    @pytest.mark.parametrize("n", [1, 2, 5, 10, 33, 100, 400, 1500])
+    def test_coords(self, n):
+        coords, R = NA('A'*n).calculate_circular_coords(n)
+        ref, ref_R = reference_coords(n)
+        assert coords.dtype==np.float32
+        assert R==ref_R
+        assert np.allclose(coords, ref, rtol=0, atol=1e-6*R)
+
+
+    @pytest.mark.parametrize("n", [1, 4, 10, 37, 120, 500])
+    def test_svg(self, n):
+        rng = random.Random(n)
+        for _ in range(5):
+            seq = ''.join(rng.choice('AUGCTN') for _ in range(n))
+            na = NA(seq, random_structure(n, rng))
+            assert na.draw()==reference_svg(na)
+
+
+    def test_diametric_pairs(self):
+        for struct in ['.[[.....]]', '[([...).]]', '((......))']:
+            na = NA('A'*len(struct), struct)
+            assert na.draw()==reference_svg(na)
+
+
+class TestLevelOfDetail:
+
+    @pytest.fixture(autouse=True)
+    def reset_config(self):
+        yield
+        edit_draw_config()
+
+
+    def test_lod(self):
+        rng = random.Random(0)
+        na = NA('A'*3000, random_structure(3000, rng))
+        full = na.draw()
+        edit_draw_config(detail='lod')
+        svg = na.draw()
+        assert len(svg)<len(full)/10
+        # letters and circles are too small, one backbone path, one band per helix in one path per color
+        assert '<text' not in svg and '<circle' not in svg
+        assert svg.count('<path')==1 + len({k in na.knots for k in range(len(na.helixes))})
+        assert svg.count(' Z')==len(na.helixes)
+        backbone = svg[svg.index('<path d="M')+len('<path d="M'):].split('"')[0]
+        assert 400*math.pi/4 < backbone.count(' ')/2 < 400*math.pi
+
+
+    def test_small(self):
+        na = NA('GGGAAAUCCCAAGGAAACCAA', '((((..[[..))))...]]..')
+        full = na.draw()
+        edit_draw_config(detail='lod')
+        svg = na.draw()
+        assert svg.count('<circle')==full.count('<circle')==len(na)
+        assert svg.count('<text')==len(na)
+        assert svg.count(' L ')==1 + 2 # backbone and two bands
+        assert f'stroke="{draw_config["knot_bond_color"]}" fill="{draw_config["knot_bond_color"]}"' in svg
+
+
+    def test_auto(self):
+        na = NA('A'*300, '.'*300)
+        edit_draw_config(detail='auto', lod_threshold=300)
+        assert '<line' in na.draw()
+        edit_draw_config(detail='auto', lod_threshold=299)
+        assert '<line' not in na.draw()
+
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            edit_draw_config(detail='low')
+
+
+class TestDrawCache:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        draw_cache.clear()
+        yield
+        draw_cache.resize(DrawCache().max_bytes)
+        edit_draw_config()
+
+
+    @pytest.mark.parametrize(
+        "struct, edit, expected",
+        [
+            ('((...))...', lambda na: na.join(7, 9), '((...))(.)'),
+            ('((...))...', lambda na: na.split(0, 6), '.(...)....'),
+            ('((.))(...)', lambda na: na.fix_sharp_hairpins(3), '(...)(...)'),
+        ]
+    )
+    def test_graph_edits(self, struct, edit, expected):
+        na = NA('GGAAACCGAC', struct)
+        version = na.graph_version
+        svg = na._repr_svg_()
+        edit(na)
+        assert na.struct==expected
+        assert na.graph_version>version
+        assert na._repr_svg_()!=svg
+        assert na._repr_svg_()==reference_svg(NA('GGAAACCGAC', expected))
+
+
+    def test_layout_reuse(self):
+        a = NA('GGGAAACCC', '(((...)))')
+        b = NA('AAAAAAUUU', '(((...)))')
+        _ = a.draw()
+        assert draw_cache.info().size==2 # layout and svg
+        
+        misses = draw_cache.info().misses
+        assert b.draw()==reference_svg(b)
+        assert draw_cache.info().size==3 # layout is shared
+        assert draw_cache.info().misses==misses+1 
+
+        _ = a.draw()
+        assert draw_cache.info().misses==misses+1
+
+        edit_draw_config(core_bond_color="#123456")
+        assert 'stroke="#123456"' in a.draw()
+        assert draw_cache.info().size==4
+
+
+    def test_lru(self):
+        cache = DrawCache(max_bytes=100)
+        for i in range(5):
+            cache.put(i, str(i), 30)
+        assert len(cache)==3 and cache.info().nbytes==90
+        assert cache.get(0) is None and cache.get(2)=='2'
+        
+        cache.put(5, '5', 30) # 2 was used recently
+        assert cache.get(3) is None and cache.get(2)=='2'
+        cache.put(6, '6', 101)
+        assert cache.get(6) is None
+
+        cache.resize(30)
+        assert len(cache)==1 and cache.get(2)=='2'
+        assert cache.info()[:2]==(3, 3)
+
+
+    def test_disabled(self):
+        draw_cache.resize(0)
+        na = NA('GGGAAACCC', '(((...)))')
+        assert na.draw()==na.draw()
+        assert len(draw_cache)==0
+
+
+class TestDrawMany:
+
+    def library(self, n, seed=0):
+        rng = random.Random(seed)
+        nas = []
+        for i in range(n):
+            length = rng.randint(1, 60)
+            nas.append(NA(''.join(rng.choice('AUGC') for _ in range(length)), random_structure(length, rng), name=f'na/{i}'))
+        return nas
+
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_files(self, tmp_path, workers):
+        nas = self.library(23)
+        reports = []
+        stats = draw_many(nas + [None], tmp_path/'svg', workers=workers, chunk_size=5, progress=reports.append)
+        assert (stats.n, stats.failed, stats.sheet, stats.duplicates)==(23, 1, None, 0)
+        assert len(reports)==5 and reports[-1].n==23
+        for na in nas:
+            assert (tmp_path/'svg'/f"{na.name.replace('/', '_')}.svg").read_text()==na.draw()
+
+
+    def test_filename(self, tmp_path):
+        nas = self.library(3)
+        nas[1] = NA(nas[1].seq, nas[1].struct)
+        draw_many(nas, tmp_path, filename="{index:03d}_{name}.svg")
+        assert sorted(p.name for p in tmp_path.iterdir())==['000_na_0.svg', '001_1.svg', '002_na_2.svg']
+
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_duplicates(self, tmp_path, workers):
+        nas = self.library(6)
+        dup = NA(nas[0].seq + 'A', nas[0].struct + '.', name=nas[0].name)
+        stats = draw_many(nas[:3] + [dup] + nas[3:], tmp_path, workers=workers, chunk_size=2)
+        assert (stats.n, stats.failed, stats.duplicates)==(6, 0, 1)
+        # first structure of name is kept
+        assert (tmp_path/'na_0.svg').read_text()==nas[0].draw()
+        assert len(list(tmp_path.iterdir()))==6
+
+        stats = draw_many(nas[:3] + [dup], tmp_path/'indexed', filename="{index}_{name}.svg")
+        assert (stats.n, stats.duplicates)==(4, 0)
+
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_read_ahead(self, tmp_path, workers):
+        nas = self.library(100)
+        read = 0
+        def reader():
+            nonlocal read
+            for na in nas:
+                read += 1
+                yield na
+        ahead = []
+        stats = draw_many(reader(), tmp_path, workers=workers, chunk_size=5,
+                          progress=lambda s: ahead.append(read - s.n))
+        assert stats.n==100
+        # reader is consumed at most by chunks in flight and one chunk being split ahead of drawn structures
+        assert max(ahead)<=(CHUNKS_IN_FLIGHT*workers + 1)*5
+
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_config(self, tmp_path, workers):
+        na = self.library(1)[0]
+        edit_draw_config(core_bond_color="#123456")
+        try:
+            draw_many([na], tmp_path, workers=workers)
+        finally:
+            edit_draw_config()
+        assert 'stroke="#123456"' in (tmp_path/'na_0.svg').read_text()
+
+
+    @pytest.mark.parametrize("suffix", ['.svg', '.html'])
+    def test_sheet(self, tmp_path, suffix):
+        nas = self.library(11)
+        stats = draw_many(nas, sheet=tmp_path/f'sheet{suffix}', sheet_columns=4)
+        assert stats.sheet==str(tmp_path/f'sheet{suffix}')
+        assert list(tmp_path.iterdir())==[tmp_path/f'sheet{suffix}']
+
+        text = (tmp_path/f'sheet{suffix}').read_text()
+        assert text.count('<circle')==sum(len(na) for na in nas)
+        assert all(na.name in text for na in nas)
+        if suffix=='.svg':
+            assert text.startswith('<svg') and text.endswith('</svg>')
+            assert text.count('<svg')==1
+            assert f'height = "{3*(400+20)}px"  width = "{4*400}px"' in text
+
+
+    def test_nothing_to_draw(self):
+        with pytest.raises(ValueError):
+            _ = draw_many([])
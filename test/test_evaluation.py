@@ -0,0 +1,144 @@
+import pytest
+import random
+import warnings
+import numpy as np
+from nskit import NA, dotRead, bnaWrite
+from nskit.metrics import binary_eval_batch, evaluate_files, MetricsAccumulator
+from nskit.metrics.evaluation import METRICS
+from helpers import random_structure
+
+
+
+def structures(n, seed=0):
+    # (name, true, pred) records with true structures containing pairs
+    rng = random.Random(seed)
+    records = []
+    while len(records)<n:
+        length = rng.randint(5, 80)
+        true = random_structure(length, rng)
+        if '(' not in true:
+            continue
+        pred = true if rng.random()<0.3 else random_structure(length, rng)
+        records.append((f"na{len(records):05d}", true, pred))
+    return records
+
+
+def write_records(path, records):
+    with open(path, 'w') as f:
+        for name, struct in records:
+            f.write(f">{name}\n{'N'*len(struct)}\n{struct}\n")
+
+
+def expected(records, **kwargs):
+    res = binary_eval_batch([t for _, t, _ in records], [p for _, _, p in records], **kwargs)
+    counts = [int(res[name].sum()) for name in ('tn', 'fp', 'fn', 'tp')]
+    macro = [np.nanmean(res[name]) for name in METRICS]
+    return res, counts, macro
+
+
+class TestEvaluateFiles:
+
+    @pytest.mark.parametrize("shuffle", [False, True])
+    @pytest.mark.parametrize("kwargs", [{}, {'pairs':'knot', 'shift':1}])
+    def test_join(self, tmp_path, shuffle, kwargs):
+        records = structures(300)
+        truth = [(name, t) for name, t, _ in records[:280]] # 20 predictions without truth
+        pred = [(name, p) for name, _, p in records[10:]] # 10 true structures without prediction
+        if shuffle:
+            random.Random(1).shuffle(truth)
+            random.Random(2).shuffle(pred)
+        write_records(tmp_path/'true.dot', truth)
+        write_records(tmp_path/'pred.dot', pred)
+
+        res = evaluate_files(tmp_path/'true.dot', tmp_path/'pred.dot', batch_size=64, **kwargs)
+        res_eval, counts, macro = expected(records[10:280], **kwargs)
+        assert (res.n, res.missing, res.unmatched, res.invalid)==(270, 10, 20, 0)
+        assert res.cm.ravel().tolist()==counts
+        assert np.allclose(res.macro, macro, equal_nan=True)
+
+        acc = MetricsAccumulator()
+        acc.update(res_eval)
+        assert np.allclose(res.micro, acc.micro(), equal_nan=True)
+
+
+    @pytest.mark.parametrize("presorted", [True, False])
+    def test_readers(self, tmp_path, presorted):
+        records = structures(100, seed=3)
+        write_records(tmp_path/'true.dot', [(name, t) for name, t, _ in records])
+        with bnaWrite(tmp_path/'pred.bna') as w:
+            for name, _, p in records:
+                w.write(NA('N'*len(p), p, name=name))
+
+        with dotRead(tmp_path/'true.dot') as truth:
+            res = evaluate_files(truth, tmp_path/'pred.bna', presorted=presorted)
+        _, counts, macro = expected([(name, t, NA(p).struct) for name, t, p in records])
+        assert res.n==100
+        assert res.cm.ravel().tolist()==counts
+        assert np.allclose(res.macro, macro)
+
+
+    def test_invalid(self):
+        truth = [('a', '((..))'), ('b', '......'), ('c', '((..))'), ('d', '(..)'), ('e', None)]
+        pred = [('a', '((..))'), ('b', '((..))'), ('c', '(...)'), ('d', '(..)'), ('e', '(..)')]
+        res = evaluate_files(truth, pred, presorted=True)
+        assert (res.n, res.invalid)==(2, 3)
+        assert res.micro.f1==1
+
+
+    @pytest.mark.parametrize("presorted", [True, False])
+    def test_structure_only_records(self, tmp_path, presorted):
+        # second line of two line record is structure as in dotRead
+        (tmp_path/'true.dot').write_text(">a\n((..))\n>b\n(((...)))\n")
+        (tmp_path/'pred.dot').write_text(">a\nGGAACC\n((..))\n>b\nGGGAAACCC\n((.....))\n")
+        with dotRead(tmp_path/'true.dot') as r:
+            assert [na.struct for na in r]==['((..))', '(((...)))']
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            res = evaluate_files(tmp_path/'true.dot', tmp_path/'pred.dot', presorted=presorted)
+        _, counts, _ = expected([('a', '((..))', '((..))'), ('b', '(((...)))', '((.....))')])
+        assert (res.n, res.invalid)==(2, 0)
+        assert res.cm.ravel().tolist()==counts
+
+
+    def test_no_valid_pairs(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            res = evaluate_files([('a', '....')], [('a', '....')], presorted=True)
+        assert (res.n, res.invalid)==(0, 1)
+        assert np.isnan(res.micro.accuracy) and np.isnan(res.macro.f1)
+
+
+    @pytest.mark.parametrize("presorted", [True, False])
+    def test_duplicates(self, presorted):
+        truth = [('a', '((..))'), ('a', '......'), ('b', '((..))'), ('c', '(..)')]
+        pred = [('a', '((..))'), ('b', '((..))'), ('b', '......'), ('b', '(..)..'), ('c', '(..)')]
+        res = evaluate_files(truth, pred, presorted=presorted, batch_size=2)
+        assert (res.n, res.duplicates, res.missing, res.unmatched, res.invalid)==(3, 3, 0, 0, 0)
+        assert res.micro.f1==1
+
+
+    def test_not_sorted(self):
+        truth = [('b', '((..))'), ('a', '((..))')]
+        with pytest.raises(ValueError):
+            _ = evaluate_files(truth, truth, presorted=True)
+        res = evaluate_files(truth, truth)
+        assert res.n==2
+
+
+class TestMetricsAccumulator:
+
+    def test_batches(self):
+        records = structures(200, seed=5)
+        res, counts, macro = expected(records)
+        acc = MetricsAccumulator()
+        for start in range(0, len(records), 37):
+            part = records[start:start+37]
+            acc.add([t for _, t, _ in part], [p for _, _, p in part])
+
+        assert acc.n==200
+        assert acc.cm.ravel().tolist()==counts
+        assert np.allclose(acc.macro(), macro)
+        tn, fp, fn, tp = counts
+        assert np.isclose(acc.micro().recall, tp/(tp + fn), atol=1e-6)
+        assert np.isclose(acc.micro().precision, tp/(tp + fp), atol=1e-6)
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+from nskit.metrics import tanimoto, pack_fingerprints, tanimoto_bulk, tanimoto_matrix, tanimoto_top_k
+from nskit.metrics.fingerprint import _bit_count, _bit_count_table
+from helpers import random_fingerprints
+
+
+
+class TestPackedFingerprints:
+    
+    @pytest.mark.parametrize("n_bits", [1, 100, 192, 200])
+    def test_pack_unpack(self, n_bits):
+        X = random_fingerprints(17, n_bits)
+        packed = pack_fingerprints(X)
+        assert packed.words.dtype==np.uint64
+        assert packed.words.shape==(17, (n_bits+63)//64)
+        assert np.array_equal(packed.unpack(), X)
+        assert np.array_equal(packed.counts, X.sum(axis=1))
+        assert np.array_equal(packed[3:5].unpack(), X[3:5])
+        assert np.array_equal(packed[4].unpack(), X[4:5])
+        
+        
+    def test_popcount_table(self):
+        words = np.random.default_rng(1).integers(0, 2**63, size=(50, 4), dtype=np.uint64)
+        assert np.array_equal(_bit_count(words), _bit_count_table(words))
+        
+        
+class TestTanimoto:
+    
+    @pytest.mark.parametrize("block_words", [1, 7, 1<<18])
+    def test_matrix(self, block_words):
+        A = random_fingerprints(23, 192)
+        B = random_fingerprints(31, 192, density=0.4, seed=1)
+        sim = tanimoto_matrix(A, B, block_words=block_words)
+        ref = np.array([[tanimoto(a, b) for b in B] for a in A])
+        assert np.allclose(sim, ref)
+        assert np.allclose(tanimoto_bulk(A[3], pack_fingerprints(B), block_words=block_words), ref[3])
+        assert np.allclose(np.diag(tanimoto_matrix(A)), 1.)
+        
+        
+    def test_empty_fingerprints(self):
+        X = np.zeros((2, 10), dtype=np.int32)
+        assert np.array_equal(tanimoto_matrix(X), np.zeros((2, 2)))
+        
+        
+    @pytest.mark.parametrize("block_words", [1, 10, 1<<18])
+    @pytest.mark.parametrize("k", [1, 5, 100])
+    def test_top_k(self, k, block_words):
+        # few bits give many ties
+        Q = random_fingerprints(9, 12, density=0.5, seed=2)
+        L = random_fingerprints(60, 12, density=0.5, seed=3)
+        top = tanimoto_top_k(Q, L, k, block_words=block_words)
+        sim = tanimoto_matrix(Q, L)
+        k = min(k, len(L))
+        assert top.indices.shape==(9, k)
+        for i in range(len(Q)):
+            order = sorted(range(len(L)), key=lambda j: (-sim[i, j], j))[:k]
+            assert list(top.indices[i])==order
+            assert np.allclose(top.scores[i], sim[i, order])
+            
+        single = tanimoto_top_k(Q[0], L, 3)
+        assert single.indices.shape==(3, )
+        assert list(single.indices)==sorted(range(len(L)), key=lambda j: (-sim[0, j], j))[:3]
+
+
+    @pytest.mark.parametrize("k", [0, -1])
+    def test_top_k_no_neighbours(self, k):
+        Q = random_fingerprints(3, 12, seed=2)
+        L = random_fingerprints(5, 12, seed=3)
+        top = tanimoto_top_k(Q, L, k)
+        assert top.indices.shape==top.scores.shape==(3, 0)
+        assert top.indices.dtype==np.int64
+        assert tanimoto_top_k(Q[0], L, k).indices.shape==(0, )
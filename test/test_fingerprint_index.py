@@ -0,0 +1,77 @@
+import pytest
+import random
+import numpy as np
+from nskit.descriptors import FingerprintIndex, FragmentFingerprint
+from nskit.metrics import tanimoto_matrix, pack_fingerprints
+from helpers import random_fingerprints, random_na
+
+
+
+def brute_force(Q, L, ids=None):
+    sim = tanimoto_matrix(Q, L)
+    ids = np.arange(len(L)) if ids is None else np.asarray(ids)
+    return [sorted(zip(ids.tolist(), s.tolist()), key=lambda x: (-x[1], x[0])) for s in sim]
+
+
+class TestFingerprintIndex:
+    
+    @pytest.mark.parametrize("threshold", [0., 0.3, 0.6, 1.])
+    def test_search(self, threshold):
+        L = random_fingerprints(300, 40, density=0.3, seed=1)
+        Q = np.concatenate([L[:3], random_fingerprints(5, 40, density=0.3, seed=2)])
+        index = FingerprintIndex(L)
+        for q, ref in zip(Q, brute_force(Q, L)):
+            expected = [(i, s) for i, s in ref if s>=threshold]
+            assert index.search(q, threshold)==pytest.approx(expected)
+            
+            
+    @pytest.mark.parametrize("k", [1, 10, 500])
+    def test_knn(self, k):
+        L = random_fingerprints(300, 20, density=0.4, seed=3)
+        Q = random_fingerprints(10, 20, density=0.4, seed=4)
+        index = FingerprintIndex(L)
+        for q, ref in zip(Q, brute_force(Q, L)):
+            assert index.knn(q, k)==pytest.approx(ref[:k])
+            
+            
+    def test_incremental(self, tmp_path):
+        L = random_fingerprints(200, 64, density=0.2, seed=5)
+        index = FingerprintIndex(n_bits=64)
+        assert len(index)==0
+        assert index.knn(L[0], 3)==[]
+        
+        assert list(index.add(L[:50]))==list(range(50))
+        index.knn(L[0], 3)
+        index.add(pack_fingerprints(L[50:150]))
+        index.add(L[150:], ids=range(1000, 1050))
+        assert len(index)==200
+        ids = list(range(150)) + list(range(1000, 1050))
+        
+        ref = brute_force(L[7:8], L, ids)[0]
+        assert index.knn(L[7], 5)==pytest.approx(ref[:5])
+        
+        index.save(tmp_path / 'index.npz')
+        loaded = FingerprintIndex.load(tmp_path / 'index.npz')
+        assert len(loaded)==200
+        assert loaded.search(L[7], 0.5)==pytest.approx([x for x in ref if x[1]>=0.5])
+        assert list(loaded.add(L[:1]))==[1050]
+        
+        
+    def test_nas(self):
+        rng = random.Random(6)
+        nas = [random_na(rng.randint(20, 120), rng) for _ in range(50)]
+        index = FingerprintIndex(nas)
+        assert index.n_bits==192
+        found = index.knn(nas[3], 1)[0]
+        assert found[1]==1.
+        assert np.array_equal(FragmentFingerprint(nas[found[0]]), FragmentFingerprint(nas[3]))
+        
+        
+    def test_invalid(self):
+        index = FingerprintIndex(random_fingerprints(5, 10))
+        with pytest.raises(ValueError):
+            index.add(random_fingerprints(5, 12))
+        with pytest.raises(ValueError):
+            index.add(random_fingerprints(2, 10), ids=[1])
+        with pytest.raises(ValueError):
+            index.knn(random_fingerprints(2, 10), 1)
@@ -0,0 +1,127 @@
+import pytest
+import random
+import numpy as np
+from nskit import NA
+from itertools import product
+from nskit.descriptors import FragmentCount, FragmentFingerprint, FragmentDescriptor
+from nskit.descriptors.fragment_count import FEATURE_INDEXES
+from helpers import random_na
+
+
+
+class TestFragmentCountBatch:
+    
+    @pytest.mark.parametrize("with_knot_features", [True, False])
+    def test_identical(self, with_knot_features):
+        rng = random.Random(0)
+        nas = [random_na(rng.randint(1, 150), rng) for _ in range(200)]
+        nas += [NA('A'), NA('ACGU'), NA('GGGAAACCC', '(((...)))')]
+        
+        batch = FragmentCount.batch(nas, with_knot_features)
+        assert batch.shape==(len(nas), 192)
+        assert batch.dtype==np.int32
+        for na, row in zip(nas, batch):
+            assert np.array_equal(row, FragmentCount(na, with_knot_features))
+            
+        fp = FragmentFingerprint.batch(nas, with_knot_features)
+        for na, row in zip(nas, fp):
+            assert np.array_equal(row, FragmentFingerprint(na, with_knot_features))
+            
+            
+    def test_knot_features(self):
+        rng = random.Random(1)
+        nas = [random_na(120, rng) for _ in range(100)]
+        assert FragmentCount.batch(nas)[:, 150:].sum()>0
+        
+        
+    def test_empty(self):
+        assert FragmentCount.batch([]).shape==(0, 192)
+        
+        
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            FragmentCount.batch([NA('ACGU'), 'ACGU'])
+
+
+
+CUSTOM_CONFIG = {
+    'helixes':{
+        'get_fragment_func':lambda na: na.helixes, 
+        'properties':{
+            'len':{
+                'get_property_func':len,
+                'ranges':[(1, 3), (2, 5), (4, np.inf)]
+            }, 
+            'first':{
+                'get_property_func':lambda h: h[0][0],
+                'ranges':[(0, 10), (5, 40), (30, 1000)]
+            }
+        }
+    }, 
+    'loops':{
+        'get_fragment_func':lambda na: na.loops, 
+        'properties':{
+            'len':{
+                'get_property_func':len,
+                'ranges':[(0, 6), (6, 12), (10, np.inf)]
+            }
+        }
+    }
+}
+
+
+def reference_counts(na, config):
+    indexes = FragmentDescriptor(config).feature_indexes
+    vec = np.zeros(len(indexes), dtype=np.int32)
+    for i, fragment_dict in enumerate(config.values()):
+        for f in fragment_dict['get_fragment_func'](na):
+            matched = []
+            for p in fragment_dict['properties'].values():
+                v = p['get_property_func'](f)
+                matched.append([r for r in p['ranges'] if r[0]<=v<r[1]])
+            for feature in product(*matched):
+                vec[indexes[(i, ) + feature]] += 1
+    return vec
+
+
+class TestFragmentDescriptor:
+    
+    def test_preset(self):
+        rng = random.Random(4)
+        nas = [random_na(rng.randint(1, 120), rng) for _ in range(60)] + [NA('A')]
+        for with_knot_features in (True, False):
+            fc = FragmentDescriptor.fragment_count(with_knot_features)
+            assert fc.n_features==192
+            assert fc.feature_indexes==FEATURE_INDEXES
+            assert np.array_equal(fc.batch(nas), np.array([FragmentCount(na, with_knot_features) for na in nas]))
+            fp = FragmentDescriptor.fragment_count(with_knot_features, binary=True)
+            assert np.array_equal(fp(nas[0]), FragmentFingerprint(nas[0], with_knot_features))
+            
+            
+    def test_custom(self):
+        rng = random.Random(5)
+        nas = [random_na(rng.randint(1, 150), rng) for _ in range(80)]
+        d = FragmentDescriptor(CUSTOM_CONFIG)
+        assert d.n_features==9 + 3
+        assert len(d.feature_names)==d.n_features
+        assert d.feature_names[0]=='helixes.len[1, 3) & helixes.first[0, 10)'
+        
+        X = d.batch(nas)
+        for na, row in zip(nas, X):
+            assert np.array_equal(row, reference_counts(na, CUSTOM_CONFIG))
+        assert X.sum()>0
+        assert np.array_equal(FragmentDescriptor(CUSTOM_CONFIG, binary=True).batch(nas), (X>0).astype(np.int32))
+        
+        
+    @pytest.mark.parametrize("config", [
+        {},
+        {'helixes':{'properties':{}}},
+        {'helixes':{'get_fragment_func':len, 'properties':{}}},
+        {'helixes':{'get_fragment_func':len, 'properties':{'len':{'get_property_func':len, 'ranges':[]}}}},
+        {'helixes':{'get_fragment_func':len, 'properties':{'len':{'get_property_func':len, 'ranges':[(3, 1)]}}}},
+        {'helixes':{'get_fragment_func':len, 'properties':{'len':{'get_property_func':len, 'ranges':[('a', 1)]}}}},
+        {'helixes':{'get_fragment_func':len, 'properties':{'len':{'ranges':[(0, 1)]}}}},
+    ])
+    def test_invalid_config(self, config):
+        with pytest.raises(ValueError):
+            FragmentDescriptor(config)
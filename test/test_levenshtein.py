@@ -1,6 +1,10 @@
 import pytest
+import random
+import numpy as np
 from nskit import NA
-from nskit.algo import levdist
+from nskit.algo import levdist, subdist, subdist_many, align, EditCosts
+from nskit.metrics import sublevsim
+from nskit.algo.levenshtein._levenshtein import c_levenshtein_dp, c_levenshtein_myers
 
 
 
@@ -79,27 +83,242 @@ class TestLevenshtein:
             _ = levdist(a, "ACGU")
 
 
-        
-    
+class TestBitParallelKernel:
 
+    @pytest.mark.parametrize(
+        "n, m",
+        [
+            (1, 1), (5, 17), (63, 64), (64, 64), (64, 65), 
+            (65, 130), (128, 3), (200, 190), (517, 1000)
+        ]
+    )
+    def test_equal_to_dp(self, n, m):
+        rng = random.Random(n*1000 + m)
+        for _ in range(20):
+            a = ''.join(rng.choices('ACGU', k=n)).encode('ascii')
+            b = ''.join(rng.choices('ACGU', k=m)).encode('ascii')
+            if rng.random()<0.5: # similar sequences
+                b = (a[:m//2] + b)[:m]
+            
+            dp = c_levenshtein_dp(a, b, 1., 1., 1.)
+            myers = c_levenshtein_myers(a, b)
+            assert dp==myers
+            assert levdist(a.decode(), b.decode())==dp
+
+
+class TestSemiGlobal:
+
+    @pytest.mark.parametrize(
+        "probe, text, dist, span",
+        [
+            ('ACGU', 'UUUACGUUU', 0., (3, 7)),
+            ('ACGU', 'UUUACUUU', 1., (3, 6)),
+            ('ACGU', 'ACGU', 0., (0, 4)),
+            ('ACGU', '', 4., (0, 0)),
+            ('', 'ACGU', 0., (0, 0)),
+        ]
+    )
+    def test_span(self, probe, text, dist, span):
+        assert subdist(probe, text)==dist
+        assert subdist(probe, text, return_span=True)==(dist, *span)
         
         
+    @pytest.mark.parametrize(
+        "insert, delete, substitute",
+        [
+            (1, 1, 1),
+            (2, 3, 1),
+            (.3, 1.5, 1.3),
+        ]
+    )
+    def test_substrings(self, insert, delete, substitute):
+        rng = random.Random(0)
+        for _ in range(30):
+            probe = ''.join(rng.choices('ACGU', k=rng.randint(1, 8)))
+            text = ''.join(rng.choices('ACGU', k=rng.randint(1, 20)))
+            brute = min([levdist(probe, text[s:e], insert, delete, substitute) 
+                         for s in range(len(text)+1) for e in range(s, len(text)+1)])
+            
+            d, start, end = subdist(probe, text, insert, delete, substitute, return_span=True)
+            assert d==pytest.approx(brute)
+            assert subdist(probe, text, insert, delete, substitute)==d
+            assert levdist(probe, text[start:end], insert, delete, substitute)==pytest.approx(d)
+            
+            
+    @pytest.mark.parametrize("n, m", [(5, 40), (64, 100), (70, 300), (200, 1000)])
+    def test_bit_parallel(self, n, m):
+        rng = random.Random(n + m)
+        texts = [''.join(rng.choices('ACGU', k=m)) for _ in range(10)]
+        probe = texts[0][m//3:m//3+n]
+        unit = subdist_many(probe, texts)
+        weighted, spans = subdist_many(probe, texts, return_span=True)
+        assert unit.tolist()==weighted.tolist()
+        assert unit[0]==0
+        assert spans.shape==(10, 2)
+        assert [subdist(probe, t) for t in texts]==unit.tolist()
         
         
+    def test_sublevsim(self):
+        assert sublevsim('ACGU', 'UUUACGUUU')==1.
+        assert sublevsim('UUUACGUUU', 'ACGU')==1.
+        assert sublevsim('ACGU', 'UUUACUUU')==0.75
+        assert sublevsim(NA('ACGU'), NA('ACGA'))==0.75
+
+
+class TestAlignment:
+    
+    def apply(self, a, b, ops):
+        i, j = 0, 0
+        res = []
+        for op in ops:
+            if op=='D':
+                i += 1
+                continue
+            if op=='M':
+                assert a[i]==b[j]
+            if op=='X':
+                assert a[i]!=b[j]
+            res.append(b[j])
+            j += 1
+            if op!='I':
+                i += 1
+        assert i==len(a)
+        return ''.join(res)
+    
+    
+    @pytest.mark.parametrize(
+        "insert, delete, substitute",
+        [
+            (1, 1, 1),
+            (2, 100, 1),
+            (2, 3, 10),
+            (.3, 1.5, 1.3),
+        ]
+    )
+    def test_optimal(self, insert, delete, substitute):
+        rng = random.Random(0)
+        for _ in range(50):
+            a = ''.join(rng.choices('ACGU', k=rng.randint(0, 40)))
+            b = ''.join(rng.choices('ACGU', k=rng.randint(0, 40)))
+            al = align(a, b, insert, delete, substitute)
+            assert self.apply(a, b, al.ops)==b
+            assert al.dist==pytest.approx(levdist(a, b, insert, delete, substitute))
+            
+            
+    def test_operations(self):
+        al = align(NA('ACGU'), 'AGGUC')
+        assert al.dist==2.
+        assert al.ops=='MXMMI'
+        assert al.index_map()==[(0, 0), (1, 1), (2, 2), (3, 3), (None, 4)]
+        assert align('AC', '').ops=='DD'
+        assert align('', 'AC').ops=='II'
+
+
+class TestBufferInputs:
+    
+    @pytest.mark.parametrize("convert", [
+        lambda s: s.encode('ascii'),
+        lambda s: bytearray(s.encode('ascii')),
+        lambda s: memoryview(s.encode('ascii')),
+        lambda s: np.frombuffer(s.encode('ascii'), dtype=np.uint8),
+    ])
+    def test_buffers(self, convert):
+        rng = random.Random(3)
+        for _ in range(20):
+            a = ''.join(rng.choices('ACGU', k=rng.randint(0, 80)))
+            b = ''.join(rng.choices('ACGU', k=rng.randint(0, 80)))
+            A, B = convert(a), convert(b)
+            
+            assert levdist(A, B)==levdist(a, b)
+            assert levdist(A, B, 1., 2., 1.5)==levdist(a, b, 1., 2., 1.5)
+            assert subdist(A, B, return_span=True)==subdist(a, b, return_span=True)
+            assert align(A, B)==align(a, b)
+            assert list(subdist_many(A, [B, A]))==list(subdist_many(a, [b, a]))
+            
+            
+    def test_strided_array(self):
+        arr = np.frombuffer(b'AXCXGXU', dtype=np.uint8)[::2]
+        assert levdist(arr, 'ACGU')==0
         
         
+    def test_wide_array(self):
+        with pytest.raises(TypeError):
+            levdist(np.array([65, 67], dtype=np.int64), 'AC')
+        from nskit.algo.levenshtein._levenshtein import c_levenshtein_myers
+        with pytest.raises(TypeError):
+            c_levenshtein_myers(np.array([65, 67], dtype=np.int32), b'AC')
+            
+            
+    def test_na_seq_bytes(self):
+        na = NA('ACGUACGU', '((....))')
+        assert na.seq_bytes==b'ACGUACGU'
+        assert na.seq_bytes is na.seq_bytes
+        assert levdist(na, na.seq_bytes)==0
+    
+    
+def reference_levdist(a, b, costs):
+    D = [[0.]*(len(b)+1) for _ in range(len(a)+1)]
+    for j in range(1, len(b)+1):
+        D[0][j] = D[0][j-1] + costs.ins[ord(b[j-1])]
+    for i in range(1, len(a)+1):
+        D[i][0] = D[i-1][0] + costs.rm[ord(a[i-1])]
+        for j in range(1, len(b)+1):
+            D[i][j] = min(D[i-1][j-1] + costs.sub[ord(a[i-1]), ord(b[j-1])], 
+                          D[i][j-1] + costs.ins[ord(b[j-1])], 
+                          D[i-1][j] + costs.rm[ord(a[i-1])])
+    return D[-1][-1]
+
+
+class TestEditCosts:
+    
+    def test_nucleotide(self):
+        costs = EditCosts.nucleotide(transition=0.5, transversion=1.)
+        assert levdist('AAAA', 'AGAA', costs=costs)==0.5
+        assert levdist('AAAA', 'ACAA', costs=costs)==1.
+        assert levdist('ACGU', 'ACGT', costs=costs)==0.
+        assert levdist('ACGU', 'ANGU', costs=costs)==0.
+        assert levdist('acgu', 'ACGU', costs=costs)==0.
+        assert levdist('ACGU', 'ACU', costs=costs)==1.
         
         
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
\ No newline at end of file
+    def test_readonly(self):
+        costs = EditCosts()
+        with pytest.raises(ValueError):
+            costs.sub[0, 1] = 5.
+            
+            
+    def test_scalar_equivalence(self):
+        rng = random.Random(0)
+        costs = EditCosts(ins=2., rm=3., sub=1.5)
+        for _ in range(20):
+            a = ''.join(rng.choices('ACGU', k=rng.randint(0, 30)))
+            b = ''.join(rng.choices('ACGU', k=rng.randint(0, 30)))
+            assert levdist(a, b, costs=costs)==levdist(a, b, 2., 3., 1.5)
+            assert subdist(a, b, costs=costs)==subdist(a, b, 2., 3., 1.5)
+            
+            
+    def test_tables(self):
+        rng = random.Random(1)
+        costs = EditCosts.nucleotide(transition=0.3, transversion=1.1, ins=1.7, rm=0.9)
+        costs.set_sub('G', 'U', 0.2, symmetric=False).set_ins('A', 0.4).set_rm('C', 2.5)
+        for _ in range(30):
+            a = ''.join(rng.choices('ACGUN', k=rng.randint(0, 25)))
+            b = ''.join(rng.choices('ACGUT', k=rng.randint(0, 25)))
+            ref = reference_levdist(a, b, costs)
+            assert levdist(a, b, costs=costs)==pytest.approx(ref)
+            
+            al = align(a, b, costs=costs)
+            assert al.dist==pytest.approx(ref)
+            
+            text = b + a + b
+            assert subdist(a, text, costs=costs)<=ref + 1e-9
+            d, start, end = subdist(a, text, costs=costs, return_span=True)
+            assert levdist(a, text[start:end], costs=costs)==pytest.approx(d)
+            assert subdist_many(a, [text, b], costs=costs)[0]==pytest.approx(d)
+            
+            
+    def test_invalid_tables(self):
+        from nskit.algo.levenshtein._levenshtein import c_levenshtein
+        with pytest.raises(ValueError):
+            c_levenshtein(b'AC', b'AG', 1., 1., 1., (b'', b'', b''))
+
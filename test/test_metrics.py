@@ -1,7 +1,10 @@
 import pytest
+import random
 import nskit as nsk
 import numpy as np
 
+from helpers import random_structure
+
 
 
 class TestBinaryMetrics:
@@ -44,4 +47,194 @@ class TestBinaryMetrics:
     )
     def test_precision(self, true, pred, y):
         x = nsk.metrics.precision(true, pred)
-        assert np.isclose(x, y)
\ No newline at end of file
+        assert np.isclose(x, y)
+        
+        
+    @pytest.mark.parametrize(
+        "true, pred, y",
+        [
+            ("((((...))))", "((((...))))", 1.), 
+            ("((((...))))", "...........", 0.), 
+            ("((..))", "(....)", 0.681385), 
+        ]
+    )
+    def test_mcc(self, true, pred, y):
+        x = nsk.metrics.MCC(true, pred)
+        assert np.isclose(x, y)
+        
+        
+    def test_array_inputs(self):
+        true, pred = "((.[[.))..]]", "((....))...."
+        expected = nsk.metrics.binary_eval(true, pred)
+        
+        true_partners = np.array([7, 6, -1, 11, 10, -1, 1, 0, -1, -1, 4, 3])
+        pred_pairs = np.array([[0, 7], [6, 1]])
+        assert nsk.metrics.binary_eval(true_partners, pred) == expected
+        assert nsk.metrics.binary_eval(true, pred_pairs) == expected
+        assert nsk.metrics.binary_eval(nsk.NA(true), pred_pairs) == expected
+        
+        
+    @pytest.mark.parametrize(
+        "true, pred",
+        [
+            (np.array([[0, 5]]), np.array([[0, 5]])), 
+            ("((..))", np.array([[0, 6]])), 
+            (np.array([5, -1, -1, -1, -1, 0]), ".((..))"), 
+            (np.array([5, -1, -1, -1, -1, 1]), "(....)"), 
+        ]
+    )
+    def test_array_errors(self, true, pred):
+        with pytest.raises(ValueError):
+            _ = nsk.metrics.binary_eval(true, pred)
+        
+        
+class TestBinaryEvalBatch:
+    
+    def random_pairs(self, n, seed):
+        rng = random.Random(seed)
+        trues, preds = [], []
+        while len(trues)<n:
+            length = rng.randint(2, 80)
+            true = random_structure(length, rng)
+            if set(true)=={'.'}:
+                continue
+            trues.append(true)
+            preds.append(true if rng.random()<0.2 else random_structure(length, rng))
+        return trues, preds
+    
+    
+    def test_identical(self):
+        trues, preds = self.random_pairs(300, 0)
+        res = nsk.metrics.binary_eval_batch(trues, preds)
+        assert res.shape==(300, )
+        for true, pred, r in zip(trues, preds, res):
+            cm = nsk.metrics.confusion_matrix(true, pred).cm
+            assert np.array_equal([r['tn'], r['fp'], r['fn'], r['tp']], cm.ravel())
+            expected = nsk.metrics.binary_eval(true, pred)
+            for name, y in expected._asdict().items():
+                assert np.isclose(r[name], y)
+            assert np.isclose(r['mcc'], nsk.metrics.MCC(true, pred))
+            
+            
+    def test_inputs(self):
+        trues, preds = self.random_pairs(50, 1)
+        expected = nsk.metrics.binary_eval_batch(trues, preds)
+        
+        nas = [nsk.NA(s) for s in trues]
+        partners = [nsk.metrics.binary_classification._partners(s) for s in preds]
+        assert np.array_equal(nsk.metrics.binary_eval_batch(nas, partners), expected)
+        
+        trues = ["((..))", "(....)", ".(..)."]
+        preds = ["((..))", "......", "(....)"]
+        matrix = np.stack([nsk.metrics.binary_classification._partners(s) for s in preds])
+        assert np.array_equal(nsk.metrics.binary_eval_batch(trues, matrix), 
+                              nsk.metrics.binary_eval_batch(trues, preds))
+        
+        
+    def test_empty(self):
+        res = nsk.metrics.binary_eval_batch([], [])
+        assert res.shape==(0, )
+        
+        
+    @pytest.mark.parametrize(
+        "trues, preds",
+        [
+            (["((..))"], ["((..))", "((..))"]), 
+            (["((..))", ".(..)."], ["((..))", "(...)"]), 
+            (["((..))", "......"], ["((..))", "(....)"]), 
+            ([np.array([3, -1, -1, 0])], [np.array([2, -1, -1, 0])]), 
+            ([np.array([3, -1, -1, 0])], [np.array([4, -1, -1, 0])]), 
+        ]
+    )
+    def test_errors(self, trues, preds):
+        with pytest.raises(ValueError):
+            _ = nsk.metrics.binary_eval_batch(trues, preds)
+            
+            
+class TestPairVariants:
+    
+    def random_pairs(self, n, seed):
+        return TestBinaryEvalBatch.random_pairs(None, n, seed)
+    
+    
+    def brute_counts(self, true, pred, pairs, shift):
+        length = len(true)
+        true, pred = nsk.NA(true), nsk.NA(pred)
+        select = {'all':lambda na: set(na.pairs), 
+                  'knot':lambda na: set(na.knot_pairs), 
+                  'nested':lambda na: set(na.pairs) - set(na.knot_pairs)}[pairs]
+        t, p = select(true), select(pred)
+        match = lambda x, others: any([(i==x[0] and abs(j-x[1])<=shift) or (j==x[1] and abs(i-x[0])<=shift) 
+                                       for i, j in others])
+        tp = sum([match(x, p) for x in t])
+        fp = sum([not match(x, t) for x in p])
+        fn = len(t) - tp
+        tn = (length**2 - length)//2 - len(t) - fp
+        return tp, fp, fn, tn
+    
+    
+    @pytest.mark.parametrize(
+        "struct, knot_pairs", 
+        [
+            ("((.[[.))..]]", ((3, 11), (4, 10))), 
+            ("((..[[..))..((..]]..))", ((4, 17), (5, 16))), 
+            ("(((..[[[..)))..]]]..[[..]]", ((5, 17), (6, 16), (7, 15))), 
+            ("(.[.).<.].>", ((2, 8), )), 
+            ("((..))..((..))", ()), 
+        ]
+    )
+    def test_knot_mask(self, struct, knot_pairs):
+        from nskit.metrics.binary_classification import _knot_mask
+        partners = nsk.metrics.binary_classification._partners(struct)
+        mask = _knot_mask(partners, np.arange(len(struct)), np.array([len(struct)]))
+        assert nsk.NA(struct).knot_pairs==knot_pairs
+        assert set(np.nonzero(mask)[0])=={i for p in knot_pairs for i in p}
+        
+        
+    @pytest.mark.parametrize("pairs", ['all', 'nested', 'knot'])
+    @pytest.mark.parametrize("shift", [0, 1, 2])
+    def test_brute(self, pairs, shift):
+        trues, preds = self.random_pairs(150, 2)
+        # shifted predictions
+        rng = random.Random(3)
+        for k in range(0, len(preds), 3):
+            na = nsk.NA(trues[k])
+            moved = [(i, j + rng.choice([-1, 0, 1])) for i, j in na.pairs]
+            struct = ['.']*len(na)
+            used = set()
+            for i, j in moved:
+                if j>i+1 and j<len(na) and i not in used and j not in used:
+                    struct[i], struct[j] = '(', ')'
+                    used.update((i, j))
+            if '(' in struct:
+                preds[k] = nsk.NA(''.join(struct)).struct
+        
+        res = nsk.metrics.binary_eval_batch(trues, preds, pairs=pairs, shift=shift)
+        for true, pred, r in zip(trues, preds, res):
+            assert (r['tp'], r['fp'], r['fn'], r['tn'])==self.brute_counts(true, pred, pairs, shift)
+            expected = nsk.metrics.binary_eval(true, pred, pairs=pairs, shift=shift)
+            for name, y in expected._asdict().items():
+                assert np.isclose(r[name], y, equal_nan=True)
+                
+                
+    def test_shift(self):
+        true, pred = "((((....))))", "((((...))))."
+        assert nsk.metrics.binary_eval(true, pred).f1==0
+        assert nsk.metrics.binary_eval(true, pred, shift=1).f1==1
+        
+        
+    def test_empty_subset(self):
+        x = nsk.metrics.binary_eval("((..))", "((..))", pairs='knot')
+        assert np.isnan(x.recall) and np.isnan(x.f1)
+        assert x.precision==0
+        
+        
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{'pairs':'knots'}, {'shift':-1}]
+    )
+    def test_errors(self, kwargs):
+        with pytest.raises(ValueError):
+            _ = nsk.metrics.binary_eval("((..))", "((..))", **kwargs)
+        with pytest.raises(ValueError):
+            _ = nsk.metrics.binary_eval_batch(["((..))"], ["((..))"], **kwargs)
@@ -1,5 +1,7 @@
 import pytest
+import numpy as np
 from nskit import NA
+from nskit.parse_na import parse_partners
 from nskit.exceptions import InvalidSequence, InvalidStructure
 
 
@@ -87,26 +89,28 @@ class TestGraphParse:
         na = NA(struct)
         for i, order in enumerate(na.helix_orders):
             assert order == orders[i]
-    
 
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
\ No newline at end of file
+
+class TestParsePartners:
+
+    def test_identical(self):
+        structs = ["((..))", "", "......", "((.[[.))..]]", "(<.A..).>.a", "(((...)))..((..))"]
+        partners, lengths = parse_partners(structs)
+        assert np.array_equal(lengths, [len(s) for s in structs])
+
+        start = 0
+        for s in structs:
+            expected = np.full(len(s), -1)
+            for i, j in NA(s).pairs if len(s) else []:
+                expected[i], expected[j] = j, i
+            assert np.array_equal(partners[start:start+len(s)], expected)
+            start += len(s)
+
+
+    @pytest.mark.parametrize(
+        "struct",
+        ["(()", "())(", "(]", ")(", "((x))"]
+    )
+    def test_invalid(self, struct):
+        with pytest.raises(InvalidStructure):
+            _ = parse_partners(["((..))", struct, "(..)"])
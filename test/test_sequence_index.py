@@ -0,0 +1,95 @@
+import pytest
+import random
+import numpy as np
+from nskit import NA
+from nskit.algo import levdist, SequenceIndex
+
+
+
+def random_library(n, seed=0):
+    rng = random.Random(seed)
+    base = [''.join(rng.choices('ACGU', k=rng.randint(8, 20))) for _ in range(n//4)]
+    lib = []
+    for _ in range(n):
+        s = list(rng.choice(base))
+        for _ in range(rng.randint(0, 3)):
+            s[rng.randrange(len(s))] = rng.choice('ACGU')
+        lib.append(''.join(s))
+    return lib
+
+
+class TestSequenceIndex:
+
+    @pytest.mark.parametrize(
+        "weights, kind",
+        [
+            ((1, 1, 1), 'bk'),
+            ((2, 2, 3), 'bk'),
+            ((1.5, 1.5, 1), 'vp'),
+        ]
+    )
+    def test_range(self, weights, kind):
+        ins, rm, sub = weights
+        lib = random_library(300)
+        index = SequenceIndex(lib, ins=ins, rm=rm, sub=sub)
+        assert index.kind==kind
+        
+        for q in random_library(10, seed=1):
+            for k in (0, 2, 4.5):
+                brute = [(i, levdist(q, s, ins, rm, sub)) for i, s in enumerate(lib)]
+                brute = sorted([(i, d) for i, d in brute if d<=k], key=lambda x: (x[1], x[0]))
+                assert index.range(q, k)==brute
+                
+                
+    @pytest.mark.parametrize("weights", [(1, 1, 1), (0.5, 0.5, 1.3)])
+    def test_knn(self, weights):
+        ins, rm, sub = weights
+        lib = random_library(300)
+        index = SequenceIndex(lib, ins=ins, rm=rm, sub=sub)
+        
+        for q in random_library(10, seed=2):
+            brute = sorted([(levdist(q, s, ins, rm, sub), i) for i, s in enumerate(lib)])
+            assert index.knn(q, 7)==[(i, d) for d, i in brute[:7]]
+            
+            
+    @pytest.mark.parametrize("weights", [(1, 1, 1), (0.5, 0.5, 1.3)])
+    def test_save_load(self, tmp_path, weights):
+        ins, rm, sub = weights
+        lib = random_library(100)
+        index = SequenceIndex(lib, ins=ins, rm=rm, sub=sub)
+        index.save(tmp_path/'index.npz')
+        loaded = SequenceIndex.load(tmp_path/'index.npz')
+        
+        assert len(loaded)==len(index)
+        assert loaded[5]==lib[5]
+        for q in random_library(5, seed=3):
+            assert loaded.range(q, 3)==index.range(q, 3)
+            assert loaded.knn(q, 4)==index.knn(q, 4)
+            
+            
+    def test_nucleic_acids(self):
+        index = SequenceIndex([NA('AAGG', '(..)'), NA('AAGC'), 'CCCC'])
+        assert index.range(NA('AAGG'), 1)==[(0, 0.), (1, 1.)]
+        assert index.knn('CCCG', 1)==[(2, 1.)]
+        
+        
+    def test_buffers(self):
+        seqs = ['AAGG', 'AAGC', 'CCCC']
+        index = SequenceIndex([seqs[0].encode(), bytearray(seqs[1].encode()), np.frombuffer(seqs[2].encode(), dtype=np.uint8)])
+        assert index[2]=='CCCC'
+        for q in [b'CCCG', memoryview(b'CCCG'), np.frombuffer(b'CCCG', dtype=np.uint8)]:
+            assert index.knn(q, 1)==[(2, 1.)]
+            assert index.range(q, 1)==[(2, 1.)]
+        with pytest.raises(TypeError):
+            _ = SequenceIndex([np.zeros(3, dtype=np.int32)])
+        
+        
+    def test_empty(self):
+        index = SequenceIndex([])
+        assert index.range('ACGU', 2)==[]
+        assert index.knn('ACGU', 2)==[]
+        
+        
+    def test_asymmetric_error(self):
+        with pytest.raises(ValueError):
+            _ = SequenceIndex(['ACGU'], ins=1, rm=2)
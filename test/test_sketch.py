@@ -0,0 +1,74 @@
+import pytest
+import random
+import numpy as np
+from nskit import NA
+from nskit.algo import sketch
+from nskit.metrics import levsim
+
+
+
+def mutated_library(n, seed=0):
+    rng = random.Random(seed)
+    base = [''.join(rng.choices('ACGU', k=60)) for _ in range(n//3)]
+    lib = []
+    for _ in range(n):
+        s = list(rng.choice(base))
+        for _ in range(rng.randint(0, 2)):
+            s[rng.randrange(len(s))] = rng.choice('ACGU')
+        lib.append(''.join(s))
+    return lib
+
+
+class TestMinHash:
+
+    def test_kmer_hashes(self):
+        h = sketch.kmer_hashes('ACGUACGU', 4)
+        assert h.dtype==np.uint64
+        assert len(h)==5
+        assert h[0]==h[4]
+        assert len(sketch.kmer_hashes('ACG', 4))==0
+        
+        
+    def test_identical_sketches(self):
+        s = sketch.minhash(['ACGUAGGCUA', NA('ACGUAGGCUA'), 'UUUUUUUUU', 'AC'], k=3, num_perm=32)
+        assert s.shape==(4, 32)
+        assert np.array_equal(s[0], s[1])
+        assert not np.array_equal(s[0], s[2])
+        assert np.all(s[3]==sketch.MAX_HASH)
+        
+        
+    def test_jaccard_estimate(self):
+        a, b = 'ACGUAGGCUAGCGAUCGAUUAGC', 'ACGUAGGCUAGCGAUCGAUUAGCAAAUGC'
+        sa, sb = sketch.minhash([a, b], k=4, num_perm=512)
+        ka = set([a[i:i+4] for i in range(len(a)-3)])
+        kb = set([b[i:i+4] for i in range(len(b)-3)])
+        jaccard = len(ka & kb)/len(ka | kb)
+        assert abs(np.mean(sa==sb) - jaccard)<0.1
+        
+        
+    def test_bands_error(self):
+        with pytest.raises(ValueError):
+            _ = sketch.lsh_candidates(np.zeros((3, 10), dtype=np.uint64), 3)
+            
+            
+class TestNearDuplicates:
+    
+    def test_verified_pairs(self):
+        lib = mutated_library(90)
+        found = sketch.near_duplicates(lib, 0.9, k=5, num_perm=64, bands=32)
+        assert found.pairs.shape[1]==2
+        assert np.all(found.pairs[:, 0]<found.pairs[:, 1])
+        for (i, j), s in zip(found.pairs, found.similarity):
+            assert s==levsim(lib[i], lib[j])
+            assert s>=0.9
+            
+        recall = sketch.lsh_recall(lib, found.pairs, 0.9)
+        assert recall.total>0
+        assert recall.recall>0.9
+        
+        
+    def test_recall_sample(self):
+        lib = mutated_library(60)
+        recall = sketch.lsh_recall(lib, np.zeros((0, 2)), 0.9, sample=30)
+        assert recall.found==0
+        assert recall.recall==(0. if recall.total else 1.)
@@ -0,0 +1,97 @@
+import pytest
+import random
+import numpy as np
+from nskit import NA
+from nskit.descriptors import FragmentCount, SparseDescriptors, SparseDescriptorsWriter, sparse_descriptors
+from helpers import random_na
+
+
+
+@pytest.fixture(scope='module')
+def nas():
+    rng = random.Random(2)
+    return [random_na(rng.randint(1, 120), rng) for _ in range(150)]
+
+
+class TestSparseDescriptors:
+    
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+    def test_in_memory(self, nas, chunk_size):
+        dense = FragmentCount.batch(nas)
+        sparse = sparse_descriptors(nas, chunk_size=chunk_size)
+        assert sparse.shape==dense.shape
+        assert sparse.nnz==np.count_nonzero(dense)
+        assert np.array_equal(sparse.to_dense(), dense)
+        assert np.array_equal(sparse.to_dense(10, 20), dense[10:20])
+        assert np.array_equal(sparse[5], dense[5])
+        
+        
+    def test_stream_to_file(self, nas, tmp_path):
+        dense = FragmentCount.batch(nas, with_knot_features=False)
+        sparse = sparse_descriptors(iter(nas), tmp_path / 'fc', chunk_size=16, with_knot_features=False)
+        assert isinstance(sparse.indices, np.memmap)
+        assert np.array_equal(sparse.to_dense(), dense)
+        
+        loaded = SparseDescriptors.load(tmp_path / 'fc', mmap=False)
+        assert np.array_equal(loaded.to_dense(), dense)
+        
+        
+    def test_save_load(self, tmp_path):
+        X = np.array([[0, 2, 0], [0, 0, 0], [1, 0, 3]], dtype=np.int32)
+        sparse = SparseDescriptors.from_dense(X)
+        assert list(sparse.indptr)==[0, 1, 1, 3]
+        sparse.save(tmp_path / 's')
+        assert np.array_equal(SparseDescriptors.load(tmp_path / 's').to_dense(), X)
+        
+        
+    def test_getitem(self):
+        X = np.eye(3, dtype=np.int32)
+        sparse = SparseDescriptors.from_dense(X)
+        for i in range(-3, 3):
+            assert np.array_equal(sparse[i], X[i])
+        for i in (3, -4):
+            with pytest.raises(IndexError):
+                _ = sparse[i]
+        
+        
+    def test_empty(self, tmp_path):
+        assert sparse_descriptors([]).shape==(0, 192)
+        assert sparse_descriptors([], tmp_path / 'e').shape==(0, 192)
+        
+        
+    @pytest.mark.parametrize("to_file", [False, True])
+    def test_invalid_records(self, nas, tmp_path, to_file):
+        records = list(nas[:10])
+        records[3] = records[7] = None
+        sparse = sparse_descriptors(records, tmp_path / 'fc' if to_file else None, chunk_size=4)
+        dense = sparse.to_dense()
+        assert dense.shape==(10, 192)
+        assert dense[3].sum()==dense[7].sum()==0
+        valid = [i for i, na in enumerate(records) if na is not None]
+        assert np.array_equal(dense[valid], FragmentCount.batch([records[i] for i in valid]))
+
+
+    def test_writer_exception(self, tmp_path):
+        with SparseDescriptorsWriter(tmp_path / 'w', 3) as writer:
+            writer.append(np.eye(3, dtype=np.int32))
+        assert SparseDescriptors.load(tmp_path / 'w').shape==(3, 3)
+
+        with pytest.raises(RuntimeError):
+            with SparseDescriptorsWriter(tmp_path / 'w', 3) as writer:
+                writer.append(np.eye(3, dtype=np.int32))
+                raise RuntimeError('interrupted')
+        # half written matrix is not loaded
+        with pytest.raises(FileNotFoundError):
+            SparseDescriptors.load(tmp_path / 'w')
+
+
+    def test_writer_shape(self, tmp_path):
+        with SparseDescriptorsWriter(tmp_path / 'w', 3) as writer:
+            with pytest.raises(ValueError):
+                writer.append(np.zeros((2, 4)))
+                
+                
+    def test_scipy(self, nas):
+        pytest.importorskip('scipy')
+        sparse = sparse_descriptors(nas)
+        assert np.array_equal(sparse.to_scipy().toarray(), FragmentCount.batch(nas))
@@ -0,0 +1,55 @@
+import pytest
+import random
+import numpy as np
+from nskit import NA
+from nskit.metrics import bp_distance, bp_distance_matrix
+from helpers import random_structure
+
+
+
+class TestBasePairDistance:
+    
+    @pytest.mark.parametrize(
+        "a, b, d",
+        [
+            ("((..))", "((..))", 0), 
+            ("((..))", "......", 2), 
+            ("((..))", ".(..).", 1), 
+            ("((..))", "(....)", 1), 
+            ("((..)).", ".((..))", 4), 
+            ("((.[[.))..]]", "((....))....", 2)
+        ]
+    )
+    def test_pair(self, a, b, d):
+        assert bp_distance(a, b)==d
+        assert bp_distance(NA(a), b)==d
+        
+        
+    def test_matrix(self):
+        rng = random.Random(0)
+        structs = [random_structure(60, rng, knots=False) for _ in range(50)]
+        dist = bp_distance_matrix(structs, block_size=16)
+        assert dist.shape==(50, 50)
+        assert dist.dtype==np.int32
+        for i in range(50):
+            for j in range(50):
+                assert dist[i, j]==bp_distance(structs[i], structs[j])
+                
+                
+    def test_matrix_other(self):
+        rng = random.Random(1)
+        a = [random_structure(40, rng, knots=False) for _ in range(7)]
+        b = [NA(random_structure(40, rng, knots=False)) for _ in range(5)]
+        dist = bp_distance_matrix(a, b)
+        assert dist.shape==(7, 5)
+        assert all([dist[i, j]==bp_distance(a[i], b[j]) for i in range(7) for j in range(5)])
+        
+        
+    def test_unpaired(self):
+        dist = bp_distance_matrix(["....", "...."])
+        assert np.array_equal(dist, np.zeros((2, 2)))
+        
+        
+    def test_length_error(self):
+        with pytest.raises(ValueError):
+            _ = bp_distance_matrix(["((..))", "(...)"])
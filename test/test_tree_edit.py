@@ -0,0 +1,112 @@
+import pytest
+import random
+from functools import lru_cache
+import numpy as np
+from nskit import NA
+from nskit.algo import loop_tree, tree_edit_distance, tree_edit_distance_matrix
+from nskit.algo.tree_edit import EXTERIOR, HELIX, HAIRPIN, INTERNAL_LOOP, BULGE, JUNCTION
+from helpers import random_structure
+
+
+
+def nested(tree):
+    # postorder arrays to nested (type, size, children) tuples
+    stack = []
+    for i in range(len(tree.types)):
+        children = []
+        while stack and stack[-1][0]>=tree.lml[i]:
+            children.append(stack.pop()[1])
+        node = (int(tree.types[i]), float(tree.sizes[i]), tuple(children[::-1]))
+        stack.append((int(tree.lml[i]), node))
+    return stack[0][1]
+
+
+def reference_distance(a, b, ins, rm, sub, size):
+    
+    @lru_cache(maxsize=None)
+    def forest_size(f):
+        return sum([n[1] for n in f])
+    
+    @lru_cache(maxsize=None)
+    def dist(f, g):
+        if not f and not g:
+            return 0.
+        if not g:
+            v = f[-1]
+            return dist(f[:-1] + v[2], g) + rm + size*v[1]
+        if not f:
+            w = g[-1]
+            return dist(f, g[:-1] + w[2]) + ins + size*w[1]
+        
+        v, w = f[-1], g[-1]
+        ren = size*abs(v[1]-w[1]) + (sub if v[0]!=w[0] else 0.)
+        return min(dist(f[:-1] + v[2], g) + rm + size*v[1], 
+                   dist(f, g[:-1] + w[2]) + ins + size*w[1], 
+                   dist(v[2], w[2]) + dist(f[:-1], g[:-1]) + ren)
+    
+    return dist((nested(a),), (nested(b),))
+
+
+class TestLoopTree:
+    
+    def test_nodes(self):
+        t = loop_tree('..((..((...))..((..[[.)).]].))..')
+        assert list(t.types)==[HAIRPIN, HELIX, HAIRPIN, HELIX, JUNCTION, HELIX, EXTERIOR]
+        assert list(t.sizes)==[3, 2, 5, 2, 8, 2, 4]
+        assert list(t.lml)==[0, 0, 2, 2, 0, 0, 0]
+        
+        
+    def test_loop_types(self):
+        t = loop_tree(NA('((.((...))..))..((((...)).))'))
+        assert list(t.types)==[HAIRPIN, HELIX, INTERNAL_LOOP, HELIX, HAIRPIN, HELIX, BULGE, HELIX, EXTERIOR]
+        
+        
+    def test_linear(self):
+        t = loop_tree('.....')
+        assert list(t.types)==[EXTERIOR]
+        assert list(t.sizes)==[5]
+        
+        
+class TestTreeEditDistance:
+    
+    @pytest.mark.parametrize(
+        "a, b, d",
+        [
+            ("((..))", "((..))", 0.), 
+            ("((..))", "......", 2.), 
+            ("((..))", "((..((...))))", 2.), 
+            ("((..))..((..))", "((..))", 2.), 
+            ("((..((...))...))", "((..((...))..))", 0.), 
+        ]
+    )
+    def test_distance(self, a, b, d):
+        assert tree_edit_distance(a, b)==d
+        
+        
+    @pytest.mark.parametrize(
+        "ins, rm, sub, size",
+        [
+            (1, 1, 1, 0), 
+            (1, 2, 0.5, 0.1), 
+            (3, 1, 5, 1), 
+        ]
+    )
+    def test_reference(self, ins, rm, sub, size):
+        rng = random.Random(0)
+        structs = [random_structure(rng.randint(10, 60), rng, knots=False) for _ in range(12)]
+        trees = [loop_tree(s) for s in structs]
+        dist = tree_edit_distance_matrix(trees, ins=ins, rm=rm, sub=sub, size=size)
+        for i in range(len(trees)):
+            for j in range(len(trees)):
+                ref = reference_distance(trees[i], trees[j], ins, rm, sub, size)
+                assert np.isclose(dist[i, j], ref)
+                
+                
+    def test_matrix_other(self):
+        a = ["((..))", "((..((...))))", "......"]
+        b = [NA("((..))..((..))"), "(((...)))"]
+        dist = tree_edit_distance_matrix(a, b, size=0.5)
+        assert dist.shape==(3, 2)
+        for i in range(3):
+            for j in range(2):
+                assert dist[i, j]==tree_edit_distance(a[i], b[j], size=0.5)
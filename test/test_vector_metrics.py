@@ -0,0 +1,122 @@
+import pytest
+import numpy as np
+from nskit.metrics import (euclidean_dist, cosine_sim, euclidean_dist_matrix, cosine_sim_matrix,
+                           euclidean_top_k, cosine_top_k)
+
+
+
+def random_counts(n, d, high=4, seed=0):
+    # small integer vectors like FragmentCount descriptors, distances are exact and have ties
+    rng = np.random.default_rng(seed)
+    X = rng.integers(0, high, size=(n, d)).astype(np.int32)
+    X[:, 0] += 1 # no zero vectors
+    return X
+
+
+class TestPairwise:
+
+    @pytest.mark.parametrize("block_size", [1, 50, 1<<22])
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_matrix(self, block_size, dtype):
+        A = random_counts(23, 40)
+        B = random_counts(31, 40, seed=1)
+
+        dist = euclidean_dist_matrix(A, B, dtype=dtype, block_size=block_size)
+        sim = cosine_sim_matrix(A, B, dtype=dtype, block_size=block_size)
+        assert dist.dtype==dtype and sim.dtype==dtype
+        assert dist.shape==sim.shape==(23, 31)
+        rtol = 1e-4 if dtype==np.float32 else 1e-7
+        assert np.allclose(dist, [[euclidean_dist(a, b) for b in B] for a in A], rtol=rtol)
+        assert np.allclose(sim, [[cosine_sim(a, b) for b in B] for a in A], rtol=rtol)
+
+
+    def test_self(self):
+        A = random_counts(15, 20)
+        dist = euclidean_dist_matrix(A, block_size=7)
+        assert np.array_equal(np.diag(dist), np.zeros(15))
+        assert np.allclose(dist, dist.T)
+        assert np.allclose(np.diag(cosine_sim_matrix(A)), 1.)
+
+
+    def test_out(self):
+        A = random_counts(10, 8)
+        out = np.empty((10, 10), dtype=np.float32)
+        res = euclidean_dist_matrix(A, dtype=np.float32, block_size=9, out=out)
+        assert res is out
+        assert np.allclose(out, euclidean_dist_matrix(A), rtol=1e-5)
+
+        with pytest.raises(ValueError):
+            _ = euclidean_dist_matrix(A, out=np.empty((10, 9)))
+        with pytest.raises(ValueError):
+            _ = cosine_sim_matrix(A, out=out) # float64 by default
+
+
+    @pytest.mark.parametrize(
+        "X, Y, kwargs",
+        [
+            (np.ones((2, 3)), np.ones((2, 4)), {}),
+            (np.ones((2, 3)), None, {'dtype':np.int32}),
+            (np.ones((2, 3, 1)), None, {}),
+        ]
+    )
+    def test_errors(self, X, Y, kwargs):
+        with pytest.raises(ValueError):
+            _ = euclidean_dist_matrix(X, Y, **kwargs)
+
+
+    def test_zero_vector(self):
+        X = np.array([[0, 0], [1, 0]])
+        assert np.array_equal(cosine_sim_matrix(X), [[0, 0], [0, 1]])
+
+
+class TestTopK:
+
+    @pytest.mark.parametrize("block_size", [1, 13, 1<<22])
+    @pytest.mark.parametrize("k", [1, 5, 100])
+    def test_euclidean(self, k, block_size):
+        Q = random_counts(9, 6, high=2, seed=2)
+        L = random_counts(60, 6, high=2, seed=3)
+        top = euclidean_top_k(Q, L, k, block_size=block_size)
+        dist = euclidean_dist_matrix(Q, L)
+        k = min(k, len(L))
+        assert top.indices.shape==top.scores.shape==(9, k)
+        for i in range(len(Q)):
+            order = sorted(range(len(L)), key=lambda j: (dist[i, j], j))[:k]
+            assert list(top.indices[i])==order
+            assert np.allclose(top.scores[i], dist[i, order])
+
+
+    @pytest.mark.parametrize("block_size", [1, 13, 1<<22])
+    @pytest.mark.parametrize("k", [1, 5, 100])
+    def test_cosine(self, k, block_size):
+        Q = random_counts(9, 6, high=2, seed=4)
+        L = random_counts(60, 6, high=2, seed=5)
+        top = cosine_top_k(Q, L, k, block_size=block_size)
+        sim = cosine_sim_matrix(Q, L)
+        k = min(k, len(L))
+        for i in range(len(Q)):
+            # similarity ties may differ by rounding of normalized vectors, only values are compared
+            assert np.allclose(top.scores[i], np.sort(sim[i])[::-1][:k])
+            assert np.allclose(sim[i, top.indices[i]], top.scores[i])
+            assert len(set(top.indices[i]))==k
+
+
+    @pytest.mark.parametrize("top_k", [euclidean_top_k, cosine_top_k])
+    @pytest.mark.parametrize("k", [0, -1])
+    def test_no_neighbours(self, top_k, k):
+        Q = random_counts(3, 6, seed=8)
+        L = random_counts(5, 6, seed=9)
+        top = top_k(Q, L, k)
+        assert top.indices.shape==top.scores.shape==(3, 0)
+        assert top.indices.dtype==np.int64
+        assert top_k(Q[0], L, k).indices.shape==(0, )
+
+
+    def test_single_float32(self):
+        Q = random_counts(1, 30, seed=6)[0]
+        L = random_counts(100, 30, seed=7)
+        top = euclidean_top_k(Q, L, 4, dtype=np.float32)
+        assert top.indices.shape==(4, )
+        assert top.scores.dtype==np.float32
+        dist = np.linalg.norm(L - Q, axis=1)
+        assert np.allclose(top.scores, np.sort(dist)[:4], rtol=1e-5)